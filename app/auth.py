@@ -1,30 +1,141 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 import jwt
 from datetime import datetime, timedelta
 from fastapi import HTTPException, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from starlette.concurrency import run_in_threadpool
 from app.config import Config
+from app.sessions import session_store
 
 security = HTTPBearer()
 
+
+class TokenCache:
+    """LRU cache of verified token payloads keyed by the token's SHA-256 digest.
+
+    Entries are dropped once the token's ``exp`` has passed, so an expired
+    token always goes back through jwt.decode and fails there.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token):
+        key = self._key(token)
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None and payload["exp"] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(payload)
+            if payload is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, token, payload):
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = dict(payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, token):
+        with self._lock:
+            self._entries.pop(self._key(token), None)
+
+    def invalidate_user(self, user_id):
+        user_id = str(user_id)
+        with self._lock:
+            for key in [key for key, payload in self._entries.items() if payload["sub"] == user_id]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+token_cache = TokenCache(Config.TOKEN_CACHE_SIZE)
+
+
 def create_access_token(user_id: int, role: str):
+    if session_store is not None:
+        return session_store.create(user_id, role)
     payload = {
         "sub": str(user_id),
         "role": role,
-        "exp": datetime.utcnow() + timedelta(hours=5)
+        "exp": datetime.utcnow() + timedelta(hours=Config.SESSION_TTL_HOURS)
     }
     return jwt.encode(payload, Config.SECRET_KEY, algorithm="HS256")
 
 def verify_token(token: str):
+    if session_store is not None:
+        session = session_store.get(token)
+        if session is None:
+            raise HTTPException(status_code=401, detail="Session expired or revoked")
+        return {"sub": str(session["user_id"]), "role": session["role"], "exp": session["exp"]}
+
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
     try:
         payload = jwt.decode(token, Config.SECRET_KEY, algorithms=["HS256"])
-        return payload
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    token_cache.put(token, payload)
+    return payload
+
+# Хранилище сессий может ходить в БД, поэтому из async-кода вызываем его в пуле потоков
+
+async def invalidate_token(token: str):
+    token_cache.invalidate(token)
+    if session_store is not None:
+        await run_in_threadpool(session_store.revoke, token)
+
+async def invalidate_user_tokens(user_id, keep_token=None):
+    """Revoke every session of the user except keep_token.
+
+    Without a session store JWTs stay valid until they expire; only the
+    cached payloads are dropped.
+    """
+    token_cache.invalidate_user(user_id)
+    if session_store is not None:
+        await run_in_threadpool(session_store.revoke_user, user_id, keep_token)
+
+async def refresh_user_role(user_id, role):
+    # С хранилищем сессий новая роль действует сразу, без повторного входа
+    token_cache.invalidate_user(user_id)
+    if session_store is not None:
+        await run_in_threadpool(session_store.set_role, user_id, role)
 
 def get_current_user(request: Request):
     token = request.cookies.get("access_token")
+    if not token:
+        # Клиенты JSON API могут передавать токен в заголовке Authorization
+        scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() == "bearer":
+            token = credentials.strip()
     if not token:
         raise HTTPException(status_code=401, detail="Not authenticated")
     return verify_token(token)
\ No newline at end of file
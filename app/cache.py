@@ -0,0 +1,202 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from app.config import Config
+from app.database import get_db_cursor, get_async_db_cursor
+from app.notify import listener
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "data_versions"
+# Отдельная короткая транзакция после коммита записи: строка table_versions
+# блокируется на микросекунды, а не на все время чужой транзакции. Номера
+# берутся из одной последовательности, поэтому растут без чтения-изменения-записи;
+# GREATEST не дает версии откатиться, если две записи обновили строку не по порядку
+BUMP_VERSION_SQL = f"""
+    WITH v AS (
+        INSERT INTO table_versions(table_name, version)
+        SELECT table_name, nextval('data_version_seq') FROM unnest(%s::varchar[]) AS t(table_name)
+        ON CONFLICT (table_name) DO UPDATE
+            SET version = GREATEST(table_versions.version, EXCLUDED.version)
+        RETURNING table_name, version
+    )
+    SELECT table_name, version, pg_notify('{NOTIFY_CHANNEL}', table_name || ':' || version) FROM v
+"""
+
+
+class DataVersions:
+    """Per-table change counters mirrored from the table_versions table.
+
+    Counters are shared by all workers, so a version tuple identifies the
+    same data everywhere. Until the counters have been loaded (the listener
+    is not running) versions() returns None and callers must not cache.
+    """
+
+    def __init__(self):
+        self._versions = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def versions(self, tables):
+        with self._lock:
+            if not self._loaded:
+                return None
+            return tuple(self._versions.get(table, 0) for table in sorted(tables))
+
+    def set(self, table, version):
+        with self._lock:
+            # Свое же уведомление приходит уже после локального обновления
+            if version <= self._versions.get(table, 0):
+                return False
+            self._versions[table] = version
+            return True
+
+    def load(self):
+        try:
+            with get_db_cursor() as cur:
+                cur.execute("SELECT table_name, version FROM table_versions")
+                rows = cur.fetchall()
+        except Exception as e:
+            logger.error(f"Error loading table versions: {e}")
+            with self._lock:
+                self._loaded = False
+            return
+        with self._lock:
+            self._versions = dict(rows)
+            self._loaded = True
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._versions) if self._loaded else None
+
+
+class QueryCache:
+    """Read-through cache for rarely changing query results.
+
+    Entries are bounded by TTL and by count (LRU) and are tagged with the
+    tables they were read from; invalidate(table) drops exactly the entries
+    that depend on it. Every table has a version counter, so a result read
+    while a write to one of its tables was committing is not stored.
+    """
+
+    def __init__(self, ttl, maxsize):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # key -> (expires_at, tables, value)
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.maxsize > 0
+
+    async def get_or_load(self, key, tables, load):
+        if not self.enabled:
+            return await load()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _copy(entry[2])
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            versions = self._snapshot(tables)
+
+        value = await load()
+
+        with self._lock:
+            if self._snapshot(tables) == versions:
+                self._entries[key] = (time.monotonic() + self.ttl, tables, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return _copy(value)
+
+    def invalidate(self, *tables):
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+            stale = [key for key, entry in self._entries.items() if not entry[1].isdisjoint(tables)]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            for table in self._versions:
+                self._versions[table] += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def _snapshot(self, tables):
+        return tuple(self._versions.get(table, 0) for table in sorted(tables))
+
+
+def _copy(value):
+    # Вызывающий код может менять строки, кеш должен остаться нетронутым
+    if isinstance(value, list):
+        return [dict(row) for row in value]
+    return value
+
+
+data_versions = DataVersions()
+catalogue_cache = QueryCache(Config.CATALOGUE_CACHE_TTL, Config.CATALOGUE_CACHE_SIZE)
+
+
+async def table_changed(*tables):
+    """Bump the version of tables after a write has committed.
+
+    Must be called after the write transaction, never inside it. If the bump
+    fails the data is already saved; caches catch up on the next bump or TTL.
+    """
+    try:
+        async with get_async_db_cursor() as cur:
+            await cur.execute(BUMP_VERSION_SQL, (sorted(tables),))
+            rows = await cur.fetchall()
+    except Exception as e:
+        logger.error(f"Error bumping table versions {tables}: {e}")
+        catalogue_cache.invalidate(*tables)
+        return
+    for table, version, _ in rows:
+        data_changed(table, version)
+
+
+def data_changed(table, version):
+    """Apply a committed write to the local caches.
+
+    table_changed calls it once the new version is committed, so the writing
+    worker sees its own change at once; other workers get it through the
+    notification.
+    """
+    if data_versions.set(table, version):
+        catalogue_cache.invalidate(table)
+
+
+def _on_notify(payload):
+    table, version = payload.rsplit(":", 1)
+    data_changed(table, int(version))
+
+
+def _on_reset():
+    catalogue_cache.clear()
+    data_versions.load()
+
+
+listener.subscribe(NOTIFY_CHANNEL, _on_notify, on_reset=_on_reset)
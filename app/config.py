@@ -5,7 +5,39 @@ load_dotenv()
 
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
+    TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+    SESSION_STORE = os.getenv("SESSION_STORE", "")  # "", "memory" или "postgres"
+    SESSION_TTL_HOURS = int(os.getenv("SESSION_TTL_HOURS", "5"))
+    # Сколько сессий держит кеш одного воркера; сверх лимита вытесняются давно не читанные
+    SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "100000"))
+    CATALOGUE_CACHE_TTL = float(os.getenv("CATALOGUE_CACHE_TTL", "60"))  # 0 отключает кеш
+    CATALOGUE_CACHE_SIZE = int(os.getenv("CATALOGUE_CACHE_SIZE", "256"))
+    PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", "256"))  # 0 отключает кеш страниц
+    STATS_ROLLUP = os.getenv("STATS_ROLLUP", "false").lower() == "true"  # счетчики из stats_rollup; триггеры ставит python -m app.migrate
     DATABASE_URL = f"dbname={os.getenv('DB_NAME')} user={os.getenv('DB_USER')} password={os.getenv('DB_PASSWORD')} host={os.getenv('DB_HOST')} port={os.getenv('DB_PORT', '5432')}"
-    UPLOAD_FOLDER = "app/static/uploads"
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
+    DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+    DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "20"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
+    DB_POOL_MAX_WAITING = int(os.getenv("DB_POOL_MAX_WAITING", "100"))  # очередь сверх этого сразу получает ошибку
+    DB_POOL_BACKGROUND_MAX_SIZE = int(os.getenv("DB_POOL_BACKGROUND_MAX_SIZE", "4"))  # синхронный пул фоновых путей
+    DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "3600"))
+    DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", "600"))
+    SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))  # 0 отключает лог медленных запросов
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    TEMPLATES_AUTO_RELOAD = os.getenv("TEMPLATES_AUTO_RELOAD", "false").lower() == "true"  # только для разработки
+    TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR", "")  # пусто - временный каталог jinja2
+    PRECOMPILE_TEMPLATES = os.getenv("PRECOMPILE_TEMPLATES", "false").lower() == "true"
+    UPLOAD_FOLDER = "app/uploads"  # вне app/static: файлы отдаются только через /files/{id}/download
+    MAX_CONTENT_LENGTH = int(os.getenv("MAX_CONTENT_LENGTH", 16 * 1024 * 1024))  # 16MB
+    MAX_FORM_OVERHEAD = 64 * 1024  # заголовки multipart и остальные поля формы сверх файла
+    UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+    DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))  # экспериментов за один запрос выгрузки
+    EXPORT_CHUNK_SIZE = 64 * 1024  # 64KB
+    IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))  # экспериментов на один COPY
+    IMPORT_MAX_ERRORS = 100  # сколько ошибок dry-run показывать
+    MIGRATION_LOCK_TIMEOUT = os.getenv("MIGRATION_LOCK_TIMEOUT", "5s")
+    MIGRATION_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", "5000"))  # строк за одну транзакцию backfill
+    MIGRATION_BATCH_PAUSE = float(os.getenv("MIGRATION_BATCH_PAUSE", "0"))  # пауза между пачками, секунды
     ALLOWED_EXTENSIONS = {'py', 'ipynb', 'json', 'h5', 'pkl', 'joblib'}
\ No newline at end of file
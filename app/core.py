@@ -1,5 +0,0 @@
-from fastapi.templating import Jinja2Templates
-import os
-
-# Create templates object
-templates = Jinja2Templates(directory="app/templates")
\ No newline at end of file
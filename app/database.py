@@ -1,13 +1,39 @@
-import psycopg2
-from psycopg2.pool import SimpleConnectionPool
-from contextlib import contextmanager
+from psycopg_pool import AsyncConnectionPool, ConnectionPool
+from contextlib import contextmanager, asynccontextmanager
 from app.config import Config
+from app.query_stats import TimedCursor, TimedAsyncCursor
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Увеличим пул соединений
-pool = SimpleConnectionPool(1, 20, dsn=Config.DATABASE_URL)
+# Синхронный пул для фоновых путей (сессии, загрузка версий таблиц, plan_check).
+# Запросы обслуживает async_pool, поэтому этому пулу хватает нескольких соединений
+pool = ConnectionPool(
+    Config.DATABASE_URL,
+    min_size=0,
+    max_size=Config.DB_POOL_BACKGROUND_MAX_SIZE,
+    timeout=Config.DB_POOL_TIMEOUT,
+    max_waiting=Config.DB_POOL_MAX_WAITING,
+    max_lifetime=Config.DB_POOL_MAX_LIFETIME,
+    max_idle=Config.DB_POOL_MAX_IDLE,
+    check=ConnectionPool.check_connection,
+    open=False,
+)
+
+# Асинхронный пул для обработчиков FastAPI; открывается в lifespan приложения.
+# check проверяет соединение при выдаче: после рестарта БД запрос не получит мертвое соединение
+async_pool = AsyncConnectionPool(
+    Config.DATABASE_URL,
+    min_size=Config.DB_POOL_MIN_SIZE,
+    max_size=Config.DB_POOL_MAX_SIZE,
+    timeout=Config.DB_POOL_TIMEOUT,
+    max_waiting=Config.DB_POOL_MAX_WAITING,
+    max_lifetime=Config.DB_POOL_MAX_LIFETIME,
+    max_idle=Config.DB_POOL_MAX_IDLE,
+    check=AsyncConnectionPool.check_connection,
+    open=False,
+)
+
 
 @contextmanager
 def get_db_connection():
@@ -22,11 +48,75 @@ def get_db_connection():
     finally:
         pool.putconn(conn)
 
+
 @contextmanager
 def get_db_cursor():
     with get_db_connection() as conn:
-        cur = conn.cursor()
+        cur = TimedCursor(conn)
+        try:
+            yield cur
+        finally:
+            cur.close()
+
+
+# Точный COUNT(*) по большой таблице дорог: выше порога берём оценку планировщика из pg_class
+COUNT_ESTIMATE_THRESHOLD = 10000
+
+
+def count_query(table):
+    # Вторая колонка - признак оценки: по ней нельзя считать границы страниц
+    return f"""
+        SELECT CASE WHEN c.reltuples > {COUNT_ESTIMATE_THRESHOLD} THEN c.reltuples::bigint
+                    ELSE (SELECT COUNT(*) FROM {table}) END AS total,
+               c.reltuples > {COUNT_ESTIMATE_THRESHOLD} AS approximate
+        FROM pg_class c
+        WHERE c.oid = '{table}'::regclass
+    """
+
+
+def count_result(row):
+    return dict(total=row[0], approximate=row[1])
+
+
+def get_pool_stats():
+    return {"sync": pool.get_stats(), "async": async_pool.get_stats()}
+
+
+def open_pool():
+    pool.open()
+
+
+def close_pool():
+    pool.close()
+
+
+async def open_async_pool():
+    await async_pool.open()
+
+
+async def close_async_pool():
+    await async_pool.close()
+
+
+@asynccontextmanager
+async def get_async_db_connection():
+    conn = await async_pool.getconn()
+    try:
+        yield conn
+        await conn.commit()
+    except Exception as e:
+        await conn.rollback()
+        logger.error(f"Database error: {e}")
+        raise
+    finally:
+        await async_pool.putconn(conn)
+
+
+@asynccontextmanager
+async def get_async_db_cursor():
+    async with get_async_db_connection() as conn:
+        cur = TimedAsyncCursor(conn)
         try:
             yield cur
         finally:
-            cur.close()
\ No newline at end of file
+            await cur.close()
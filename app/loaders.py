@@ -0,0 +1,70 @@
+import asyncio
+from fastapi import Request
+from app.repositories.user_repository import AsyncUserRepository
+
+
+class DataLoader:
+    """Batches and memoizes lookups by key for the lifetime of one request.
+
+    Keys requested before the event loop gets to run the dispatch task are
+    fetched with a single ``batch_fn(keys) -> {key: value}`` call; every key
+    is loaded at most once. Missing keys resolve to None.
+    """
+
+    def __init__(self, batch_fn):
+        self.batch_fn = batch_fn
+        self._cache = {}
+        self._queue = []
+
+    def load(self, key):
+        future = self._cache.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._cache[key] = future
+            if not self._queue:
+                loop.create_task(self._dispatch())
+            self._queue.append((key, future))
+        return future
+
+    async def load_many(self, keys):
+        return await asyncio.gather(*(self.load(key) for key in keys))
+
+    def clear(self, key):
+        # После изменения сущности следующий load снова пойдет в БД
+        self._cache.pop(key, None)
+
+    async def _dispatch(self):
+        queue, self._queue = self._queue, []
+        try:
+            values = await self.batch_fn([key for key, _ in queue])
+        except Exception as e:
+            for _, future in queue:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in queue:
+            if not future.done():
+                future.set_result(values.get(key))
+
+
+async def _load_users(user_ids):
+    rows = await AsyncUserRepository.get_many_with_usernames(user_ids)
+    return {row["id"]: row for row in rows}
+
+
+class Loaders:
+    # Только пользователи: списки и карточки лабораторных и файлов уже получают
+    # связанные строки JOIN-ом (get_assignments, AsyncModelRepository.get) и не
+    # делают запросов на каждую строку. Загрузчик для них добавляется здесь же,
+    # когда такой запрос появится.
+    def __init__(self):
+        # Пользователь вместе с username из credentials, одним запросом
+        self.users = DataLoader(_load_users)
+
+
+def get_loaders(request: Request):
+    loaders = getattr(request.state, "loaders", None)
+    if loaders is None:
+        loaders = request.state.loaders = Loaders()
+    return loaders
@@ -1,9 +1,10 @@
-from datetime import datetime
+from datetime import datetime, timezone
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
-from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 import os
 import traceback
 import logging
@@ -13,8 +14,27 @@ logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 from app.config import Config
+from app.database import open_pool, close_pool, open_async_pool, close_async_pool
+from app.notify import listener
+from app.storage import BodySizeLimitMiddleware
+from app.templates_loader import templates, precompile_templates
 
-app = FastAPI(title="ML Experiment Management System", debug=True)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    open_pool()
+    await open_async_pool()
+    listener.start()
+    if Config.PRECOMPILE_TEMPLATES:
+        count = await run_in_threadpool(precompile_templates)
+        logger.info(f"Precompiled {count} templates")
+    yield
+    listener.stop()
+    await close_async_pool()
+    close_pool()
+
+
+app = FastAPI(title="ML Experiment Management System", debug=True, lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -25,8 +45,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Templates and static files
-templates = Jinja2Templates(directory="app/templates")
+# Слишком большое тело отклоняем до того, как Starlette сбросит его во временный файл.
+# Импорт экспериментов читает поток сам и размером не ограничен
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_size=Config.MAX_CONTENT_LENGTH + Config.MAX_FORM_OVERHEAD,
+    exempt=("/experiments/import",),
+)
+
+# Static files
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
 # Create necessary directories
@@ -35,27 +62,8 @@ os.makedirs("app/templates/auth", exist_ok=True)
 os.makedirs("app/static/css", exist_ok=True)
 os.makedirs("app/static/js", exist_ok=True)
 
-
-# Добавляем фильтры для Jinja2
-def nl2br(value):
-    """Convert newlines to <br> tags."""
-    if not value:
-        return ''
-    return value.replace('\n', '<br>\n')
-
-
-def truncate(value, length=50, suffix='...'):
-    """Truncate a string."""
-    if len(value) <= length:
-        return value
-    return value[:length] + suffix
-
-
-templates.env.filters['nl2br'] = nl2br
-templates.env.filters['truncate'] = truncate
-
 # Теперь импортируем роутеры
-from app.routes import auth_routes, user_routes, file_routes, model_routes, experiment_routes, lab_routes
+from app.routes import auth_routes, user_routes, file_routes, model_routes, experiment_routes, lab_routes, admin_routes, api_routes
 
 # Include routers
 app.include_router(auth_routes.router)
@@ -64,13 +72,16 @@ app.include_router(file_routes.router)
 app.include_router(model_routes.router)
 app.include_router(experiment_routes.router)
 app.include_router(lab_routes.router)
+app.include_router(admin_routes.router)
+app.include_router(api_routes.router)
 
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     try:
         from app.auth import get_current_user
-        user = get_current_user(request)
+        # С SESSION_STORE=postgres проверка сессии может сходить в БД синхронным драйвером
+        user = await run_in_threadpool(get_current_user, request)
         logger.info(f"Home: User authenticated: {user}")
         return RedirectResponse(url="/dashboard")
     except Exception as e:
@@ -82,11 +93,15 @@ async def home(request: Request):
 async def dashboard(request: Request):
     try:
         from app.auth import get_current_user
-        user = get_current_user(request)
+        user = await run_in_threadpool(get_current_user, request)
         logger.info(f"Dashboard: User: {user}")
+        stats = None
+        if user["role"] == "admin":
+            from app.services.admin_service import AdminService
+            stats = await AdminService.get_system_stats()
         return templates.TemplateResponse(
             "dashboard.html",
-            {"request": request, "user": user, "now": datetime.utcnow()}
+            {"request": request, "user": user, "now": datetime.now(timezone.utc), "stats": stats}
         )
     except Exception as e:
         logger.error(f"Dashboard error: {e}")
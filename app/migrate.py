@@ -0,0 +1,261 @@
+"""Schema migration runner.
+
+Migrations live in app/migrations as NNNN_name.sql or NNNN_name.py and are
+applied in version order; applied versions are recorded in the
+schema_migrations table.
+
+* A .sql migration runs in one transaction together with its version
+  record. A file whose first line is "-- migrate: no-transaction" runs
+  statement by statement in autocommit mode instead, which is what
+  CREATE INDEX CONCURRENTLY needs; such statements must be idempotent
+  (IF NOT EXISTS), because a failed run is repeated from the start.
+* A .py migration defines upgrade(conn). It may call backfill() to update
+  a large table in small committed batches.
+
+0000_initial_schema only creates tables that are missing; on a database
+that predates the runner it leaves existing tables as they are. Every
+change to an existing table therefore ships as its own migration (0002
+adds files.sha256 and moves old uploads into the blob store), never as an
+edit of an applied file.
+
+Afterwards the stats_rollup triggers are installed or dropped to match
+STATS_ROLLUP (see app/stats_rollup.py).
+
+The web container runs this before uvicorn on every start; set
+MIGRATE_ON_START=false to skip that and run it as a separate deploy step.
+
+    python -m app.migrate            # apply pending migrations
+    python -m app.migrate --status   # show applied and pending versions
+"""
+import argparse
+import hashlib
+import importlib.util
+import logging
+import os
+import sys
+import time
+
+import psycopg2
+
+from app import stats_rollup
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "migrations")
+NO_TRANSACTION_MARK = "-- migrate: no-transaction"
+# Один запуск за раз, даже если стартуют несколько контейнеров
+ADVISORY_LOCK_KEY = 4_815_162_342
+
+CREATE_VERSIONS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version integer PRIMARY KEY,
+        name varchar(255) NOT NULL,
+        checksum char(64) NOT NULL,
+        applied_at timestamp NOT NULL DEFAULT now()
+    )
+"""
+
+INVALID_INDEXES_SQL = """
+    SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+    WHERE NOT i.indisvalid
+"""
+
+
+def discover():
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        stem, ext = os.path.splitext(filename)
+        version, _, name = stem.partition("_")
+        if ext not in (".sql", ".py") or not version.isdigit():
+            continue
+        path = os.path.join(MIGRATIONS_DIR, filename)
+        with open(path, "rb") as f:
+            source = f.read()
+        migrations.append(dict(
+            version=int(version), name=name, path=path, kind=ext[1:],
+            source=source.decode(), checksum=hashlib.sha256(source).hexdigest()
+        ))
+
+    versions = [m["version"] for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions in {MIGRATIONS_DIR}")
+    return migrations
+
+
+def split_statements(sql):
+    """Split a script on top-level semicolons, keeping quoted text and $$ bodies."""
+    statements = []
+    start = i = 0
+    n = len(sql)
+    while i < n:
+        if sql.startswith("--", i):
+            i = sql.find("\n", i)
+            i = n if i < 0 else i
+        elif sql[i] == "'":
+            i = sql.find("'", i + 1)
+            i = n if i < 0 else i
+        elif sql[i] == "$":
+            end = sql.find("$", i + 1)
+            if end > 0 and (end == i + 1 or sql[i + 1:end].isidentifier()):
+                tag = sql[i:end + 1]
+                close = sql.find(tag, end + 1)
+                i = n if close < 0 else close + len(tag) - 1
+        elif sql[i] == ";":
+            statements.append(sql[start:i])
+            start = i + 1
+        i += 1
+    statements.append(sql[start:])
+    return [s.strip() for s in statements if _strip_comments(s).strip()]
+
+
+def _strip_comments(statement):
+    return "\n".join(line for line in statement.splitlines() if not line.strip().startswith("--"))
+
+
+def backfill(conn, sql, params=None, batch_size=None):
+    """Repeat a batched UPDATE/INSERT until it touches fewer rows than a batch.
+
+    The statement limits itself with %(batch_size)s, e.g.
+    UPDATE t SET c = ... WHERE id IN (SELECT id FROM t WHERE c IS NULL LIMIT %(batch_size)s).
+    Every batch is committed on its own, so row locks are short-lived and
+    the work already done survives an interruption.
+    """
+    batch_size = batch_size or Config.MIGRATION_BATCH_SIZE
+    total = 0
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(sql, {**(params or {}), "batch_size": batch_size})
+            count = cur.rowcount
+        conn.commit()
+        total += count
+        if count < batch_size:
+            return total
+        logger.info(f"Backfilled {total} rows")
+        if Config.MIGRATION_BATCH_PAUSE:
+            time.sleep(Config.MIGRATION_BATCH_PAUSE)
+
+
+def _record(cur, migration):
+    cur.execute(
+        "INSERT INTO schema_migrations(version, name, checksum) VALUES (%s, %s, %s)",
+        (migration["version"], migration["name"], migration["checksum"])
+    )
+
+
+def _apply_sql(conn, migration):
+    if not migration["source"].startswith(NO_TRANSACTION_MARK):
+        with conn.cursor() as cur:
+            cur.execute(migration["source"])
+            _record(cur, migration)
+        conn.commit()
+        return
+
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            # CONCURRENTLY ждет завершения чужих транзакций, не блокируя запись
+            cur.execute("SET lock_timeout = 0")
+            for statement in split_statements(migration["source"]):
+                cur.execute(statement)
+            # Прерванный CREATE INDEX CONCURRENTLY оставляет невалидный индекс,
+            # который IF NOT EXISTS при повторе молча пропустит
+            cur.execute(INVALID_INDEXES_SQL)
+            invalid = [row[0] for row in cur.fetchall()]
+            if invalid:
+                raise RuntimeError(f"Invalid indexes left behind, drop them and rerun: {', '.join(invalid)}")
+            _record(cur, migration)
+    finally:
+        with conn.cursor() as cur:
+            cur.execute("SET lock_timeout = %s", (Config.MIGRATION_LOCK_TIMEOUT,))
+        conn.autocommit = False
+
+
+def _apply_python(conn, migration):
+    spec = importlib.util.spec_from_file_location(f"app.migrations.m{migration['version']}", migration["path"])
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.upgrade(conn)
+    with conn.cursor() as cur:
+        _record(cur, migration)
+    conn.commit()
+
+
+def connect():
+    conn = psycopg2.connect(Config.DATABASE_URL)
+    with conn.cursor() as cur:
+        # Лучше упасть и повторить позже, чем держать очередь запросов за блокировкой
+        cur.execute("SET lock_timeout = %s", (Config.MIGRATION_LOCK_TIMEOUT,))
+        cur.execute(CREATE_VERSIONS_TABLE_SQL)
+    conn.commit()
+    return conn
+
+
+def applied_versions(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT version, checksum, applied_at FROM schema_migrations")
+        rows = cur.fetchall()
+    conn.commit()
+    return {row[0]: dict(checksum=row[1], applied_at=row[2]) for row in rows}
+
+
+def migrate(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_lock(%s)", (ADVISORY_LOCK_KEY,))
+    conn.commit()
+    try:
+        applied = applied_versions(conn)
+        pending = [m for m in discover() if m["version"] not in applied]
+        for migration in pending:
+            logger.info(f"Applying {migration['version']:04d}_{migration['name']}")
+            started = time.monotonic()
+            try:
+                if migration["kind"] == "sql":
+                    _apply_sql(conn, migration)
+                else:
+                    _apply_python(conn, migration)
+            except Exception:
+                conn.rollback()
+                raise
+            logger.info(f"Applied {migration['version']:04d}_{migration['name']} in {time.monotonic() - started:.1f}s")
+        # Триггеры счетчиков не часть схемы: они есть, только пока включен STATS_ROLLUP
+        stats_rollup.sync(conn)
+        return len(pending)
+    finally:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (ADVISORY_LOCK_KEY,))
+        conn.commit()
+
+
+def status(conn):
+    applied = applied_versions(conn)
+    for migration in discover():
+        record = applied.get(migration["version"])
+        if record is None:
+            state = "pending"
+        elif record["checksum"] != migration["checksum"]:
+            state = f"applied {record['applied_at']:%Y-%m-%d %H:%M} (file changed since)"
+        else:
+            state = f"applied {record['applied_at']:%Y-%m-%d %H:%M}"
+        print(f"{migration['version']:04d}_{migration['name']:<30} {state}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply database schema migrations.")
+    parser.add_argument("--status", action="store_true", help="list migrations and exit")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    conn = connect()
+    try:
+        if args.status:
+            status(conn)
+        else:
+            print(f"Applied {migrate(conn)} migrations")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,10 +11,18 @@ create table if not exists credentials (
     pass varchar(100)
 );
 
+create table if not exists blobs (
+	sha256 char(64) primary key,
+	path varchar(255),
+	size bigint,
+	ref_count integer not null default 0
+);
+
 create table if not exists files (
 	id bigserial primary key,
 	name varchar(50),
-	path varchar(255)
+	path varchar(255),
+	sha256 char(64) references blobs(sha256)
 );
 
 create table if not exists models (
@@ -69,3 +77,19 @@ create table if not exists assigned_labs (
 	grade float default null,
 	primary key (lab_id, student_id)
 );
+
+
+create table if not exists sessions (
+	id char(64) primary key,
+	user_id bigint references users(id) on delete cascade,
+	user_role varchar(20),
+	expires_at timestamp
+);
+
+create index if not exists sessions_user_id_idx on sessions(user_id);
+
+
+create table if not exists table_versions (
+	table_name varchar(63) primary key,
+	version bigint not null default 0
+);
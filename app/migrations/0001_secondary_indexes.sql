@@ -0,0 +1,43 @@
+-- migrate: no-transaction
+-- Вторичные индексы для фильтров и соединений, которые иначе читают таблицу целиком.
+-- concurrently не блокирует запись, но не работает внутри транзакции,
+-- поэтому миграция выполняется по одной команде.
+
+-- get_by_experiment, param_count в списке экспериментов, экспорт, upsert по имени
+create index concurrently if not exists experiment_parameters_experiment_id_idx
+	on experiment_parameters(experiment_id, id) include (name, value);
+
+-- get_by_type и фильтр списка моделей по типу с сортировкой по id
+create index concurrently if not exists models_model_type_idx on models(model_type, id);
+
+-- соединение files -> models и проверка внешнего ключа при удалении файла
+create index concurrently if not exists models_file_id_idx on models(file_id);
+
+-- get_by_model, фильтр и счетчик списка экспериментов по модели
+create index concurrently if not exists experiments_model_id_idx on experiments(model_id, id);
+
+-- get_student_labs: первичный ключ (lab_id, student_id) не помогает искать по студенту
+create index concurrently if not exists assigned_labs_student_id_idx
+	on assigned_labs(student_id, lab_id) include (grade);
+create index concurrently if not exists lab_results_student_id_idx on lab_results(student_id);
+
+-- постраничный список лабораторных по ключу (deadline, id)
+create index concurrently if not exists labs_deadline_id_idx on labs(deadline desc nulls last, id desc);
+
+-- get_by_role и назначение лабораторной всем студентам
+create index concurrently if not exists users_user_role_idx on users(user_role, id);
+
+-- Массовый импорт быстро меняет распределение данных: пересчитываем статистику
+-- чаще, чем по умолчанию (10% таблицы), чтобы планировщик видел новые индексы
+alter table experiments set (autovacuum_analyze_scale_factor = 0.02);
+alter table experiment_parameters set (autovacuum_analyze_scale_factor = 0.02);
+alter table assigned_labs set (autovacuum_analyze_scale_factor = 0.05);
+alter table lab_results set (autovacuum_analyze_scale_factor = 0.05);
+
+analyze users;
+analyze models;
+analyze experiments;
+analyze experiment_parameters;
+analyze labs;
+analyze assigned_labs;
+analyze lab_results;
@@ -0,0 +1,101 @@
+"""Move files uploaded before the blob store into it.
+
+0000 creates files with a sha256 column only on an empty database, so an
+existing files table gets the column and its foreign key here. Every file
+still without a hash is then hashed from disk, stored as a blob and
+counted in blobs.ref_count, one committed batch at a time.
+"""
+import logging
+import os
+
+from app.config import Config
+from app.storage import stage_file, store_blob, blob_path, discard_upload
+
+logger = logging.getLogger(__name__)
+
+# Где лежали загрузки до хранилища blobs; пути в files указаны относительно него
+LEGACY_UPLOAD_FOLDER = "app/static/uploads"
+
+ADD_COLUMN_SQL = """
+    ALTER TABLE files ADD COLUMN IF NOT EXISTS sha256 char(64);
+    CREATE TABLE IF NOT EXISTS blobs (
+        sha256 char(64) PRIMARY KEY,
+        path varchar(255),
+        size bigint,
+        ref_count integer NOT NULL DEFAULT 0
+    );
+"""
+
+CONSTRAINT_EXISTS_SQL = "SELECT 1 FROM pg_constraint WHERE conname = 'files_sha256_fkey'"
+
+# NOT VALID не проверяет существующие строки и не держит долгую блокировку
+ADD_CONSTRAINT_SQL = """
+    ALTER TABLE files ADD CONSTRAINT files_sha256_fkey
+        FOREIGN KEY (sha256) REFERENCES blobs(sha256) NOT VALID
+"""
+
+VALIDATE_CONSTRAINT_SQL = "ALTER TABLE files VALIDATE CONSTRAINT files_sha256_fkey"
+
+PENDING_SQL = """
+    SELECT id, path FROM files
+    WHERE sha256 IS NULL AND path IS NOT NULL AND id > %s
+    ORDER BY id LIMIT %s
+"""
+
+ADD_REF_SQL = """
+    INSERT INTO blobs(sha256, path, size, ref_count) VALUES (%s, %s, %s, 1)
+    ON CONFLICT (sha256) DO UPDATE SET ref_count = blobs.ref_count + 1
+"""
+
+SET_BLOB_SQL = "UPDATE files SET sha256 = %s, path = %s WHERE id = %s"
+
+
+def upgrade(conn):
+    with conn.cursor() as cur:
+        cur.execute(ADD_COLUMN_SQL)
+        cur.execute(CONSTRAINT_EXISTS_SQL)
+        if cur.fetchone() is None:
+            cur.execute(ADD_CONSTRAINT_SQL)
+    conn.commit()
+
+    os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
+    last_id = 0
+    moved = missing = 0
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(PENDING_SQL, (last_id, Config.MIGRATION_BATCH_SIZE))
+            rows = cur.fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        originals = []
+        with conn.cursor() as cur:
+            for file_id, path in rows:
+                source = os.path.join(LEGACY_UPLOAD_FOLDER, path)
+                if not os.path.isfile(source):
+                    # Строка остается без хеша: скачивание и удаление работают с ней по path
+                    missing += 1
+                    continue
+                tmp_path, size, sha256 = stage_file(source)
+                try:
+                    store_blob(tmp_path, sha256)
+                finally:
+                    discard_upload(tmp_path)
+                cur.execute(ADD_REF_SQL, (sha256, blob_path(sha256), size))
+                cur.execute(SET_BLOB_SQL, (sha256, blob_path(sha256), file_id))
+                originals.append(source)
+        conn.commit()
+
+        # Исходники удаляем только после коммита, иначе при сбое строки ссылались бы в пустоту
+        for source in originals:
+            if os.path.exists(source):  # несколько строк могли ссылаться на один файл
+                os.remove(source)
+        moved += len(originals)
+        logger.info(f"Moved {moved} files into the blob store")
+
+    with conn.cursor() as cur:
+        cur.execute(VALIDATE_CONSTRAINT_SQL)
+    conn.commit()
+    if missing:
+        logger.warning(f"{missing} files are missing on disk and were left without a hash")
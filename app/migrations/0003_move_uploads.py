@@ -0,0 +1,47 @@
+"""Move uploads out of app/static.
+
+Everything under app/static is served without authentication by the
+/static mount, so stored files move to Config.UPLOAD_FOLDER. Paths in the
+files and blobs tables are relative to the upload folder and stay as they
+are.
+"""
+import logging
+import os
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+OLD_UPLOAD_FOLDER = "app/static/uploads"
+
+
+def upgrade(conn):
+    if not os.path.isdir(OLD_UPLOAD_FOLDER):
+        return
+    os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
+    if os.path.samefile(OLD_UPLOAD_FOLDER, Config.UPLOAD_FOLDER):
+        return
+
+    moved = kept = 0
+    for root, _, filenames in os.walk(OLD_UPLOAD_FOLDER):
+        for filename in filenames:
+            relative = os.path.relpath(os.path.join(root, filename), OLD_UPLOAD_FOLDER)
+            source = os.path.join(OLD_UPLOAD_FOLDER, relative)
+            target = os.path.join(Config.UPLOAD_FOLDER, relative)
+            if os.path.exists(target):
+                if relative.startswith("blobs" + os.sep):
+                    # blob с тем же хешем уже на месте, содержимое совпадает
+                    os.remove(source)
+                else:
+                    kept += 1
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(source, target)
+            moved += 1
+
+    for root, dirs, filenames in os.walk(OLD_UPLOAD_FOLDER, topdown=False):
+        if not os.listdir(root):
+            os.rmdir(root)
+    logger.info(f"Moved {moved} files from {OLD_UPLOAD_FOLDER} to {Config.UPLOAD_FOLDER}")
+    if kept:
+        logger.warning(f"{kept} files in {OLD_UPLOAD_FOLDER} clash with existing ones and were left there")
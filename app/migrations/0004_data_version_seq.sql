@@ -0,0 +1,5 @@
+-- Версии таблиц берутся из общей последовательности: nextval не ждет чужих
+-- транзакций, в отличие от version = version + 1 на строке table_versions
+create sequence if not exists data_version_seq;
+
+select setval('data_version_seq', greatest((select max(version) from table_versions), 1));
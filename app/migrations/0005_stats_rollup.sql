@@ -0,0 +1,84 @@
+-- Таблица счетчиков для панели администратора, читается при STATS_ROLLUP=true.
+-- Триггеры уровня оператора обновляют ее одной вставкой на INSERT/UPDATE/DELETE,
+-- поэтому COPY на тысячи строк не превращается в тысячи обновлений одной строки.
+-- Миграция выполняется в одной транзакции вместе с пересчетом счетчиков с нуля.
+
+create table if not exists stats_rollup (
+	metric varchar(50),
+	key varchar(50) not null default '',
+	count bigint not null default 0,
+	primary key (metric, key)
+);
+
+-- tg_argv[0] - имя счетчика, tg_argv[1] - колонка группировки (необязательна)
+create or replace function stats_rollup_trigger() returns trigger as $$
+declare
+	key_expr text := case when tg_nargs > 1
+		then format('coalesce(%I::text, '''')', tg_argv[1]) else '''''' end;
+	upsert text := 'insert into stats_rollup(metric, key, count) select %L, %s, %s count(*) from %I group by 2 '
+		'on conflict (metric, key) do update set count = stats_rollup.count + excluded.count';
+begin
+	if tg_op in ('DELETE', 'UPDATE') then
+		execute format(upsert, tg_argv[0], key_expr, '-', 'old_rows');
+	end if;
+	if tg_op in ('INSERT', 'UPDATE') then
+		execute format(upsert, tg_argv[0], key_expr, '', 'new_rows');
+	end if;
+	return null;
+end;
+$$ language plpgsql;
+
+drop trigger if exists users_stats_insert on users;
+drop trigger if exists users_stats_update on users;
+drop trigger if exists users_stats_delete on users;
+create trigger users_stats_insert after insert on users referencing new table as new_rows
+	for each statement execute function stats_rollup_trigger('users_by_role', 'user_role');
+create trigger users_stats_update after update on users referencing old table as old_rows new table as new_rows
+	for each statement execute function stats_rollup_trigger('users_by_role', 'user_role');
+create trigger users_stats_delete after delete on users referencing old table as old_rows
+	for each statement execute function stats_rollup_trigger('users_by_role', 'user_role');
+
+drop trigger if exists models_stats_insert on models;
+drop trigger if exists models_stats_update on models;
+drop trigger if exists models_stats_delete on models;
+create trigger models_stats_insert after insert on models referencing new table as new_rows
+	for each statement execute function stats_rollup_trigger('models_by_type', 'model_type');
+create trigger models_stats_update after update on models referencing old table as old_rows new table as new_rows
+	for each statement execute function stats_rollup_trigger('models_by_type', 'model_type');
+create trigger models_stats_delete after delete on models referencing old table as old_rows
+	for each statement execute function stats_rollup_trigger('models_by_type', 'model_type');
+
+drop trigger if exists experiments_stats_insert on experiments;
+drop trigger if exists experiments_stats_delete on experiments;
+create trigger experiments_stats_insert after insert on experiments referencing new table as new_rows
+	for each statement execute function stats_rollup_trigger('experiments');
+create trigger experiments_stats_delete after delete on experiments referencing old table as old_rows
+	for each statement execute function stats_rollup_trigger('experiments');
+
+drop trigger if exists labs_stats_insert on labs;
+drop trigger if exists labs_stats_delete on labs;
+create trigger labs_stats_insert after insert on labs referencing new table as new_rows
+	for each statement execute function stats_rollup_trigger('labs');
+create trigger labs_stats_delete after delete on labs referencing old table as old_rows
+	for each statement execute function stats_rollup_trigger('labs');
+
+drop trigger if exists files_stats_insert on files;
+drop trigger if exists files_stats_delete on files;
+create trigger files_stats_insert after insert on files referencing new table as new_rows
+	for each statement execute function stats_rollup_trigger('files');
+create trigger files_stats_delete after delete on files referencing old table as old_rows
+	for each statement execute function stats_rollup_trigger('files');
+
+-- Пересчет с нуля; запись в таблицы блокируется до конца транзакции
+lock table users, models, experiments, labs, files in share row exclusive mode;
+delete from stats_rollup;
+insert into stats_rollup(metric, key, count)
+select 'users_by_role', coalesce(user_role, ''), count(*) from users group by 2
+union all
+select 'models_by_type', coalesce(model_type, ''), count(*) from models group by 2
+union all
+select 'experiments', '', count(*) from experiments
+union all
+select 'labs', '', count(*) from labs
+union all
+select 'files', '', count(*) from files;
@@ -0,0 +1,78 @@
+import logging
+import select
+import threading
+
+import psycopg2
+from psycopg2 import extensions
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationListener:
+    """A single LISTEN connection per worker that dispatches NOTIFY payloads.
+
+    Subscribers register a callback per channel and, optionally, an on_reset
+    hook called whenever the connection is (re)established: notifications
+    sent while the listener was down are lost, so local caches must be
+    dropped at that point.
+    """
+
+    def __init__(self):
+        self._handlers = {}
+        self._resets = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, channel, callback, on_reset=None):
+        self._handlers.setdefault(channel, []).append(callback)
+        if on_reset is not None:
+            self._resets.append(on_reset)
+
+    def start(self):
+        if not self._handlers or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen, name="pg-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _listen(self):
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(Config.DATABASE_URL)
+                conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    for channel in self._handlers:
+                        cur.execute(f"LISTEN {channel}")
+                for reset in self._resets:
+                    reset()
+
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], 1.0)[0]:
+                        conn.poll()
+                        while conn.notifies:
+                            self._dispatch(conn.notifies.pop(0))
+            except Exception as e:
+                logger.error(f"Notification listener error: {e}")
+                self._stop.wait(5)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def _dispatch(self, notification):
+        for callback in self._handlers.get(notification.channel, ()):
+            try:
+                callback(notification.payload)
+            except Exception as e:
+                logger.error(f"Error handling notification on {notification.channel}: {e}")
+
+
+listener = NotificationListener()
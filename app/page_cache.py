@@ -0,0 +1,98 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from fastapi.responses import HTMLResponse, Response
+
+from app.cache import data_versions
+from app.config import Config
+from app.templates_loader import templates, templates_dir
+
+_fingerprint = None
+
+
+def _templates_fingerprint():
+    # ETag должен меняться при выкладке новых шаблонов, одинаково во всех воркерах
+    global _fingerprint
+    if _fingerprint is None:
+        digest = hashlib.sha256()
+        for name in sorted(templates.env.list_templates()):
+            digest.update(name.encode())
+            with open(os.path.join(templates_dir, name), "rb") as f:
+                digest.update(f.read())
+        _fingerprint = digest.hexdigest()
+    return _fingerprint
+
+
+class PageCache:
+    """LRU cache of rendered pages keyed by ETag."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, etag):
+        with self._lock:
+            body = self._pages.get(etag)
+            if body is None:
+                self.misses += 1
+                return None
+            self._pages.move_to_end(etag)
+            self.hits += 1
+            return body
+
+    def put(self, etag, body):
+        with self._lock:
+            self._pages[etag] = body
+            self._pages.move_to_end(etag)
+            while len(self._pages) > self.maxsize:
+                self._pages.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._pages),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+            }
+
+
+page_cache = PageCache(Config.PAGE_CACHE_SIZE)
+
+
+async def render_cached(request, user, template, tables, load_context):
+    """Render a list page, reusing earlier renders while its data is unchanged.
+
+    The page is identified by (template, role, query params, versions of
+    ``tables``); load_context() is awaited only when that page has not been
+    rendered yet. A matching If-None-Match gets a 304 without either.
+    """
+    versions = data_versions.versions(tables)
+    if versions is None or page_cache.maxsize <= 0:
+        context = await load_context()
+        return templates.TemplateResponse(template, {"request": request, "user": user, **context})
+
+    key = repr((
+        _templates_fingerprint(), template, user["role"],
+        sorted(request.query_params.multi_items()), versions
+    ))
+    etag = f'"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if etag in request.headers.get("if-none-match", ""):
+        page_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+
+    body = page_cache.get(etag)
+    if body is None:
+        context = await load_context()
+        body = templates.get_template(template).render({"request": request, "user": user, **context})
+        page_cache.put(etag, body)
+    return HTMLResponse(body, headers=headers)
@@ -0,0 +1,21 @@
+def page_context(page, per_page, count, shown):
+    """Template context for a paginated list.
+
+    count is what the repositories' count() returns. An estimated total is
+    only displayed: the last page is unknown then, and "Next" is offered
+    while the current page comes back full.
+    """
+    if count["approximate"]:
+        total_pages = None
+        has_next = shown >= per_page
+    else:
+        total_pages = (count["total"] + per_page - 1) // per_page
+        has_next = page < total_pages
+    return {
+        "page": page,
+        "per_page": per_page,
+        "total": count["total"],
+        "total_approximate": count["approximate"],
+        "total_pages": total_pages,
+        "has_next": has_next,
+    }
@@ -0,0 +1,32 @@
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from passlib.hash import bcrypt
+from app.config import Config
+
+# bcrypt отпускает GIL на время хеширования, поэтому пула потоков достаточно;
+# размер пула ограничивает число одновременных хеширований
+_executor = ThreadPoolExecutor(max_workers=Config.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_hasher = bcrypt.using(rounds=Config.BCRYPT_ROUNDS)
+
+
+def _prehash(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def hash_password(password):
+    return _hasher.hash(_prehash(password))
+
+
+def verify_password(password, stored_hash):
+    return bcrypt.verify(_prehash(password), stored_hash)
+
+
+async def hash_password_async(password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, hash_password, password)
+
+
+async def verify_password_async(password, stored_hash):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, verify_password, password, stored_hash)
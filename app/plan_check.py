@@ -0,0 +1,267 @@
+"""Query plan regression check for repository reads.
+
+Runs every read query of the repositories through EXPLAIN against a local
+database and reports sequential scans of tables that are expected to be
+read through an index. Plans can be saved and compared with a baseline so a
+dropped index or a changed query shows up as a plan change.
+
+    python -m app.plan_check --seed 100000   # only into an empty database
+    python -m app.plan_check --seed 100000 --allow-seed
+    python -m app.plan_check --save plans.json
+    python -m app.plan_check --baseline plans.json
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from app import database
+from app.database import get_db_cursor, open_pool, close_pool, open_async_pool, close_async_pool
+from app.migrate import split_statements
+from app.query_stats import TimedAsyncCursor
+from app.repositories import (
+    AsyncUserRepository, AsyncCredentialsRepository, AsyncFileRepository, AsyncModelRepository,
+    AsyncExperimentRepository, AsyncParameterRepository, AsyncLabRepository, AsyncStatsRepository,
+)
+
+# Полный просмотр таблицы меньше этого размера дешев, планировщик выбирает его сам
+MIN_ROWS = 1000
+
+# Запросы, которые читают таблицу целиком намеренно (точный COUNT(*) ниже
+# порога оценки и группировки для статистики)
+ALLOWED_SEQ_SCANS = {
+    "AsyncUserRepository.count": {"users"},
+    "AsyncFileRepository.count": {"files"},
+    "AsyncLabRepository.count": {"labs"},
+    "AsyncStatsRepository.get_counts": {"users", "models", "experiments", "labs", "files"},
+}
+
+SEED_SQL = """
+    INSERT INTO users(full_name, email, user_role)
+    SELECT 'plan-check ' || g, 'plan-check-' || g || '@example.com',
+           (ARRAY['student', 'researcher', 'teacher', 'admin'])[1 + g %% 4]
+    FROM generate_series(1, %(users)s) g
+    ON CONFLICT (email) DO NOTHING;
+
+    INSERT INTO models(name, description, model_type)
+    SELECT 'plan-check ' || g, '', (ARRAY['classification', 'regression', 'clustering'])[1 + g %% 3]
+    FROM generate_series(1, %(models)s) g;
+
+    INSERT INTO experiments(name, description, model_id)
+    SELECT 'plan-check ' || g, '', m.ids[1 + g %% array_length(m.ids, 1)]
+    FROM generate_series(1, %(experiments)s) g,
+         (SELECT array_agg(id) AS ids FROM models WHERE name LIKE 'plan-check %%') m;
+
+    INSERT INTO experiment_parameters(experiment_id, name, value)
+    SELECT e.id, 'p' || k, k::text
+    FROM experiments e, generate_series(1, 5) k
+    WHERE e.name LIKE 'plan-check %%';
+
+    INSERT INTO labs(id, name, instruction, deadline)
+    SELECT id, name, '', current_date + (id %% 60)::int
+    FROM experiments
+    WHERE name LIKE 'plan-check %%' AND id %% 10 = 0
+    ON CONFLICT (id) DO NOTHING;
+
+    INSERT INTO assigned_labs(lab_id, student_id)
+    SELECT l.id, u.id
+    FROM labs l JOIN users u ON (l.id + u.id) %% 20 = 0
+    WHERE l.name LIKE 'plan-check %%' AND u.user_role = 'student'
+    ON CONFLICT DO NOTHING;
+
+    INSERT INTO lab_results(lab_id, student_id, value, submitted_at)
+    SELECT lab_id, student_id, 'done', current_date
+    FROM assigned_labs
+    WHERE lab_id %% 3 = 0
+    ON CONFLICT DO NOTHING;
+
+    ANALYZE;
+"""
+
+SAMPLE_SQL = """
+    SELECT (SELECT max(id) FROM users) AS user,
+           (SELECT max(id) FROM files) AS file,
+           (SELECT max(id) FROM models) AS model,
+           (SELECT model_type FROM models ORDER BY id DESC LIMIT 1) AS model_type,
+           (SELECT max(id) FROM experiments) AS experiment,
+           (SELECT max(id) FROM experiment_parameters) AS parameter,
+           a.lab_id AS lab, a.student_id AS student
+    FROM (SELECT lab_id, student_id FROM assigned_labs ORDER BY lab_id DESC LIMIT 1) a
+"""
+
+# Синтетические строки нельзя отличить от настоящих иначе как по имени,
+# поэтому без --allow-seed заполняем только пустую базу
+HAS_DATA_SQL = "SELECT EXISTS (SELECT 1 FROM users) OR EXISTS (SELECT 1 FROM experiments)"
+
+SIZES_SQL = "SELECT relname, reltuples FROM pg_class WHERE relkind = 'r' AND relnamespace = 'public'::regnamespace"
+
+
+class _ExplainingCursor(TimedAsyncCursor):
+    """Cursor that records the plan of every statement before running it."""
+
+    plans = None  # список для планов текущей проверки
+
+    async def execute(self, query, params=None, **kwargs):
+        await super().execute(f"EXPLAIN (FORMAT JSON) {query}", params, **kwargs)
+        self.plans.append((await self.fetchone())[0][0]["Plan"])
+        return await super().execute(query, params, **kwargs)
+
+
+def _nodes(plan):
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from _nodes(child)
+
+
+def _signature(plan):
+    parts = []
+    for node in _nodes(plan):
+        label = node["Node Type"]
+        if "Relation Name" in node:
+            label += f" on {node['Relation Name']}"
+        if "Index Name" in node:
+            label += f" using {node['Index Name']}"
+        parts.append(label)
+    return parts
+
+
+def _checks(s):
+    return [
+        ("AsyncUserRepository.get", lambda: AsyncUserRepository.get(s["user"])),
+        ("AsyncUserRepository.get_all", lambda: AsyncUserRepository.get_all(limit=20, after_id=s["user"] - 100)),
+        ("AsyncUserRepository.get_all_with_usernames", lambda: AsyncUserRepository.get_all_with_usernames(limit=20)),
+        ("AsyncUserRepository.get_many_with_usernames", lambda: AsyncUserRepository.get_many_with_usernames([s["user"]])),
+        ("AsyncUserRepository.get_by_email", lambda: AsyncUserRepository.get_by_email("plan-check-1@example.com")),
+        ("AsyncUserRepository.get_by_role", lambda: AsyncUserRepository.get_by_role("admin")),
+        ("AsyncUserRepository.count", lambda: AsyncUserRepository.count()),
+        ("AsyncCredentialsRepository.get_by_user_id", lambda: AsyncCredentialsRepository.get_by_user_id(s["user"])),
+        ("AsyncCredentialsRepository.username_exists", lambda: AsyncCredentialsRepository.username_exists("plan-check")),
+        ("AsyncFileRepository.get", lambda: AsyncFileRepository.get(s["file"] or 0)),
+        ("AsyncFileRepository.get_all", lambda: AsyncFileRepository.get_all(limit=20)),
+        ("AsyncFileRepository.get_by_model", lambda: AsyncFileRepository.get_by_model(s["model"])),
+        ("AsyncFileRepository.count", lambda: AsyncFileRepository.count()),
+        ("AsyncModelRepository.get", lambda: AsyncModelRepository.get(s["model"])),
+        ("AsyncModelRepository.get_page", lambda: AsyncModelRepository.get_page(20, model_type=s["model_type"])),
+        ("AsyncModelRepository.count", lambda: AsyncModelRepository.count(model_type=s["model_type"])),
+        ("AsyncModelRepository.get_existing_ids", lambda: AsyncModelRepository.get_existing_ids([s["model"]])),
+        ("AsyncModelRepository.get_by_type", lambda: AsyncModelRepository.get_by_type(s["model_type"])),
+        ("AsyncExperimentRepository.get", lambda: AsyncExperimentRepository.get(s["experiment"])),
+        ("AsyncExperimentRepository.get_page", lambda: AsyncExperimentRepository.get_page(20, model_id=s["model"])),
+        ("AsyncExperimentRepository.count", lambda: AsyncExperimentRepository.count(model_id=s["model"])),
+        ("AsyncExperimentRepository.get_by_model", lambda: AsyncExperimentRepository.get_by_model(s["model"])),
+        ("AsyncParameterRepository.get", lambda: AsyncParameterRepository.get(s["parameter"])),
+        ("AsyncParameterRepository.get_by_experiment", lambda: AsyncParameterRepository.get_by_experiment(s["experiment"])),
+        ("AsyncLabRepository.get", lambda: AsyncLabRepository.get(s["lab"])),
+        ("AsyncLabRepository.get_all", lambda: AsyncLabRepository.get_all(limit=20)),
+        ("AsyncLabRepository.count", lambda: AsyncLabRepository.count()),
+        ("AsyncLabRepository.get_assignments", lambda: AsyncLabRepository.get_assignments(s["lab"])),
+        ("AsyncLabRepository.get_student_labs", lambda: AsyncLabRepository.get_student_labs(s["student"])),
+        ("AsyncLabRepository.get_student_lab", lambda: AsyncLabRepository.get_student_lab(s["lab"], s["student"])),
+        ("AsyncStatsRepository.get_counts", lambda: AsyncStatsRepository.get_counts()),
+    ]
+
+
+def seed(scale, allow_nonempty=False):
+    with get_db_cursor() as cur:
+        cur.execute(HAS_DATA_SQL)
+        has_data = cur.fetchone()[0]
+    if has_data and not allow_nonempty:
+        raise SystemExit(
+            "Refusing to seed: the database already has data. "
+            "Point DB_NAME at a scratch database or pass --allow-seed."
+        )
+
+    sizes = {
+        "users": max(scale // 10, 100),
+        "models": max(scale // 100, 10),
+        "experiments": scale,
+    }
+    with get_db_cursor() as cur:
+        # psycopg 3 с параметрами выполняет только одну команду за раз
+        for statement in split_statements(SEED_SQL):
+            cur.execute(statement, sizes)
+
+
+async def collect_plans():
+    with get_db_cursor() as cur:
+        cur.execute(SAMPLE_SQL)
+        row = cur.fetchone()
+        columns = [column.name for column in cur.description]
+    if row is None or row[columns.index("experiment")] is None:
+        raise SystemExit("Database has no data to explain against, run with --seed first")
+    samples = dict(zip(columns, row))
+
+    plans = {}
+    # get_async_db_cursor создает курсор этого класса для всех репозиториев
+    database.TimedAsyncCursor = _ExplainingCursor
+    await open_async_pool()
+    try:
+        for name, call in _checks(samples):
+            _ExplainingCursor.plans = plans[name] = []
+            await call()
+    finally:
+        database.TimedAsyncCursor = TimedAsyncCursor
+        await close_async_pool()
+    return plans
+
+
+def table_sizes():
+    with get_db_cursor() as cur:
+        cur.execute(SIZES_SQL)
+        return dict(cur.fetchall())
+
+
+def find_problems(plans, sizes, baseline=None):
+    problems = []
+    for name, statements in plans.items():
+        allowed = ALLOWED_SEQ_SCANS.get(name, set())
+        for plan in statements:
+            for node in _nodes(plan):
+                table = node.get("Relation Name")
+                if (node["Node Type"] == "Seq Scan" and table not in allowed
+                        and sizes.get(table, 0) >= MIN_ROWS):
+                    problems.append(f"{name}: Seq Scan on {table}")
+
+        if baseline is not None and name in baseline:
+            old = baseline[name]
+            new = [_signature(plan) for plan in statements]
+            if old != new:
+                problems.append(f"{name}: plan changed\n    was: {old}\n    now: {new}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--seed", type=int, metavar="N", help="insert N synthetic experiments first")
+    parser.add_argument("--allow-seed", action="store_true", help="seed even if the database is not empty")
+    parser.add_argument("--save", metavar="FILE", help="write plan signatures to FILE")
+    parser.add_argument("--baseline", metavar="FILE", help="compare plans with signatures in FILE")
+    args = parser.parse_args(argv)
+
+    open_pool()
+    try:
+        if args.seed:
+            seed(args.seed, allow_nonempty=args.allow_seed)
+        plans = asyncio.run(collect_plans())
+        sizes = table_sizes()
+    finally:
+        close_pool()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({name: [_signature(p) for p in statements] for name, statements in plans.items()}, f, indent=2)
+
+    problems = find_problems(plans, sizes, baseline)
+    for problem in problems:
+        print(f"FAIL {problem}")
+    print(f"Checked {len(plans)} queries, {len(problems)} problems")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+import logging
+import sys
+import threading
+import time
+
+from psycopg import AsyncCursor, Cursor
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Верхние границы корзин гистограммы, мс
+HISTOGRAM_BOUNDS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+SLOW_QUERY_TEXT_LIMIT = 500
+
+
+class QueryStats:
+    """Per-caller statement timings: calls, rows, errors and a latency histogram.
+
+    The caller is the repository method that ran the statement, so the
+    number of entries is bounded by the code, not by the queries' params.
+    """
+
+    def __init__(self, slow_ms):
+        self.slow_ms = slow_ms
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._since = time.time()
+
+    def record(self, caller, query, params, seconds, rows, failed):
+        ms = seconds * 1000
+        with self._lock:
+            entry = self._entries.get(caller)
+            if entry is None:
+                entry = self._entries[caller] = {
+                    "calls": 0, "errors": 0, "rows": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "buckets": [0] * (len(HISTOGRAM_BOUNDS_MS) + 1),
+                }
+            entry["calls"] += 1
+            entry["errors"] += failed
+            entry["rows"] += max(rows, 0)
+            entry["total_ms"] += ms
+            entry["max_ms"] = max(entry["max_ms"], ms)
+            entry["buckets"][_bucket(ms)] += 1
+
+        if self.slow_ms and ms >= self.slow_ms:
+            logger.warning(
+                f"Slow query {ms:.1f}ms in {caller}, rows={rows}, "
+                f"params={params_shape(params)}: {_query_text(query)}"
+            )
+
+    def stats(self):
+        with self._lock:
+            entries = {caller: dict(entry, buckets=list(entry["buckets"])) for caller, entry in self._entries.items()}
+            since = self._since
+
+        queries = []
+        for caller, entry in entries.items():
+            queries.append({
+                "caller": caller,
+                "calls": entry["calls"],
+                "errors": entry["errors"],
+                "rows": entry["rows"],
+                "total_ms": round(entry["total_ms"], 3),
+                "mean_ms": round(entry["total_ms"] / entry["calls"], 3),
+                "max_ms": round(entry["max_ms"], 3),
+                "p50_ms": _percentile(entry["buckets"], entry["calls"], 0.5),
+                "p95_ms": _percentile(entry["buckets"], entry["calls"], 0.95),
+                "histogram": dict(zip(_bucket_labels(), entry["buckets"])),
+            })
+        queries.sort(key=lambda q: q["total_ms"], reverse=True)
+        return {"since": since, "slow_ms": self.slow_ms, "queries": queries}
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+            self._since = time.time()
+
+
+def _bucket(ms):
+    for i, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+        if ms <= bound:
+            return i
+    return len(HISTOGRAM_BOUNDS_MS)
+
+
+def _bucket_labels():
+    return [f"<={bound}ms" for bound in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]}ms"]
+
+
+def _percentile(buckets, calls, fraction):
+    # Оценка сверху: граница корзины, в которую попадает процентиль
+    target = calls * fraction
+    seen = 0
+    for i, count in enumerate(buckets):
+        seen += count
+        if seen >= target:
+            return HISTOGRAM_BOUNDS_MS[i] if i < len(HISTOGRAM_BOUNDS_MS) else None
+    return None
+
+
+def params_shape(params):
+    """Types and sizes of the parameters, never their values."""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: _shape(value) for key, value in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [_shape(value) for value in params]
+    return _shape(params)
+
+
+def _shape(value):
+    if isinstance(value, (str, bytes, list, tuple, dict, set)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def _query_text(query):
+    text = query.decode() if isinstance(query, bytes) else str(query)
+    return " ".join(text.split())[:SLOW_QUERY_TEXT_LIMIT]
+
+
+def _caller(depth=2, limit=8):
+    # Ближайший метод репозитория в стеке; иначе первая функция вне слоя БД
+    frame = sys._getframe(depth)
+    fallback = None
+    for _ in range(limit):
+        if frame is None:
+            break
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("app.repositories."):
+            return frame.f_code.co_qualname
+        if fallback is None and module.startswith("app.") and module not in ("app.database", __name__):
+            fallback = f"{module}.{frame.f_code.co_qualname}"
+        frame = frame.f_back
+    return fallback or "unknown"
+
+
+class TimedCursor(Cursor):
+    """psycopg 3 cursor that reports every statement to query_stats."""
+
+    def execute(self, query, params=None, **kwargs):
+        caller = _caller()
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = super().execute(query, params, **kwargs)
+            failed = False
+            return result
+        finally:
+            query_stats.record(caller, query, params, time.perf_counter() - started, self.rowcount, failed)
+
+    def executemany(self, query, params_seq, **kwargs):
+        caller = _caller()
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = super().executemany(query, params_seq, **kwargs)
+            failed = False
+            return result
+        finally:
+            query_stats.record(caller, query, None, time.perf_counter() - started, self.rowcount, failed)
+
+
+class TimedAsyncCursor(AsyncCursor):
+    """psycopg 3 async cursor that reports every statement to query_stats."""
+
+    async def execute(self, query, params=None, **kwargs):
+        caller = _caller()
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = await super().execute(query, params, **kwargs)
+            failed = False
+            return result
+        finally:
+            query_stats.record(caller, query, params, time.perf_counter() - started, self.rowcount, failed)
+
+    async def executemany(self, query, params_seq, **kwargs):
+        caller = _caller()
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = await super().executemany(query, params_seq, **kwargs)
+            failed = False
+            return result
+        finally:
+            query_stats.record(caller, query, None, time.perf_counter() - started, self.rowcount, failed)
+
+
+query_stats = QueryStats(Config.SLOW_QUERY_MS)
@@ -1,17 +1,19 @@
-from .user_repository import UserRepository
-from .credentials_repository import CredentialsRepository
-from .file_repository import FileRepository
-from .model_repository import ModelRepository
-from .experiment_repository import ExperimentRepository
-from .parameter_repository import ParameterRepository
-from .lab_repository import LabRepository
+from .user_repository import AsyncUserRepository
+from .credentials_repository import AsyncCredentialsRepository
+from .file_repository import AsyncFileRepository
+from .model_repository import AsyncModelRepository
+from .experiment_repository import AsyncExperimentRepository
+from .parameter_repository import AsyncParameterRepository
+from .lab_repository import AsyncLabRepository
+from .stats_repository import AsyncStatsRepository
 
 __all__ = [
-    'UserRepository',
-    'CredentialsRepository',
-    'FileRepository',
-    'ModelRepository',
-    'ExperimentRepository',
-    'ParameterRepository',
-    'LabRepository'
+    'AsyncUserRepository',
+    'AsyncCredentialsRepository',
+    'AsyncFileRepository',
+    'AsyncModelRepository',
+    'AsyncExperimentRepository',
+    'AsyncParameterRepository',
+    'AsyncLabRepository',
+    'AsyncStatsRepository'
 ]
\ No newline at end of file
@@ -1,62 +1,59 @@
-import hashlib
-from passlib.hash import bcrypt
-from app.database import get_db_cursor
+from app.database import get_async_db_cursor
+from app.passwords import hash_password_async, verify_password_async
 
 
-class CredentialsRepository:
+class AsyncCredentialsRepository:
     @staticmethod
-    def add(user_id, username, password):
-        hashed = bcrypt.hash(hashlib.sha256(password.encode()).hexdigest())
-        with get_db_cursor() as cur:
-            cur.execute(
+    async def add(user_id, username, password):
+        hashed = await hash_password_async(password)
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
                 "INSERT INTO credentials(id, username, pass) VALUES (%s, %s, %s)",
                 (user_id, username, hashed)
             )
 
     @staticmethod
-    def auth(username, password):
-        with get_db_cursor() as cur:
-            cur.execute(
+    async def auth(username, password):
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
                 "SELECT id, pass FROM credentials WHERE username=%s",
                 (username,)
             )
-            row = cur.fetchone()
-            if not row:
-                return None
-
-            user_id, stored_hash = row
+            row = await cur.fetchone()
+        if not row:
+            return None
 
-            password_sha256 = hashlib.sha256(password.encode()).hexdigest()
-            if bcrypt.verify(password_sha256, stored_hash):
-                return user_id
+        # Проверяем пароль уже после возврата соединения в пул
+        user_id, stored_hash = row
+        if await verify_password_async(password, stored_hash):
+            return user_id
 
-            return None
+        return None
 
     @staticmethod
-    def get_by_user_id(user_id):
-        with get_db_cursor() as cur:
-            cur.execute(
+    async def get_by_user_id(user_id):
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
                 "SELECT username FROM credentials WHERE id=%s",
                 (user_id,)
             )
-            row = cur.fetchone()
+            row = await cur.fetchone()
             return row[0] if row else None
 
     @staticmethod
-    def update_password(user_id, new_password):
-        password_sha256 = hashlib.sha256(new_password.encode()).hexdigest()
-        hashed = bcrypt.hash(password_sha256)
-        with get_db_cursor() as cur:
-            cur.execute(
+    async def update_password(user_id, new_password):
+        hashed = await hash_password_async(new_password)
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
                 "UPDATE credentials SET pass=%s WHERE id=%s",
                 (hashed, user_id)
             )
 
     @staticmethod
-    def username_exists(username):
-        with get_db_cursor() as cur:
-            cur.execute(
+    async def username_exists(username):
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
                 "SELECT 1 FROM credentials WHERE username=%s",
                 (username,)
             )
-            return cur.fetchone() is not None
\ No newline at end of file
+            return await cur.fetchone() is not None
@@ -1,11 +1,20 @@
-from app.database import get_db_cursor
+from app.database import get_async_db_cursor, get_async_db_connection, count_query, count_result
+from app.cache import catalogue_cache, table_changed
 
+# id экспериментов резервируем заранее: COPY не умеет RETURNING, а id нужны параметрам
+RESERVE_IDS_SQL = "SELECT nextval(pg_get_serial_sequence('experiments', 'id')) FROM generate_series(1, %s)"
+COPY_EXPERIMENTS_SQL = "COPY experiments(id, name, description, model_id) FROM STDIN"
+COPY_PARAMETERS_SQL = "COPY experiment_parameters(experiment_id, name, value) FROM STDIN"
 
-class ExperimentRepository:
+# Таблицы, от которых зависит закешированный результат get_all
+CATALOGUE_TABLES = frozenset({"experiments", "models", "experiment_parameters"})
+
+
+class AsyncExperimentRepository:
     @staticmethod
-    def get(exp_id):
-        with get_db_cursor() as cur:
-            cur.execute(
+    async def get(exp_id):
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
                 """
                 SELECT e.id, e.name, e.description, e.model_id,
                        m.name as model_name
@@ -15,7 +24,7 @@ class ExperimentRepository:
                 """,
                 (exp_id,)
             )
-            r = cur.fetchone()
+            r = await cur.fetchone()
             if not r:
                 return None
             return dict(
@@ -24,20 +33,49 @@ class ExperimentRepository:
             )
 
     @staticmethod
-    def get_all():
-        with get_db_cursor() as cur:
-            cur.execute(
-                """
+    async def get_all(limit=None, offset=0, model_id=None):
+        return await catalogue_cache.get_or_load(
+            ("experiments", limit, offset, model_id),
+            CATALOGUE_TABLES,
+            lambda: AsyncExperimentRepository._get_all(limit, offset, None, model_id)
+        )
+
+    @staticmethod
+    async def get_page(limit, before_id=None, model_id=None):
+        # Страницы API по курсору мимо кеша: каждый курсор дал бы в нем отдельную запись
+        return await AsyncExperimentRepository._get_all(limit, 0, before_id, model_id)
+
+    @staticmethod
+    async def _get_all(limit, offset, before_id, model_id):
+        async with get_async_db_cursor() as cur:
+            conditions = []
+            params = []
+
+            if model_id:
+                conditions.append("e.model_id = %s")
+                params.append(model_id)
+            if before_id:
+                conditions.append("e.id < %s")
+                params.append(before_id)
+
+            # Параметры считаем подзапросом только для строк текущей страницы
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            params.extend([limit, offset])
+            await cur.execute(
+                f"""
                 SELECT e.id, e.name, e.description, e.model_id,
-                       m.name as model_name, COUNT(p.id) as param_count
+                       m.name as model_name,
+                       (SELECT COUNT(*) FROM experiment_parameters p
+                        WHERE p.experiment_id = e.id) as param_count
                 FROM experiments e
                 LEFT JOIN models m ON e.model_id = m.id
-                LEFT JOIN experiment_parameters p ON e.id = p.experiment_id
-                GROUP BY e.id, e.name, e.description, e.model_id, m.name
+                {where}
                 ORDER BY e.id DESC
-                """
+                LIMIT %s OFFSET %s
+                """,
+                params
             )
-            rows = cur.fetchall()
+            rows = await cur.fetchall()
             return [
                 dict(
                     id=row[0], name=row[1], description=row[2],
@@ -46,17 +84,28 @@ class ExperimentRepository:
             ]
 
     @staticmethod
-    def add(name, description, model_id):
-        with get_db_cursor() as cur:
-            cur.execute(
+    async def count(model_id=None):
+        async with get_async_db_cursor() as cur:
+            if model_id:
+                await cur.execute("SELECT COUNT(*), false FROM experiments WHERE model_id=%s", (model_id,))
+            else:
+                await cur.execute(count_query("experiments"))
+            return count_result(await cur.fetchone())
+
+    @staticmethod
+    async def add(name, description, model_id):
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
                 "INSERT INTO experiments(name, description, model_id) VALUES (%s, %s, %s) RETURNING id",
                 (name, description, model_id)
             )
-            return cur.fetchone()[0]
+            row = await cur.fetchone()
+        await table_changed("experiments")
+        return row[0]
 
     @staticmethod
-    def update(exp_id, name=None, description=None, model_id=None):
-        with get_db_cursor() as cur:
+    async def update(exp_id, name=None, description=None, model_id=None):
+        async with get_async_db_cursor() as cur:
             updates = []
             params = []
 
@@ -72,22 +121,78 @@ class ExperimentRepository:
 
             if updates:
                 params.append(exp_id)
-                cur.execute(
+                await cur.execute(
                     f"UPDATE experiments SET {', '.join(updates)} WHERE id = %s",
                     params
                 )
+        if updates:
+            await table_changed("experiments")
 
     @staticmethod
-    def delete(exp_id):
-        with get_db_cursor() as cur:
-            cur.execute("DELETE FROM experiments WHERE id=%s", (exp_id,))
+    async def delete(exp_id):
+        async with get_async_db_cursor() as cur:
+            await cur.execute("DELETE FROM experiments WHERE id=%s", (exp_id,))
+        await table_changed("experiments")
 
     @staticmethod
-    def get_by_model(model_id):
-        with get_db_cursor() as cur:
-            cur.execute(
+    async def get_by_model(model_id):
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
                 "SELECT id, name FROM experiments WHERE model_id=%s ORDER BY id DESC",
                 (model_id,)
             )
-            rows = cur.fetchall()
-            return [dict(id=row[0], name=row[1]) for row in rows]
\ No newline at end of file
+            rows = await cur.fetchall()
+            return [dict(id=row[0], name=row[1]) for row in rows]
+
+    @staticmethod
+    async def iter_with_parameters(model_id=None, batch_size=500):
+        # Читаем пачками по batch_size экспериментов (keyset по id), каждая пачка - в своей
+        # короткой транзакции: соединение возвращается в пул, пока клиент скачивает ответ.
+        # Цена - нет единого снимка: правки во время выгрузки видны в еще не прочитанных пачках
+        filter_sql = "AND model_id = %s" if model_id else ""
+        last_id = 0
+        while True:
+            async with get_async_db_cursor() as cur:
+                await cur.execute(
+                    f"""
+                    SELECT e.id, e.name, e.description, e.model_id, m.name, p.name, p.value
+                    FROM (
+                        SELECT id, name, description, model_id FROM experiments
+                        WHERE id > %s {filter_sql}
+                        ORDER BY id LIMIT %s
+                    ) e
+                    LEFT JOIN models m ON e.model_id = m.id
+                    LEFT JOIN experiment_parameters p ON p.experiment_id = e.id
+                    ORDER BY e.id, p.id
+                    """,
+                    (last_id, model_id, batch_size) if model_id else (last_id, batch_size)
+                )
+                rows = await cur.fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row
+            last_id = rows[-1][0]
+
+    @staticmethod
+    async def import_batches(batches):
+        async with get_async_db_connection() as conn:
+            async with conn.cursor() as cur:
+                async for batch in batches:
+                    await cur.execute(RESERVE_IDS_SQL, (len(batch),))
+                    ids = [row[0] for row in await cur.fetchall()]
+
+                    async with cur.copy(COPY_EXPERIMENTS_SQL) as copy:
+                        for exp_id, (name, description, model_id, _) in zip(ids, batch):
+                            await copy.write_row((exp_id, name, description, model_id))
+
+                    param_count = 0
+                    async with cur.copy(COPY_PARAMETERS_SQL) as copy:
+                        for exp_id, (_, _, _, parameters) in zip(ids, batch):
+                            for name, value in parameters.items():
+                                await copy.write_row((exp_id, name, str(value)))
+                                param_count += 1
+
+                    yield len(batch), param_count
+
+        await table_changed("experiments", "experiment_parameters")
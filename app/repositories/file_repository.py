@@ -1,40 +1,113 @@
-from app.database import get_db_cursor
+from starlette.concurrency import run_in_threadpool
+from app.database import get_async_db_cursor, count_query, count_result
+from app.storage import blob_path, store_blob, remove_stored
 
-class FileRepository:
+# Перенос файла в хранилище и удаление blob с диска сериализуются по хешу:
+# add держит блокировку, пока кладет файл, delete - пока проверяет и удаляет
+BLOB_LOCK_SQL = "SELECT pg_advisory_xact_lock(hashtextextended(%s, 0))"
+
+class AsyncFileRepository:
     @staticmethod
-    def get(file_id):
-        with get_db_cursor() as cur:
-            cur.execute("SELECT id, name, path FROM files WHERE id=%s", (file_id,))
-            r = cur.fetchone()
+    async def get(file_id):
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
+                """
+                SELECT f.id, f.name, f.path, f.sha256, b.size
+                FROM files f
+                LEFT JOIN blobs b ON f.sha256 = b.sha256
+                WHERE f.id=%s
+                """,
+                (file_id,)
+            )
+            r = await cur.fetchone()
             if not r:
                 return None
-            return dict(id=r[0], name=r[1], path=r[2])
+            return dict(id=r[0], name=r[1], path=r[2], sha256=r[3], size=r[4])
 
     @staticmethod
-    def get_all():
-        with get_db_cursor() as cur:
-            cur.execute("SELECT id, name, path FROM files ORDER BY id DESC")
-            rows = cur.fetchall()
+    async def get_all(limit=None, offset=0, before_id=None):
+        async with get_async_db_cursor() as cur:
+            where = ""
+            params = []
+
+            if before_id:
+                where = "WHERE id < %s"
+                params.append(before_id)
+
+            params.extend([limit, offset])
+            await cur.execute(
+                f"SELECT id, name, path FROM files {where} ORDER BY id DESC LIMIT %s OFFSET %s",
+                params
+            )
+            rows = await cur.fetchall()
             return [dict(id=row[0], name=row[1], path=row[2]) for row in rows]
 
     @staticmethod
-    def add(name, path):
-        with get_db_cursor() as cur:
-            cur.execute(
-                "INSERT INTO files(name, path) VALUES (%s, %s) RETURNING id",
-                (name, path)
+    async def count():
+        async with get_async_db_cursor() as cur:
+            await cur.execute(count_query("files"))
+            return count_result(await cur.fetchone())
+
+    @staticmethod
+    async def add(name, tmp_path, sha256, size):
+        async with get_async_db_cursor() as cur:
+            path = blob_path(sha256)
+            await cur.execute(BLOB_LOCK_SQL, (sha256,))
+            await cur.execute(
+                """
+                INSERT INTO blobs(sha256, path, size, ref_count) VALUES (%s, %s, %s, 1)
+                ON CONFLICT (sha256) DO UPDATE SET ref_count = blobs.ref_count + 1
+                """,
+                (sha256, path, size)
+            )
+            await run_in_threadpool(store_blob, tmp_path, sha256)
+            await cur.execute(
+                "INSERT INTO files(name, path, sha256) VALUES (%s, %s, %s) RETURNING id",
+                (name, path, sha256)
             )
-            return cur.fetchone()[0]
+            return (await cur.fetchone())[0]
 
     @staticmethod
-    def delete(file_id):
-        with get_db_cursor() as cur:
-            cur.execute("DELETE FROM files WHERE id=%s", (file_id,))
+    async def delete(file_id):
+        async with get_async_db_cursor() as cur:
+            await cur.execute("DELETE FROM files WHERE id=%s RETURNING path, sha256", (file_id,))
+            r = await cur.fetchone()
+            if not r:
+                return
+            path, sha256 = r
+
+            orphaned = sha256 is None  # файл загружен до появления хранилища blobs
+            if not orphaned:
+                await cur.execute(
+                    "UPDATE blobs SET ref_count = ref_count - 1 WHERE sha256=%s RETURNING ref_count",
+                    (sha256,)
+                )
+                r = await cur.fetchone()
+                if r and r[0] <= 0:
+                    await cur.execute("DELETE FROM blobs WHERE sha256=%s", (sha256,))
+                    orphaned = True
+
+        # Файл удаляем только после коммита: при откате строка снова ссылается на него
+        if not orphaned:
+            return
+        if sha256 is None:
+            await run_in_threadpool(remove_stored, path)
+            return
+        await AsyncFileRepository._remove_blob(path, sha256)
+
+    @staticmethod
+    async def _remove_blob(path, sha256):
+        async with get_async_db_cursor() as cur:
+            await cur.execute(BLOB_LOCK_SQL, (sha256,))
+            # Пока мы ждали блокировку, тот же файл мог быть загружен заново
+            await cur.execute("SELECT 1 FROM blobs WHERE sha256=%s", (sha256,))
+            if await cur.fetchone() is None:
+                await run_in_threadpool(remove_stored, path)
 
     @staticmethod
-    def get_by_model(model_id):
-        with get_db_cursor() as cur:
-            cur.execute(
+    async def get_by_model(model_id):
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
                 """
                 SELECT f.id, f.name, f.path 
                 FROM files f 
@@ -43,7 +116,7 @@ class FileRepository:
                 """,
                 (model_id,)
             )
-            r = cur.fetchone()
+            r = await cur.fetchone()
             if not r:
                 return None
-            return dict(id=r[0], name=r[1], path=r[2])
\ No newline at end of file
+            return dict(id=r[0], name=r[1], path=r[2])
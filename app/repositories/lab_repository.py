@@ -1,12 +1,13 @@
 from datetime import datetime
-from app.database import get_db_cursor
+from app.database import get_async_db_cursor, count_query, count_result
+from app.cache import table_changed
 
 
-class LabRepository:
+class AsyncLabRepository:
     @staticmethod
-    def get(lab_id):
-        with get_db_cursor() as cur:
-            cur.execute(
+    async def get(lab_id):
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
                 """
                 SELECT l.id, l.name, l.instruction, l.deadline, l.id,
                        e.name as experiment_name
@@ -16,7 +17,7 @@ class LabRepository:
                 """,
                 (lab_id,)
             )
-            r = cur.fetchone()
+            r = await cur.fetchone()
             if not r:
                 return None
             return dict(
@@ -25,23 +26,40 @@ class LabRepository:
             )
 
     @staticmethod
-    def get_all():
-        with get_db_cursor() as cur:
-            cur.execute(
-                """
+    async def get_all(limit=None, offset=0, before=None):
+        # before - ключ (deadline, id) последней строки предыдущей страницы;
+        # лабораторные без срока идут в конце списка
+        async with get_async_db_cursor() as cur:
+            where = ""
+            params = []
+
+            if before:
+                deadline, before_id = before
+                if deadline is None:
+                    where = "WHERE l.deadline IS NULL AND l.id < %s"
+                    params.append(before_id)
+                else:
+                    where = "WHERE (l.deadline < %s OR l.deadline IS NULL OR (l.deadline = %s AND l.id < %s))"
+                    params.extend([deadline, deadline, before_id])
+
+            params.extend([limit, offset])
+            await cur.execute(
+                f"""
                 SELECT l.id, l.name, l.instruction, l.deadline, l.id,
                        e.name as experiment_name,
-                       COUNT(DISTINCT al.student_id) as assigned_count,
-                       COUNT(DISTINCT lr.student_id) as submitted_count
+                       (SELECT COUNT(*) FROM assigned_labs al
+                        WHERE al.lab_id = l.id) as assigned_count,
+                       (SELECT COUNT(*) FROM lab_results lr
+                        WHERE lr.lab_id = l.id) as submitted_count
                 FROM labs l
                 LEFT JOIN experiments e ON l.id = e.id
-                LEFT JOIN assigned_labs al ON l.id = al.lab_id
-                LEFT JOIN lab_results lr ON l.id = lr.lab_id
-                GROUP BY l.id, l.name, l.instruction, l.deadline, l.id, e.name
-                ORDER BY l.deadline DESC
-                """
+                {where}
+                ORDER BY l.deadline DESC NULLS LAST, l.id DESC
+                LIMIT %s OFFSET %s
+                """,
+                params
             )
-            rows = cur.fetchall()
+            rows = await cur.fetchall()
             return [
                 dict(
                     id=row[0], name=row[1], instruction=row[2], deadline=row[3],
@@ -51,17 +69,25 @@ class LabRepository:
             ]
 
     @staticmethod
-    def add(name, instruction, deadline, experiment_id):
-        with get_db_cursor() as cur:
-            cur.execute(
+    async def count():
+        async with get_async_db_cursor() as cur:
+            await cur.execute(count_query("labs"))
+            return count_result(await cur.fetchone())
+
+    @staticmethod
+    async def add(name, instruction, deadline, experiment_id):
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
                 "INSERT INTO labs(name, instruction, deadline, id) VALUES (%s, %s, %s, %s) RETURNING id",
                 (name, instruction, deadline, experiment_id)
             )
-            return cur.fetchone()[0]
+            row = await cur.fetchone()
+        await table_changed("labs")
+        return row[0]
 
     @staticmethod
-    def update(lab_id, name=None, instruction=None, deadline=None, experiment_id=None):
-        with get_db_cursor() as cur:
+    async def update(lab_id, name=None, instruction=None, deadline=None, experiment_id=None):
+        async with get_async_db_cursor() as cur:
             updates = []
             params = []
 
@@ -80,36 +106,89 @@ class LabRepository:
 
             if updates:
                 params.append(lab_id)
-                cur.execute(
+                await cur.execute(
                     f"UPDATE labs SET {', '.join(updates)} WHERE id = %s",
                     params
                 )
+        if updates:
+            await table_changed("labs")
 
     @staticmethod
-    def delete(lab_id):
-        with get_db_cursor() as cur:
-            cur.execute("DELETE FROM labs WHERE id=%s", (lab_id,))
+    async def delete(lab_id):
+        async with get_async_db_cursor() as cur:
+            await cur.execute("DELETE FROM labs WHERE id=%s", (lab_id,))
+        await table_changed("labs")
 
     @staticmethod
-    def assign(lab_id, student_id):
-        with get_db_cursor() as cur:
-            cur.execute(
+    async def assign(lab_id, student_id):
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
                 "INSERT INTO assigned_labs(lab_id, student_id) VALUES (%s, %s) ON CONFLICT DO NOTHING",
                 (lab_id, student_id)
             )
+        await table_changed("assigned_labs")
+
+    @staticmethod
+    async def assign_many(lab_id, student_ids):
+        if not student_ids:
+            return 0
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
+                """
+                INSERT INTO assigned_labs(lab_id, student_id)
+                SELECT %s, student_id FROM unnest(%s::bigint[]) AS t(student_id)
+                ON CONFLICT DO NOTHING
+                """,
+                (lab_id, list(student_ids))
+            )
+            assigned = cur.rowcount
+        await table_changed("assigned_labs")
+        return assigned
+
+    @staticmethod
+    async def assign_all_students(lab_id):
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
+                """
+                INSERT INTO assigned_labs(lab_id, student_id)
+                SELECT %s, id FROM users WHERE user_role = 'student'
+                ON CONFLICT DO NOTHING
+                """,
+                (lab_id,)
+            )
+            assigned = cur.rowcount
+        await table_changed("assigned_labs")
+        return assigned
 
     @staticmethod
-    def grade(lab_id, student_id, grade):
-        with get_db_cursor() as cur:
-            cur.execute(
+    async def grade(lab_id, student_id, grade):
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
                 "UPDATE assigned_labs SET grade=%s WHERE lab_id=%s AND student_id=%s",
                 (grade, lab_id, student_id)
             )
 
     @staticmethod
-    def get_assignments(lab_id):
-        with get_db_cursor() as cur:
-            cur.execute(
+    async def grade_many(lab_id, grades):
+        # grades - список пар (student_id, grade); возвращает id реально обновлённых студентов
+        if not grades:
+            return []
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
+                """
+                UPDATE assigned_labs al SET grade = g.grade
+                FROM unnest(%s::bigint[], %s::float8[]) AS g(student_id, grade)
+                WHERE al.lab_id = %s AND al.student_id = g.student_id
+                RETURNING al.student_id
+                """,
+                ([student_id for student_id, _ in grades], [grade for _, grade in grades], lab_id)
+            )
+            return [row[0] for row in await cur.fetchall()]
+
+    @staticmethod
+    async def get_assignments(lab_id):
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
                 """
                 SELECT al.student_id, u.full_name, u.email, al.grade
                 FROM assigned_labs al
@@ -119,16 +198,16 @@ class LabRepository:
                 """,
                 (lab_id,)
             )
-            rows = cur.fetchall()
+            rows = await cur.fetchall()
             return [
                 dict(student_id=row[0], full_name=row[1], email=row[2], grade=row[3])
                 for row in rows
             ]
 
     @staticmethod
-    def get_student_labs(student_id):
-        with get_db_cursor() as cur:
-            cur.execute(
+    async def get_student_labs(student_id):
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
                 """
                 SELECT l.id, l.name, l.instruction, l.deadline, al.grade,
                        lr.value as submission, lr.submitted_at
@@ -140,7 +219,7 @@ class LabRepository:
                 """,
                 (student_id,)
             )
-            rows = cur.fetchall()
+            rows = await cur.fetchall()
             return [
                 dict(
                     id=row[0], name=row[1], instruction=row[2], deadline=row[3],
@@ -149,9 +228,32 @@ class LabRepository:
             ]
 
     @staticmethod
-    def submit_lab(lab_id, student_id, value):
-        with get_db_cursor() as cur:
-            cur.execute(
+    async def get_student_lab(lab_id, student_id):
+        # Поиск по первичным ключам assigned_labs и lab_results - одна строка
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
+                """
+                SELECT l.id, l.name, l.instruction, l.deadline, al.grade,
+                       lr.value as submission, lr.submitted_at
+                FROM assigned_labs al
+                JOIN labs l ON al.lab_id = l.id
+                LEFT JOIN lab_results lr ON lr.lab_id = al.lab_id AND lr.student_id = al.student_id
+                WHERE al.lab_id = %s AND al.student_id = %s
+                """,
+                (lab_id, student_id)
+            )
+            r = await cur.fetchone()
+            if not r:
+                return None
+            return dict(
+                id=r[0], name=r[1], instruction=r[2], deadline=r[3],
+                grade=r[4], submission=r[5], submitted_at=r[6]
+            )
+
+    @staticmethod
+    async def submit_lab(lab_id, student_id, value):
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
                 """
                 INSERT INTO lab_results(lab_id, student_id, value, submitted_at)
                 VALUES (%s, %s, %s, %s)
@@ -159,4 +261,5 @@ class LabRepository:
                 DO UPDATE SET value = EXCLUDED.value, submitted_at = EXCLUDED.submitted_at
                 """,
                 (lab_id, student_id, value, datetime.utcnow())
-            )
\ No newline at end of file
+            )
+        await table_changed("lab_results")
@@ -1,11 +1,15 @@
-from app.database import get_db_cursor
+from app.database import get_async_db_cursor, count_query, count_result
+from app.cache import catalogue_cache, table_changed
 
+# Таблицы, от которых зависит закешированный результат get_all
+CATALOGUE_TABLES = frozenset({"models"})
 
-class ModelRepository:
+
+class AsyncModelRepository:
     @staticmethod
-    def get(model_id):
-        with get_db_cursor() as cur:
-            cur.execute(
+    async def get(model_id):
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
                 """
                 SELECT m.id, m.name, m.description, m.model_type, m.file_id,
                        f.name as file_name, f.path as file_path
@@ -15,7 +19,7 @@ class ModelRepository:
                 """,
                 (model_id,)
             )
-            r = cur.fetchone()
+            r = await cur.fetchone()
             if not r:
                 return None
             return dict(
@@ -24,18 +28,46 @@ class ModelRepository:
             )
 
     @staticmethod
-    def get_all():
-        with get_db_cursor() as cur:
-            cur.execute(
-                """
+    async def get_all(limit=None, offset=0, model_type=None):
+        return await catalogue_cache.get_or_load(
+            ("models", limit, offset, model_type),
+            CATALOGUE_TABLES,
+            lambda: AsyncModelRepository._get_all(limit, offset, None, model_type)
+        )
+
+    @staticmethod
+    async def get_page(limit, before_id=None, model_type=None):
+        # Страницы API по курсору мимо кеша: каждый курсор дал бы в нем отдельную запись
+        return await AsyncModelRepository._get_all(limit, 0, before_id, model_type)
+
+    @staticmethod
+    async def _get_all(limit, offset, before_id, model_type):
+        async with get_async_db_cursor() as cur:
+            conditions = []
+            params = []
+
+            if model_type:
+                conditions.append("m.model_type = %s")
+                params.append(model_type)
+            if before_id:
+                conditions.append("m.id < %s")
+                params.append(before_id)
+
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            params.extend([limit, offset])
+            await cur.execute(
+                f"""
                 SELECT m.id, m.name, m.description, m.model_type, m.file_id,
                        f.name as file_name
                 FROM models m
                 LEFT JOIN files f ON m.file_id = f.id
+                {where}
                 ORDER BY m.id DESC
-                """
+                LIMIT %s OFFSET %s
+                """,
+                params
             )
-            rows = cur.fetchall()
+            rows = await cur.fetchall()
             return [
                 dict(
                     id=row[0], name=row[1], description=row[2],
@@ -44,17 +76,28 @@ class ModelRepository:
             ]
 
     @staticmethod
-    def add(name, description, model_type, file_id):
-        with get_db_cursor() as cur:
-            cur.execute(
+    async def count(model_type=None):
+        async with get_async_db_cursor() as cur:
+            if model_type:
+                await cur.execute("SELECT COUNT(*), false FROM models WHERE model_type=%s", (model_type,))
+            else:
+                await cur.execute(count_query("models"))
+            return count_result(await cur.fetchone())
+
+    @staticmethod
+    async def add(name, description, model_type, file_id):
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
                 "INSERT INTO models(name, description, model_type, file_id) VALUES (%s, %s, %s, %s) RETURNING id",
                 (name, description, model_type, file_id)
             )
-            return cur.fetchone()[0]
+            row = await cur.fetchone()
+        await table_changed("models")
+        return row[0]
 
     @staticmethod
-    def update(model_id, name=None, description=None, model_type=None, file_id=None):
-        with get_db_cursor() as cur:
+    async def update(model_id, name=None, description=None, model_type=None, file_id=None):
+        async with get_async_db_cursor() as cur:
             updates = []
             params = []
 
@@ -73,22 +116,31 @@ class ModelRepository:
 
             if updates:
                 params.append(model_id)
-                cur.execute(
+                await cur.execute(
                     f"UPDATE models SET {', '.join(updates)} WHERE id = %s",
                     params
                 )
+        if updates:
+            await table_changed("models")
+
+    @staticmethod
+    async def delete(model_id):
+        async with get_async_db_cursor() as cur:
+            await cur.execute("DELETE FROM models WHERE id=%s", (model_id,))
+        await table_changed("models")
 
     @staticmethod
-    def delete(model_id):
-        with get_db_cursor() as cur:
-            cur.execute("DELETE FROM models WHERE id=%s", (model_id,))
+    async def get_existing_ids(model_ids):
+        async with get_async_db_cursor() as cur:
+            await cur.execute("SELECT id FROM models WHERE id = ANY(%s::bigint[])", (list(model_ids),))
+            return {row[0] for row in await cur.fetchall()}
 
     @staticmethod
-    def get_by_type(model_type):
-        with get_db_cursor() as cur:
-            cur.execute(
+    async def get_by_type(model_type):
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
                 "SELECT id, name FROM models WHERE model_type=%s ORDER BY name",
                 (model_type,)
             )
-            rows = cur.fetchall()
-            return [dict(id=row[0], name=row[1]) for row in rows]
\ No newline at end of file
+            rows = await cur.fetchall()
+            return [dict(id=row[0], name=row[1]) for row in rows]
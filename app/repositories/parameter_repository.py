@@ -1,50 +1,80 @@
-from app.database import get_db_cursor
+from app.database import get_async_db_cursor
+from app.cache import table_changed
 
 
-class ParameterRepository:
+class AsyncParameterRepository:
     @staticmethod
-    def get(param_id):
-        with get_db_cursor() as cur:
-            cur.execute(
+    async def get(param_id):
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
                 "SELECT id, experiment_id, name, value FROM experiment_parameters WHERE id=%s",
                 (param_id,)
             )
-            r = cur.fetchone()
+            r = await cur.fetchone()
             if not r:
                 return None
             return dict(id=r[0], experiment_id=r[1], name=r[2], value=r[3])
 
     @staticmethod
-    def get_by_experiment(exp_id):
-        with get_db_cursor() as cur:
-            cur.execute(
+    async def get_by_experiment(exp_id):
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
                 "SELECT id, name, value FROM experiment_parameters WHERE experiment_id=%s ORDER BY id",
                 (exp_id,)
             )
-            rows = cur.fetchall()
+            rows = await cur.fetchall()
             return [dict(id=row[0], name=row[1], value=row[2]) for row in rows]
 
     @staticmethod
-    def add(exp_id, name, value):
-        with get_db_cursor() as cur:
-            cur.execute(
+    async def add(exp_id, name, value):
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
                 "INSERT INTO experiment_parameters(experiment_id, name, value) VALUES (%s, %s, %s) RETURNING id",
                 (exp_id, name, value)
             )
-            return cur.fetchone()[0]
+            row = await cur.fetchone()
+        await table_changed("experiment_parameters")
+        return row[0]
 
     @staticmethod
-    def add_batch(exp_id, parameters):
-        with get_db_cursor() as cur:
-            for name, value in parameters.items():
-                cur.execute(
-                    "INSERT INTO experiment_parameters(experiment_id, name, value) VALUES (%s, %s, %s)",
-                    (exp_id, name, str(value))
+    async def add_batch(exp_id, parameters, upsert=False):
+        if not parameters:
+            return
+        names = list(parameters.keys())
+        values = [str(value) for value in parameters.values()]
+
+        # Весь набор уходит двумя массивами в одном запросе
+        async with get_async_db_cursor() as cur:
+            if upsert:
+                await cur.execute(
+                    """
+                    WITH incoming AS (
+                        SELECT name, value FROM unnest(%s::varchar[], %s::varchar[]) AS t(name, value)
+                    ), updated AS (
+                        UPDATE experiment_parameters p SET value = i.value
+                        FROM incoming i
+                        WHERE p.experiment_id = %s AND p.name = i.name
+                        RETURNING p.name
+                    )
+                    INSERT INTO experiment_parameters(experiment_id, name, value)
+                    SELECT %s, i.name, i.value FROM incoming i
+                    WHERE NOT EXISTS (SELECT 1 FROM updated u WHERE u.name = i.name)
+                    """,
+                    (names, values, exp_id, exp_id)
+                )
+            else:
+                await cur.execute(
+                    """
+                    INSERT INTO experiment_parameters(experiment_id, name, value)
+                    SELECT %s, name, value FROM unnest(%s::varchar[], %s::varchar[]) AS t(name, value)
+                    """,
+                    (exp_id, names, values)
                 )
+        await table_changed("experiment_parameters")
 
     @staticmethod
-    def update(param_id, name=None, value=None):
-        with get_db_cursor() as cur:
+    async def update(param_id, name=None, value=None):
+        async with get_async_db_cursor() as cur:
             updates = []
             params = []
 
@@ -57,17 +87,19 @@ class ParameterRepository:
 
             if updates:
                 params.append(param_id)
-                cur.execute(
+                await cur.execute(
                     f"UPDATE experiment_parameters SET {', '.join(updates)} WHERE id = %s",
                     params
                 )
 
     @staticmethod
-    def delete(param_id):
-        with get_db_cursor() as cur:
-            cur.execute("DELETE FROM experiment_parameters WHERE id=%s", (param_id,))
+    async def delete(param_id):
+        async with get_async_db_cursor() as cur:
+            await cur.execute("DELETE FROM experiment_parameters WHERE id=%s", (param_id,))
+        await table_changed("experiment_parameters")
 
     @staticmethod
-    def delete_by_experiment(exp_id):
-        with get_db_cursor() as cur:
-            cur.execute("DELETE FROM experiment_parameters WHERE experiment_id=%s", (exp_id,))
\ No newline at end of file
+    async def delete_by_experiment(exp_id):
+        async with get_async_db_cursor() as cur:
+            await cur.execute("DELETE FROM experiment_parameters WHERE experiment_id=%s", (exp_id,))
+        await table_changed("experiment_parameters")
@@ -0,0 +1,55 @@
+import logging
+
+from psycopg.errors import UndefinedTable
+
+from app.database import get_async_db_cursor, count_query
+
+logger = logging.getLogger(__name__)
+
+# Один запрос на все счетчики: группировки по небольшим таблицам считаются
+# точно, размер больших таблиц берется из оценки планировщика
+LIVE_STATS_SQL = f"""
+    SELECT 'users_by_role', COALESCE(user_role, ''), COUNT(*) FROM users GROUP BY user_role
+    UNION ALL
+    SELECT 'models_by_type', COALESCE(model_type, ''), COUNT(*) FROM models GROUP BY model_type
+    UNION ALL
+    SELECT 'experiments', '', c.total FROM ({count_query("experiments")}) c
+    UNION ALL
+    SELECT 'labs', '', c.total FROM ({count_query("labs")}) c
+    UNION ALL
+    SELECT 'files', '', c.total FROM ({count_query("files")}) c
+"""
+
+# Таблица stats_rollup поддерживается триггерами, которые ставит app/stats_rollup.py
+# при STATS_ROLLUP=true; чтение не зависит от числа строк в исходных таблицах
+ROLLUP_STATS_SQL = "SELECT metric, key, count FROM stats_rollup"
+
+
+def _group(rows):
+    counts = {}
+    for metric, key, count in rows:
+        counts.setdefault(metric, {})[key] = int(count)
+    return counts
+
+
+class AsyncStatsRepository:
+    @staticmethod
+    async def get_counts(use_rollup=False):
+        if use_rollup:
+            try:
+                async with get_async_db_cursor() as cur:
+                    await cur.execute(ROLLUP_STATS_SQL)
+                    rows = await cur.fetchall()
+            except UndefinedTable:
+                # STATS_ROLLUP включен раньше, чем применены миграции
+                logger.warning("stats_rollup table is missing, counting live; run python -m app.migrate")
+            else:
+                if rows:
+                    return _group(row for row in rows if row[2] != 0)
+                # Пересчет после установки триггеров всегда оставляет строки; пустая таблица
+                # значит, что STATS_ROLLUP включили без повторного запуска миграций
+                logger.warning("stats_rollup triggers are not installed, counting live; run python -m app.migrate")
+
+        async with get_async_db_cursor() as cur:
+            await cur.execute(LIVE_STATS_SQL)
+            return _group(await cur.fetchall())
@@ -1,44 +1,117 @@
-from app.database import get_db_cursor
+from app.database import get_async_db_cursor, count_query, count_result
 
 
-class UserRepository:
+class AsyncUserRepository:
     @staticmethod
-    def get(user_id):
-        with get_db_cursor() as cur:
-            cur.execute("SELECT id, full_name, email, user_role FROM users WHERE id=%s", (user_id,))
-            row = cur.fetchone()
+    async def get(user_id):
+        async with get_async_db_cursor() as cur:
+            await cur.execute("SELECT id, full_name, email, user_role FROM users WHERE id=%s", (user_id,))
+            row = await cur.fetchone()
             if not row:
                 return None
             return dict(id=row[0], full_name=row[1], email=row[2], role=row[3])
 
     @staticmethod
-    def get_by_email(email):
-        with get_db_cursor() as cur:
-            cur.execute("SELECT id, full_name, email, user_role FROM users WHERE email=%s", (email,))
-            row = cur.fetchone()
+    async def get_by_email(email):
+        async with get_async_db_cursor() as cur:
+            await cur.execute("SELECT id, full_name, email, user_role FROM users WHERE email=%s", (email,))
+            row = await cur.fetchone()
             if not row:
                 return None
             return dict(id=row[0], full_name=row[1], email=row[2], role=row[3])
 
     @staticmethod
-    def get_all():
-        with get_db_cursor() as cur:
-            cur.execute("SELECT id, full_name, email, user_role FROM users ORDER BY id")
-            rows = cur.fetchall()
+    async def get_all(limit=None, offset=0, after_id=None):
+        async with get_async_db_cursor() as cur:
+            where = ""
+            params = []
+
+            if after_id:
+                where = "WHERE id > %s"
+                params.append(after_id)
+
+            params.extend([limit, offset])
+            await cur.execute(
+                f"SELECT id, full_name, email, user_role FROM users {where} ORDER BY id LIMIT %s OFFSET %s",
+                params
+            )
+            rows = await cur.fetchall()
             return [dict(id=row[0], full_name=row[1], email=row[2], role=row[3]) for row in rows]
 
     @staticmethod
-    def add(full_name, email, role):
-        with get_db_cursor() as cur:
-            cur.execute(
+    async def get_all_with_usernames(limit=None, offset=0, after_id=None):
+        async with get_async_db_cursor() as cur:
+            where = ""
+            params = []
+
+            if after_id:
+                where = "WHERE u.id > %s"
+                params.append(after_id)
+
+            params.extend([limit, offset])
+            await cur.execute(
+                f"""
+                SELECT u.id, u.full_name, u.email, u.user_role, c.username
+                FROM users u
+                LEFT JOIN credentials c ON c.id = u.id
+                {where}
+                ORDER BY u.id
+                LIMIT %s OFFSET %s
+                """,
+                params
+            )
+            rows = await cur.fetchall()
+            return [
+                dict(id=row[0], full_name=row[1], email=row[2], role=row[3], username=row[4])
+                for row in rows
+            ]
+
+    @staticmethod
+    async def get_many_with_usernames(user_ids):
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
+                """
+                SELECT u.id, u.full_name, u.email, u.user_role, c.username
+                FROM users u
+                LEFT JOIN credentials c ON c.id = u.id
+                WHERE u.id = ANY(%s::bigint[])
+                """,
+                (list(user_ids),)
+            )
+            rows = await cur.fetchall()
+            return [
+                dict(id=row[0], full_name=row[1], email=row[2], role=row[3], username=row[4])
+                for row in rows
+            ]
+
+    @staticmethod
+    async def get_by_role(role):
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
+                "SELECT id, full_name, email, user_role FROM users WHERE user_role=%s ORDER BY id",
+                (role,)
+            )
+            rows = await cur.fetchall()
+            return [dict(id=row[0], full_name=row[1], email=row[2], role=row[3]) for row in rows]
+
+    @staticmethod
+    async def count():
+        async with get_async_db_cursor() as cur:
+            await cur.execute(count_query("users"))
+            return count_result(await cur.fetchone())
+
+    @staticmethod
+    async def add(full_name, email, role):
+        async with get_async_db_cursor() as cur:
+            await cur.execute(
                 "INSERT INTO users(full_name, email, user_role) VALUES (%s, %s, %s) RETURNING id",
                 (full_name, email, role)
             )
-            return cur.fetchone()[0]
+            return (await cur.fetchone())[0]
 
     @staticmethod
-    def update(user_id, full_name=None, email=None, role=None):
-        with get_db_cursor() as cur:
+    async def update(user_id, full_name=None, email=None, role=None):
+        async with get_async_db_cursor() as cur:
             updates = []
             params = []
 
@@ -54,12 +127,12 @@ class UserRepository:
 
             if updates:
                 params.append(user_id)
-                cur.execute(
+                await cur.execute(
                     f"UPDATE users SET {', '.join(updates)} WHERE id = %s",
                     params
                 )
 
     @staticmethod
-    def delete(user_id):
-        with get_db_cursor() as cur:
-            cur.execute("DELETE FROM users WHERE id=%s", (user_id,))
\ No newline at end of file
+    async def delete(user_id):
+        async with get_async_db_cursor() as cur:
+            await cur.execute("DELETE FROM users WHERE id=%s", (user_id,))
@@ -4,6 +4,8 @@ from .file_routes import router as file_router
 from .model_routes import router as model_router
 from .experiment_routes import router as experiment_router
 from .lab_routes import router as lab_router
+from .admin_routes import router as admin_router
+from .api_routes import router as api_router
 
 __all__ = [
     'auth_router',
@@ -11,5 +13,7 @@ __all__ = [
     'file_router',
     'model_router',
     'experiment_router',
-    'lab_router'
+    'lab_router',
+    'admin_router',
+    'api_router'
 ]
\ No newline at end of file
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, HTTPException
+from app.auth import get_current_user, token_cache
+from app.cache import catalogue_cache, data_versions
+from app.database import get_pool_stats
+from app.page_cache import page_cache
+from app.query_stats import query_stats
+from app.sessions import session_store
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/metrics")
+async def metrics(user=Depends(get_current_user)):
+    if user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    return {
+        "pools": get_pool_stats(),
+        "token_cache": token_cache.stats(),
+        "catalogue_cache": catalogue_cache.stats(),
+        "page_cache": page_cache.stats(),
+        "data_versions": data_versions.snapshot(),
+        "sessions": session_store.stats() if session_store is not None else None,
+        "queries": query_stats.stats()
+    }
+
+
+@router.post("/metrics/queries/reset")
+async def reset_query_stats(user=Depends(get_current_user)):
+    if user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    query_stats.reset()
+    return {"status": "ok"}
\ No newline at end of file
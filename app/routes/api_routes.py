@@ -0,0 +1,356 @@
+import base64
+import json
+from datetime import date
+from typing import Dict, Union
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from pydantic import StrictBool, StrictFloat, StrictInt, StrictStr
+from fastapi.responses import ORJSONResponse, Response
+from app.auth import get_current_user
+from app.models import (
+    User, File, Model, ModelCreate, ModelUpdate, Experiment, ExperimentCreate, ExperimentUpdate,
+    Parameter, ParameterCreate, ParameterUpdate, Lab, LabCreate, LabUpdate
+)
+from app.repositories.user_repository import AsyncUserRepository
+from app.repositories.file_repository import AsyncFileRepository
+from app.repositories.model_repository import AsyncModelRepository
+from app.repositories.experiment_repository import AsyncExperimentRepository
+from app.repositories.parameter_repository import AsyncParameterRepository
+from app.repositories.lab_repository import AsyncLabRepository
+from app.services.researcher_service import ResearcherService
+from app.services.teacher_service import TeacherService
+
+# orjson сериализует строки из репозиториев (включая даты) заметно быстрее стандартного json
+router = APIRouter(prefix="/api/v1", tags=["api"], default_response_class=ORJSONResponse)
+
+# Поля, доступные в ?fields=: поля Pydantic-модели плюс то, что добавляют запросы репозиториев
+USER_FIELDS = set(User.model_fields) | {"username"}
+FILE_FIELDS = (set(File.model_fields) | {"sha256", "size"}) - {"path"}
+MODEL_FIELDS = set(Model.model_fields) | {"file_name"}
+EXPERIMENT_FIELDS = set(Experiment.model_fields) | {"model_name", "param_count", "parameters"}
+PARAMETER_FIELDS = set(Parameter.model_fields)
+LAB_FIELDS = set(Lab.model_fields) | {"experiment_name", "assigned_count", "submitted_count", "assignments"}
+
+# Путь на диске сервера - деталь хранилища, в ответы API он не попадает
+HIDDEN_FIELDS = frozenset({"path", "file_path"})
+
+RESEARCH_ROLES = ["researcher", "admin"]
+TEACHING_ROLES = ["teacher", "admin"]
+
+
+def _require_role(user, roles):
+    if user["role"] not in roles:
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+
+
+def _parse_fields(fields, allowed):
+    if not fields:
+        return None
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in selected if field not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(sorted(allowed))}"
+        )
+    return selected
+
+
+def _select(row, fields):
+    # ?fields= только формирует ответ: репозитории по-прежнему читают строку целиком,
+    # так что запрос к БД от него не становится дешевле
+    if fields is None:
+        return {key: value for key, value in row.items() if key not in HIDDEN_FIELDS}
+    return {field: row.get(field) for field in fields}
+
+
+def _encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def _load_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _decode_cursor(cursor):
+    # Курсор по id: целое число (bool в JSON тоже int для Python, его отсекаем)
+    if not cursor:
+        return None
+    key = _load_cursor(cursor)
+    if type(key) is not int:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key
+
+
+def _decode_lab_cursor(cursor):
+    # Курсор списка лабораторных: [deadline в ISO-формате или null, id]
+    if not cursor:
+        return None
+    key = _load_cursor(cursor)
+    if not (isinstance(key, list) and len(key) == 2 and type(key[1]) is int
+            and (key[0] is None or isinstance(key[0], str))):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    try:
+        deadline = date.fromisoformat(key[0]) if key[0] is not None else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return deadline, key[1]
+
+
+def _page(rows, limit, fields, cursor_key):
+    # Запрашиваем limit + 1 строк: лишняя строка означает, что есть следующая страница
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "items": [_select(row, fields) for row in rows],
+        "next_cursor": _encode_cursor(cursor_key(rows[-1])) if has_more else None
+    }
+
+
+def _found(row, name):
+    if not row:
+        raise HTTPException(status_code=404, detail=f"{name} not found")
+    return row
+
+
+# Users
+
+@router.get("/users")
+async def api_list_users(
+        user=Depends(get_current_user),
+        limit: int = Query(50, ge=1, le=500),
+        cursor: str = Query(None),
+        fields: str = Query(None)
+):
+    _require_role(user, ["admin"])
+    fields = _parse_fields(fields, USER_FIELDS)
+    after_id = _decode_cursor(cursor)
+    rows = await AsyncUserRepository.get_all_with_usernames(limit=limit + 1, after_id=after_id)
+    return _page(rows, limit, fields, lambda row: row["id"])
+
+
+@router.get("/users/{user_id}")
+async def api_get_user(user_id: int, user=Depends(get_current_user), fields: str = Query(None)):
+    if user["role"] != "admin" and int(user["sub"]) != user_id:
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+    fields = _parse_fields(fields, USER_FIELDS)
+    rows = await AsyncUserRepository.get_many_with_usernames([user_id])
+    return _select(_found(rows[0] if rows else None, "User"), fields)
+
+
+# Files
+
+@router.get("/files")
+async def api_list_files(
+        user=Depends(get_current_user),
+        limit: int = Query(50, ge=1, le=500),
+        cursor: str = Query(None),
+        fields: str = Query(None)
+):
+    _require_role(user, RESEARCH_ROLES)
+    fields = _parse_fields(fields, FILE_FIELDS - {"sha256", "size"})
+    rows = await AsyncFileRepository.get_all(limit=limit + 1, before_id=_decode_cursor(cursor))
+    return _page(rows, limit, fields, lambda row: row["id"])
+
+
+@router.get("/files/{file_id}")
+async def api_get_file(file_id: int, user=Depends(get_current_user), fields: str = Query(None)):
+    _require_role(user, RESEARCH_ROLES)
+    fields = _parse_fields(fields, FILE_FIELDS)
+    return _select(_found(await AsyncFileRepository.get(file_id), "File"), fields)
+
+
+# Models
+
+@router.get("/models")
+async def api_list_models(
+        user=Depends(get_current_user),
+        limit: int = Query(50, ge=1, le=500),
+        cursor: str = Query(None),
+        fields: str = Query(None),
+        model_type: str = Query(None)
+):
+    _require_role(user, RESEARCH_ROLES)
+    fields = _parse_fields(fields, MODEL_FIELDS)
+    rows = await AsyncModelRepository.get_page(
+        limit=limit + 1, before_id=_decode_cursor(cursor), model_type=model_type
+    )
+    return _page(rows, limit, fields, lambda row: row["id"])
+
+
+@router.get("/models/{model_id}")
+async def api_get_model(model_id: int, user=Depends(get_current_user), fields: str = Query(None)):
+    _require_role(user, RESEARCH_ROLES)
+    fields = _parse_fields(fields, MODEL_FIELDS)
+    return _select(_found(await AsyncModelRepository.get(model_id), "Model"), fields)
+
+
+@router.post("/models", status_code=201)
+async def api_create_model(data: ModelCreate, user=Depends(get_current_user)):
+    _require_role(user, RESEARCH_ROLES)
+    model_id = await ResearcherService.create_model(data.name, data.description, data.model_type, data.file_id)
+    return _select(await AsyncModelRepository.get(model_id), None)
+
+
+@router.patch("/models/{model_id}")
+async def api_update_model(model_id: int, data: ModelUpdate, user=Depends(get_current_user)):
+    _require_role(user, RESEARCH_ROLES)
+    _found(await AsyncModelRepository.get(model_id), "Model")
+    await AsyncModelRepository.update(model_id, **data.model_dump(exclude_unset=True))
+    return _select(await AsyncModelRepository.get(model_id), None)
+
+
+@router.delete("/models/{model_id}", status_code=204)
+async def api_delete_model(model_id: int, user=Depends(get_current_user)):
+    _require_role(user, RESEARCH_ROLES)
+    await AsyncModelRepository.delete(model_id)
+    return Response(status_code=204)
+
+
+# Experiments
+
+@router.get("/experiments")
+async def api_list_experiments(
+        user=Depends(get_current_user),
+        limit: int = Query(50, ge=1, le=500),
+        cursor: str = Query(None),
+        fields: str = Query(None),
+        model_id: int = Query(None)
+):
+    _require_role(user, RESEARCH_ROLES)
+    fields = _parse_fields(fields, EXPERIMENT_FIELDS - {"parameters"})
+    rows = await AsyncExperimentRepository.get_page(
+        limit=limit + 1, before_id=_decode_cursor(cursor), model_id=model_id
+    )
+    return _page(rows, limit, fields, lambda row: row["id"])
+
+
+@router.get("/experiments/{exp_id}")
+async def api_get_experiment(exp_id: int, user=Depends(get_current_user), fields: str = Query(None)):
+    _require_role(user, RESEARCH_ROLES)
+    fields = _parse_fields(fields, EXPERIMENT_FIELDS)
+    return _select(_found(await ResearcherService.get_experiment(exp_id), "Experiment"), fields)
+
+
+@router.post("/experiments", status_code=201)
+async def api_create_experiment(data: ExperimentCreate, user=Depends(get_current_user)):
+    _require_role(user, RESEARCH_ROLES)
+    exp_id = await ResearcherService.create_experiment(
+        data.name, data.description, data.model_id, data.parameters
+    )
+    return await ResearcherService.get_experiment(exp_id)
+
+
+@router.patch("/experiments/{exp_id}")
+async def api_update_experiment(exp_id: int, data: ExperimentUpdate, user=Depends(get_current_user)):
+    _require_role(user, RESEARCH_ROLES)
+    _found(await AsyncExperimentRepository.get(exp_id), "Experiment")
+    await AsyncExperimentRepository.update(exp_id, **data.model_dump(exclude_unset=True))
+    return await ResearcherService.get_experiment(exp_id)
+
+
+@router.delete("/experiments/{exp_id}", status_code=204)
+async def api_delete_experiment(exp_id: int, user=Depends(get_current_user)):
+    _require_role(user, RESEARCH_ROLES)
+    await AsyncExperimentRepository.delete(exp_id)
+    return Response(status_code=204)
+
+
+# Parameters
+
+@router.get("/experiments/{exp_id}/parameters")
+async def api_list_parameters(exp_id: int, user=Depends(get_current_user), fields: str = Query(None)):
+    _require_role(user, RESEARCH_ROLES)
+    fields = _parse_fields(fields, PARAMETER_FIELDS)
+    rows = await AsyncParameterRepository.get_by_experiment(exp_id)
+    return {"items": [_select(dict(row, experiment_id=exp_id), fields) for row in rows]}
+
+
+@router.put("/experiments/{exp_id}/parameters")
+async def api_import_parameters(
+        exp_id: int,
+        parameters: Dict[str, Union[StrictStr, StrictInt, StrictFloat, StrictBool]] = Body(...),
+        user=Depends(get_current_user)
+):
+    _require_role(user, RESEARCH_ROLES)
+    _found(await AsyncExperimentRepository.get(exp_id), "Experiment")
+    rows = await ResearcherService.import_parameters(exp_id, parameters)
+    return {"items": [dict(row, experiment_id=exp_id) for row in rows]}
+
+
+@router.post("/parameters", status_code=201)
+async def api_create_parameter(data: ParameterCreate, user=Depends(get_current_user)):
+    _require_role(user, RESEARCH_ROLES)
+    param_id = await AsyncParameterRepository.add(data.experiment_id, data.name, data.value)
+    return await AsyncParameterRepository.get(param_id)
+
+
+@router.get("/parameters/{param_id}")
+async def api_get_parameter(param_id: int, user=Depends(get_current_user), fields: str = Query(None)):
+    _require_role(user, RESEARCH_ROLES)
+    fields = _parse_fields(fields, PARAMETER_FIELDS)
+    return _select(_found(await AsyncParameterRepository.get(param_id), "Parameter"), fields)
+
+
+@router.patch("/parameters/{param_id}")
+async def api_update_parameter(param_id: int, data: ParameterUpdate, user=Depends(get_current_user)):
+    _require_role(user, RESEARCH_ROLES)
+    _found(await AsyncParameterRepository.get(param_id), "Parameter")
+    await AsyncParameterRepository.update(param_id, **data.model_dump(exclude_unset=True))
+    return await AsyncParameterRepository.get(param_id)
+
+
+@router.delete("/parameters/{param_id}", status_code=204)
+async def api_delete_parameter(param_id: int, user=Depends(get_current_user)):
+    _require_role(user, RESEARCH_ROLES)
+    await AsyncParameterRepository.delete(param_id)
+    return Response(status_code=204)
+
+
+# Labs
+
+@router.get("/labs")
+async def api_list_labs(
+        user=Depends(get_current_user),
+        limit: int = Query(50, ge=1, le=500),
+        cursor: str = Query(None),
+        fields: str = Query(None)
+):
+    _require_role(user, TEACHING_ROLES)
+    fields = _parse_fields(fields, LAB_FIELDS - {"assignments"})
+    rows = await AsyncLabRepository.get_all(limit=limit + 1, before=_decode_lab_cursor(cursor))
+    return _page(
+        rows, limit, fields,
+        lambda row: [row["deadline"].isoformat() if isinstance(row["deadline"], date) else None, row["id"]]
+    )
+
+
+@router.get("/labs/{lab_id}")
+async def api_get_lab(lab_id: int, user=Depends(get_current_user), fields: str = Query(None)):
+    _require_role(user, TEACHING_ROLES)
+    fields = _parse_fields(fields, LAB_FIELDS)
+    return _select(_found(await TeacherService.get_lab(lab_id), "Lab"), fields)
+
+
+@router.post("/labs", status_code=201)
+async def api_create_lab(data: LabCreate, user=Depends(get_current_user)):
+    _require_role(user, TEACHING_ROLES)
+    lab_id = await TeacherService.create_lab(data.name, data.instruction, data.deadline, data.experiment_id)
+    return await TeacherService.get_lab(lab_id)
+
+
+@router.patch("/labs/{lab_id}")
+async def api_update_lab(lab_id: int, data: LabUpdate, user=Depends(get_current_user)):
+    _require_role(user, TEACHING_ROLES)
+    _found(await AsyncLabRepository.get(lab_id), "Lab")
+    await AsyncLabRepository.update(lab_id, **data.model_dump(exclude_unset=True))
+    return await TeacherService.get_lab(lab_id)
+
+
+@router.delete("/labs/{lab_id}", status_code=204)
+async def api_delete_lab(lab_id: int, user=Depends(get_current_user)):
+    _require_role(user, TEACHING_ROLES)
+    await AsyncLabRepository.delete(lab_id)
+    return Response(status_code=204)
@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Request, Form, Depends, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse
-from app.database import get_db_cursor
-from app.auth import create_access_token, get_current_user
-from app.repositories.user_repository import UserRepository
-from app.repositories.credentials_repository import CredentialsRepository
+from starlette.concurrency import run_in_threadpool
+from app.database import get_async_db_cursor
+from app.auth import create_access_token, get_current_user, invalidate_token, invalidate_user_tokens
+from app.passwords import hash_password_async
+from app.repositories.user_repository import AsyncUserRepository
+from app.repositories.credentials_repository import AsyncCredentialsRepository
 from app.services.controller_factory import ControllerFactory
-from app.main import templates
+from app.loaders import get_loaders
 from app.templates_loader import templates
 
 router = APIRouter(prefix="", tags=["auth"])
@@ -23,7 +25,7 @@ async def login(
         password: str = Form(...)
 ):
     try:
-        user_id = CredentialsRepository.auth(username, password)
+        user_id = await AsyncCredentialsRepository.auth(username, password)
 
         if not user_id:
             return templates.TemplateResponse(
@@ -31,11 +33,11 @@ async def login(
                 {"request": request, "error": "Invalid username or password"}
             )
 
-        user = UserRepository.get(user_id)
+        user = await AsyncUserRepository.get(user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        token = create_access_token(user_id, user["role"])
+        token = await run_in_threadpool(create_access_token, user_id, user["role"])
 
         response = RedirectResponse(url="/dashboard", status_code=302)
         response.set_cookie(key="access_token", value=token, httponly=True)
@@ -63,43 +65,40 @@ async def register(
         role: str = Form(...)
 ):
     try:
-        with get_db_cursor() as cur:
+        hashed = await hash_password_async(password)
+
+        async with get_async_db_cursor() as cur:
             # Check if email exists
-            cur.execute("SELECT id FROM users WHERE email = %s", (email,))
-            if cur.fetchone():
+            await cur.execute("SELECT id FROM users WHERE email = %s", (email,))
+            if await cur.fetchone():
                 return templates.TemplateResponse(
                     "auth/register.html",
                     {"request": request, "error": "Email already registered"}
                 )
 
             # Check if username exists
-            cur.execute("SELECT id FROM credentials WHERE username = %s", (username,))
-            if cur.fetchone():
+            await cur.execute("SELECT id FROM credentials WHERE username = %s", (username,))
+            if await cur.fetchone():
                 return templates.TemplateResponse(
                     "auth/register.html",
                     {"request": request, "error": "Username already taken"}
                 )
 
             # Create user
-            cur.execute(
+            await cur.execute(
                 "INSERT INTO users(full_name, email, user_role) VALUES (%s, %s, %s) RETURNING id",
                 (full_name, email, role)
             )
-            user_id = cur.fetchone()[0]
+            user_id = (await cur.fetchone())[0]
 
             # Create credentials
-            import hashlib
-            from passlib.hash import bcrypt
-            password_sha256 = hashlib.sha256(password.encode()).hexdigest()
-            hashed = bcrypt.hash(password_sha256)
-
-            cur.execute(
+            await cur.execute(
                 "INSERT INTO credentials(id, username, pass) VALUES (%s, %s, %s)",
                 (user_id, username, hashed)
             )
 
         # Auto login
-        token = create_access_token(user_id, role)
+        token = await run_in_threadpool(create_access_token, user_id, role)
         response = RedirectResponse(url="/dashboard", status_code=302)
         response.set_cookie(key="access_token", value=token, httponly=True)
         return response
@@ -112,17 +111,21 @@ async def register(
 
 
 @router.get("/logout")
-async def logout():
+async def logout(request: Request):
+    token = request.cookies.get("access_token")
+    if token:
+        await invalidate_token(token)
+
     response = RedirectResponse(url="/login", status_code=302)
     response.delete_cookie(key="access_token")
     return response
 
 
 @router.get("/profile", response_class=HTMLResponse)
-async def profile_page(request: Request, user=Depends(get_current_user)):
+async def profile_page(request: Request, user=Depends(get_current_user), loaders=Depends(get_loaders)):
     try:
-        user_details = UserRepository.get(int(user['sub']))
-        username = CredentialsRepository.get_by_user_id(int(user['sub']))
+        user_details = await loaders.users.load(int(user['sub']))
+        username = user_details["username"] if user_details else None
 
         return templates.TemplateResponse(
             "users/profile.html",
@@ -159,13 +162,15 @@ async def update_profile(
             updates['email'] = email
 
         if updates:
-            UserRepository.update(user_id, **updates)
+            await AsyncUserRepository.update(user_id, **updates)
 
         if current_password and new_password:
             # Verify current password
-            username = CredentialsRepository.get_by_user_id(user_id)
-            if CredentialsRepository.auth(username, current_password):
-                CredentialsRepository.update_password(user_id, new_password)
+            username = await AsyncCredentialsRepository.get_by_user_id(user_id)
+            if await AsyncCredentialsRepository.auth(username, current_password):
+                await AsyncCredentialsRepository.update_password(user_id, new_password)
+                # Остальные сессии пользователя отзываем, текущую оставляем
+                await invalidate_user_tokens(user_id, keep_token=request.cookies.get("access_token"))
             else:
                 return templates.TemplateResponse(
                     "users/profile.html",
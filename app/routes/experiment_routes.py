@@ -1,52 +1,128 @@
-from fastapi import APIRouter, Request, Depends, Form, Query
-from fastapi.responses import HTMLResponse, RedirectResponse
+import asyncio
+from fastapi import APIRouter, Request, Depends, Form, Query, HTTPException, UploadFile
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 import json
+import tempfile
+import orjson
 from app.auth import get_current_user
-from app.repositories.model_repository import ModelRepository
-from app.repositories.experiment_repository import ExperimentRepository
-from app.repositories.parameter_repository import ParameterRepository
+from app.config import Config
+from app.repositories.model_repository import AsyncModelRepository
+from app.repositories.experiment_repository import AsyncExperimentRepository
+from app.repositories.parameter_repository import AsyncParameterRepository
 from app.services.researcher_service import ResearcherService
 from app.templates_loader import templates
+from app.page_cache import render_cached
+from app.pagination import page_context
 
 router = APIRouter(prefix="/experiments", tags=["experiments"])
 
+# Таблицы, из которых собирается страница списка экспериментов
+LIST_TABLES = ("experiments", "models", "experiment_parameters")
+
+
+async def _iter_upload(upload):
+    while chunk := await upload.read(Config.UPLOAD_CHUNK_SIZE):
+        yield chunk
+
+
+async def _iter_lines(chunks):
+    # Режем поток байтов на строки, не дожидаясь конца файла
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
 
 @router.get("/", response_class=HTMLResponse)
 async def list_experiments(
         request: Request,
         user=Depends(get_current_user),
         page: int = Query(1, ge=1),
+        per_page: int = Query(20, ge=1, le=100),
         model_id: int = Query(None)
 ):
     if user["role"] not in ["researcher", "admin"]:
         return RedirectResponse(url="/dashboard")
 
-    if model_id:
-        experiments = ExperimentRepository.get_by_model(model_id)
-    else:
-        experiments = ResearcherService.get_experiments()
-
-    models = ModelRepository.get_all()
-
-    return templates.TemplateResponse(
-        "experiments/list.html",
-        {
-            "request": request,
-            "user": user,
+    async def load_context():
+        experiments, total, models = await asyncio.gather(
+            ResearcherService.get_experiments(limit=per_page, offset=(page - 1) * per_page, model_id=model_id),
+            AsyncExperimentRepository.count(model_id),
+            AsyncModelRepository.get_all()
+        )
+        return {
             "experiments": experiments,
             "models": models,
-            "page": page,
+            **page_context(page, per_page, total, len(experiments)),
             "selected_model_id": model_id
         }
+
+    return await render_cached(request, user, "experiments/list.html", LIST_TABLES, load_context)
+
+
+@router.get("/export")
+async def export_experiments(
+        user=Depends(get_current_user),
+        format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+        model_id: int = Query(None)
+):
+    if user["role"] not in ["researcher", "admin"]:
+        return RedirectResponse(url="/dashboard")
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        ResearcherService.export_experiments(format, model_id),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="experiments.{format}"'}
     )
 
 
+@router.get("/import", response_class=HTMLResponse)
+async def import_experiments_page(request: Request, user=Depends(get_current_user)):
+    if user["role"] not in ["researcher", "admin"]:
+        return RedirectResponse(url="/dashboard")
+
+    return templates.TemplateResponse("experiments/import.html", {"request": request, "user": user})
+
+
+@router.post("/import")
+async def import_experiments(request: Request, user=Depends(get_current_user), dry_run: bool = Query(False)):
+    if user["role"] not in ["researcher", "admin"]:
+        return RedirectResponse(url="/dashboard")
+
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="No file uploaded")
+        dry_run = dry_run or form.get("dry_run") == "true"
+        chunks = _iter_upload(upload)
+    else:
+        # NDJSON прямо в теле запроса. Во время StreamingResponse Starlette сам читает receive(),
+        # поэтому тело сначала сбрасываем во временный файл (большие файлы уходят на диск)
+        upload = UploadFile(tempfile.SpooledTemporaryFile(max_size=Config.UPLOAD_CHUNK_SIZE))
+        async for chunk in request.stream():
+            await upload.write(chunk)
+        await upload.seek(0)
+        chunks = _iter_upload(upload)
+
+    async def events():
+        async for event in ResearcherService.import_experiments(_iter_lines(chunks), dry_run):
+            yield orjson.dumps(event) + b"\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
 @router.get("/create", response_class=HTMLResponse)
 async def create_experiment_page(request: Request, user=Depends(get_current_user)):
     if user["role"] not in ["researcher", "admin"]:
         return RedirectResponse(url="/dashboard")
 
-    models = ModelRepository.get_all()
+    models = await AsyncModelRepository.get_all()
 
     return templates.TemplateResponse(
         "experiments/create.html",
@@ -73,13 +149,13 @@ async def create_experiment(
     try:
         parameters = json.loads(parameters_json)
 
-        experiment_id = ResearcherService.create_experiment(
+        experiment_id = await ResearcherService.create_experiment(
             name, description, model_id, parameters
         )
 
         return RedirectResponse(url=f"/experiments/{experiment_id}", status_code=302)
     except json.JSONDecodeError:
-        models = ModelRepository.get_all()
+        models = await AsyncModelRepository.get_all()
         return templates.TemplateResponse(
             "experiments/create.html",
             {
@@ -90,7 +166,7 @@ async def create_experiment(
             }
         )
     except Exception as e:
-        models = ModelRepository.get_all()
+        models = await AsyncModelRepository.get_all()
         return templates.TemplateResponse(
             "experiments/create.html",
             {
@@ -104,7 +180,7 @@ async def create_experiment(
 
 @router.get("/{experiment_id}", response_class=HTMLResponse)
 async def experiment_detail(request: Request, experiment_id: int, user=Depends(get_current_user)):
-    experiment = ResearcherService.get_experiment(experiment_id)
+    experiment = await ResearcherService.get_experiment(experiment_id)
     if not experiment:
         return RedirectResponse(url="/experiments")
 
@@ -123,12 +199,12 @@ async def edit_experiment_page(request: Request, experiment_id: int, user=Depend
     if user["role"] not in ["researcher", "admin"]:
         return RedirectResponse(url="/dashboard")
 
-    experiment = ExperimentRepository.get(experiment_id)
+    experiment = await AsyncExperimentRepository.get(experiment_id)
     if not experiment:
         return RedirectResponse(url="/experiments")
 
-    models = ModelRepository.get_all()
-    parameters = ParameterRepository.get_by_experiment(experiment_id)
+    models = await AsyncModelRepository.get_all()
+    parameters = await AsyncParameterRepository.get_by_experiment(experiment_id)
 
     return templates.TemplateResponse(
         "experiments/edit.html",
@@ -154,7 +230,7 @@ async def update_experiment(
     if user["role"] not in ["researcher", "admin"]:
         return RedirectResponse(url="/dashboard")
 
-    ExperimentRepository.update(experiment_id, name, description, model_id)
+    await AsyncExperimentRepository.update(experiment_id, name, description, model_id)
     return RedirectResponse(url=f"/experiments/{experiment_id}", status_code=302)
 
 
@@ -169,7 +245,7 @@ async def add_parameter(
     if user["role"] not in ["researcher", "admin"]:
         return RedirectResponse(url="/dashboard")
 
-    ParameterRepository.add(experiment_id, param_name, param_value)
+    await AsyncParameterRepository.add(experiment_id, param_name, param_value)
     return RedirectResponse(url=f"/experiments/{experiment_id}", status_code=302)
 
 
@@ -183,7 +259,7 @@ async def delete_parameter(
     if user["role"] not in ["researcher", "admin"]:
         return RedirectResponse(url="/dashboard")
 
-    ParameterRepository.delete(param_id)
+    await AsyncParameterRepository.delete(param_id)
     return RedirectResponse(url=f"/experiments/{experiment_id}", status_code=302)
 
 
@@ -196,5 +272,5 @@ async def delete_experiment(
     if user["role"] not in ["researcher", "admin"]:
         return RedirectResponse(url="/dashboard")
 
-    ExperimentRepository.delete(experiment_id)
+    await AsyncExperimentRepository.delete(experiment_id)
     return RedirectResponse(url="/experiments", status_code=302)
\ No newline at end of file
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Request, Depends, UploadFile, File, Form, Query
-from fastapi.responses import HTMLResponse, RedirectResponse
+import asyncio
+from fastapi import APIRouter, Request, Depends, UploadFile, File, Form, Query, HTTPException
+from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse, Response
 import os
-import uuid
 from app.auth import get_current_user
-from app.repositories.file_repository import FileRepository
+from app.repositories.file_repository import AsyncFileRepository
 from app.config import Config
+from app.storage import save_upload, discard_upload, UploadTooLarge
 from app.templates_loader import templates
+from app.pagination import page_context
 
 router = APIRouter(prefix="/files", tags=["files"])
 
@@ -14,12 +16,16 @@ router = APIRouter(prefix="/files", tags=["files"])
 async def list_files(
         request: Request,
         user=Depends(get_current_user),
-        page: int = Query(1, ge=1)
+        page: int = Query(1, ge=1),
+        per_page: int = Query(20, ge=1, le=100)
 ):
     if user["role"] not in ["researcher", "admin"]:
         return RedirectResponse(url="/dashboard")
 
-    files = FileRepository.get_all()
+    files, total = await asyncio.gather(
+        AsyncFileRepository.get_all(limit=per_page, offset=(page - 1) * per_page),
+        AsyncFileRepository.count()
+    )
 
     return templates.TemplateResponse(
         "files/list.html",
@@ -27,7 +33,7 @@ async def list_files(
             "request": request,
             "user": user,
             "files": files,
-            "page": page
+            **page_context(page, per_page, total, len(files))
         }
     )
 
@@ -64,21 +70,28 @@ async def upload_file(
             }
         )
 
-    filename = f"{uuid.uuid4()}{file_ext}"
-    filepath = os.path.join(Config.UPLOAD_FOLDER, filename)
-
-    with open(filepath, "wb") as f:
-        content = await file.read()
-        f.write(content)
+    try:
+        tmp_path, size, sha256 = await save_upload(file)
+    except UploadTooLarge as e:
+        return templates.TemplateResponse(
+            "files/upload.html",
+            {"request": request, "user": user, "error": str(e)}
+        )
 
-    file_id = FileRepository.add(file.filename, filename)
+    try:
+        file_id = await AsyncFileRepository.add(file.filename, tmp_path, sha256, size)
+    finally:
+        discard_upload(tmp_path)
 
     return RedirectResponse(url=f"/files/{file_id}", status_code=302)
 
 
 @router.get("/{file_id}", response_class=HTMLResponse)
 async def file_detail(request: Request, file_id: int, user=Depends(get_current_user)):
-    file_data = FileRepository.get(file_id)
+    if user["role"] not in ["researcher", "admin"]:
+        return RedirectResponse(url="/dashboard")
+
+    file_data = await AsyncFileRepository.get(file_id)
     if not file_data:
         return RedirectResponse(url="/files")
 
@@ -88,11 +101,43 @@ async def file_detail(request: Request, file_id: int, user=Depends(get_current_u
             "request": request,
             "user": user,
             "file": file_data,
-            "file_url": f"/static/uploads/{file_data['path']}"
+            "file_url": f"/files/{file_id}/download"
         }
     )
 
 
+@router.get("/{file_id}/download")
+async def download_file(request: Request, file_id: int, user=Depends(get_current_user)):
+    if user["role"] not in ["researcher", "admin"]:
+        return RedirectResponse(url="/dashboard")
+
+    file_data = await AsyncFileRepository.get(file_id)
+    if not file_data:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    filepath = os.path.join(Config.UPLOAD_FOLDER, file_data['path'])
+    if not os.path.isfile(filepath):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    headers = {"Cache-Control": "private, no-cache"}
+    if file_data['sha256']:
+        # Содержимое blob неизменно, поэтому хеш годится как сильный ETag
+        etag = f'"{file_data["sha256"]}"'
+        headers["ETag"] = etag
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [
+            tag.strip() for tag in if_none_match.split(",")
+        ]):
+            return Response(status_code=304, headers=headers)
+
+    # FileResponse отдаёт Range/If-Range и использует http.response.pathsend (zero-copy),
+    # если ASGI-сервер поддерживает это расширение
+    response = FileResponse(filepath, filename=file_data['name'], headers=headers)
+    response.chunk_size = Config.DOWNLOAD_CHUNK_SIZE
+    return response
+
+
 @router.post("/{file_id}/delete")
 async def delete_file(
         request: Request,
@@ -102,12 +147,7 @@ async def delete_file(
     if user["role"] not in ["researcher", "admin"]:
         return RedirectResponse(url="/dashboard")
 
-    file_data = FileRepository.get(file_id)
-    if file_data:
-        filepath = os.path.join(Config.UPLOAD_FOLDER, file_data['path'])
-        if os.path.exists(filepath):
-            os.remove(filepath)
-
-        FileRepository.delete(file_id)
+    # Репозиторий сам уменьшает счётчик ссылок и удаляет blob с диска
+    await AsyncFileRepository.delete(file_id)
 
     return RedirectResponse(url="/files", status_code=302)
\ No newline at end of file
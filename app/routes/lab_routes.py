@@ -1,35 +1,73 @@
-from fastapi import APIRouter, Request, Depends, Form, Query
+import asyncio
+import csv
+import io
+import json
+from collections import Counter
+from fastapi import APIRouter, Request, Depends, Form, Query, UploadFile, File
 from fastapi.responses import HTMLResponse, RedirectResponse
 from datetime import datetime, date
 from app.auth import get_current_user
-from app.repositories.experiment_repository import ExperimentRepository
+from app.repositories.experiment_repository import AsyncExperimentRepository
+from app.repositories.lab_repository import AsyncLabRepository
 from app.services.teacher_service import TeacherService
 from app.services.student_service import StudentService
 from app.templates_loader import templates
+from app.page_cache import render_cached
+from app.pagination import page_context
 
 router = APIRouter(prefix="/labs", tags=["labs"])
 
+# Таблицы, из которых собирается страница списка лабораторных
+LIST_TABLES = ("labs", "experiments", "assigned_labs", "lab_results")
+
+
+def _parse_grades(content, filename):
+    # CSV "student_id,grade" (заголовок необязателен) или JSON-список / словарь {student_id: grade}.
+    # Пустая оценка остается None: grade_lab_bulk помечает такую строку как invalid
+    text = content.decode("utf-8-sig")
+    if filename.lower().endswith(".json") or text.lstrip().startswith(("[", "{")):
+        data = json.loads(text)
+        if isinstance(data, dict):
+            data = [dict(student_id=student_id, grade=grade) for student_id, grade in data.items()]
+        if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+            raise ValueError('JSON must be a list of {"student_id": ..., "grade": ...} objects')
+        return data
+
+    rows = []
+    header_checked = False
+    for record in csv.reader(io.StringIO(text)):
+        if not any(cell.strip() for cell in record):
+            continue
+        if not header_checked:
+            header_checked = True
+            if record[0].strip().lower() == "student_id":
+                continue
+        grade = record[1].strip() if len(record) > 1 else ""
+        rows.append(dict(student_id=record[0].strip(), grade=grade or None))
+    return rows
+
 
 @router.get("/", response_class=HTMLResponse)
 async def list_labs(
         request: Request,
         user=Depends(get_current_user),
-        page: int = Query(1, ge=1)
+        page: int = Query(1, ge=1),
+        per_page: int = Query(20, ge=1, le=100)
 ):
     if user["role"] not in ["teacher", "admin"]:
         return RedirectResponse(url="/dashboard")
 
-    labs = TeacherService.get_labs()
-
-    return templates.TemplateResponse(
-        "labs/list.html",
-        {
-            "request": request,
-            "user": user,
+    async def load_context():
+        labs, total = await asyncio.gather(
+            TeacherService.get_labs(limit=per_page, offset=(page - 1) * per_page),
+            AsyncLabRepository.count()
+        )
+        return {
             "labs": labs,
-            "page": page
+            **page_context(page, per_page, total, len(labs))
         }
-    )
+
+    return await render_cached(request, user, "labs/list.html", LIST_TABLES, load_context)
 
 
 @router.get("/create", response_class=HTMLResponse)
@@ -37,7 +75,7 @@ async def create_lab_page(request: Request, user=Depends(get_current_user)):
     if user["role"] not in ["teacher", "admin"]:
         return RedirectResponse(url="/dashboard")
 
-    experiments = ExperimentRepository.get_all()
+    experiments = await AsyncExperimentRepository.get_all()
 
     return templates.TemplateResponse(
         "labs/create.html",
@@ -63,11 +101,11 @@ async def create_lab(
 
     try:
         deadline_dt = datetime.fromisoformat(deadline)
-        lab_id = TeacherService.create_lab(name, instruction, deadline_dt, experiment_id)
+        lab_id = await TeacherService.create_lab(name, instruction, deadline_dt, experiment_id)
 
         return RedirectResponse(url=f"/labs/{lab_id}", status_code=302)
     except ValueError as e:
-        experiments = ExperimentRepository.get_all()
+        experiments = await AsyncExperimentRepository.get_all()
         return templates.TemplateResponse(
             "labs/create.html",
             {
@@ -80,11 +118,16 @@ async def create_lab(
 
 
 @router.get("/{lab_id}", response_class=HTMLResponse)
-async def lab_detail(request: Request, lab_id: int, user=Depends(get_current_user)):
+async def lab_detail(
+        request: Request,
+        lab_id: int,
+        assigned: int = Query(None),
+        user=Depends(get_current_user)
+):
     if user["role"] not in ["teacher", "admin"]:
         return RedirectResponse(url="/dashboard")
 
-    lab = TeacherService.get_lab(lab_id)
+    lab = await TeacherService.get_lab(lab_id)
     if not lab:
         return RedirectResponse(url="/labs")
 
@@ -93,7 +136,8 @@ async def lab_detail(request: Request, lab_id: int, user=Depends(get_current_use
         {
             "request": request,
             "user": user,
-            "lab": lab
+            "lab": lab,
+            "assigned": assigned
         }
     )
 
@@ -103,7 +147,7 @@ async def assign_lab_page(request: Request, lab_id: int, user=Depends(get_curren
     if user["role"] not in ["teacher", "admin"]:
         return RedirectResponse(url="/dashboard")
 
-    students = TeacherService.get_students()
+    students = await TeacherService.get_students()
 
     return templates.TemplateResponse(
         "labs/assign.html",
@@ -120,16 +164,21 @@ async def assign_lab_page(request: Request, lab_id: int, user=Depends(get_curren
 async def assign_lab(
         request: Request,
         lab_id: int,
-        student_ids: list = Form(...),
+        student_ids: list = Form(None),
+        assign_all: bool = Form(False),
         user=Depends(get_current_user)
 ):
     if user["role"] not in ["teacher", "admin"]:
         return RedirectResponse(url="/dashboard")
 
-    for student_id in student_ids:
-        TeacherService.assign_lab(lab_id, int(student_id))
+    if assign_all:
+        assigned = await TeacherService.assign_lab_to_all_students(lab_id)
+    else:
+        assigned = await TeacherService.assign_lab_to_multiple(
+            lab_id, [int(student_id) for student_id in student_ids or []]
+        )
 
-    return RedirectResponse(url=f"/labs/{lab_id}", status_code=302)
+    return RedirectResponse(url=f"/labs/{lab_id}?assigned={assigned}", status_code=302)
 
 
 @router.post("/{lab_id}/grade")
@@ -143,17 +192,60 @@ async def grade_lab(
     if user["role"] not in ["teacher", "admin"]:
         return RedirectResponse(url="/dashboard")
 
-    TeacherService.grade_lab(lab_id, student_id, grade)
+    await TeacherService.grade_lab(lab_id, student_id, grade)
     return RedirectResponse(url=f"/labs/{lab_id}", status_code=302)
 
 
+@router.get("/{lab_id}/grades/import", response_class=HTMLResponse)
+async def import_grades_page(request: Request, lab_id: int, user=Depends(get_current_user)):
+    if user["role"] not in ["teacher", "admin"]:
+        return RedirectResponse(url="/dashboard")
+
+    return templates.TemplateResponse(
+        "labs/grades_import.html",
+        {"request": request, "user": user, "lab_id": lab_id}
+    )
+
+
+@router.post("/{lab_id}/grades/import", response_class=HTMLResponse)
+async def import_grades(
+        request: Request,
+        lab_id: int,
+        grades_file: UploadFile = File(...),
+        user=Depends(get_current_user)
+):
+    if user["role"] not in ["teacher", "admin"]:
+        return RedirectResponse(url="/dashboard")
+
+    try:
+        rows = _parse_grades(await grades_file.read(), grades_file.filename or "")
+    except (ValueError, csv.Error) as e:
+        return templates.TemplateResponse(
+            "labs/grades_import.html",
+            {"request": request, "user": user, "lab_id": lab_id, "error": f"Could not parse file: {e}"}
+        )
+
+    results = await TeacherService.grade_lab_bulk(lab_id, rows)
+
+    return templates.TemplateResponse(
+        "labs/grades_import.html",
+        {
+            "request": request,
+            "user": user,
+            "lab_id": lab_id,
+            "results": results,
+            "summary": Counter(result['status'] for result in results)
+        }
+    )
+
+
 @router.get("/student/mylabs", response_class=HTMLResponse)
 async def student_labs(request: Request, user=Depends(get_current_user)):
     if user["role"] != "student":
         return RedirectResponse(url="/dashboard")
 
     student_id = int(user['sub'])
-    labs = StudentService.get_my_labs(student_id)
+    labs = await StudentService.get_my_labs(student_id)
 
     return templates.TemplateResponse(
         "labs/student_list.html",
@@ -172,7 +264,7 @@ async def student_lab_detail(request: Request, lab_id: int, user=Depends(get_cur
         return RedirectResponse(url="/dashboard")
 
     student_id = int(user['sub'])
-    lab = StudentService.get_lab_details(lab_id, student_id)
+    lab = await StudentService.get_lab_details(lab_id, student_id)
 
     if not lab:
         return RedirectResponse(url="/labs/student/mylabs")
@@ -199,6 +291,6 @@ async def submit_lab(
         return RedirectResponse(url="/dashboard")
 
     student_id = int(user['sub'])
-    StudentService.submit_lab(lab_id, student_id, submission)
+    await StudentService.submit_lab(lab_id, student_id, submission)
 
     return RedirectResponse(url=f"/labs/student/{lab_id}", status_code=302)
\ No newline at end of file
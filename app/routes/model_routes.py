@@ -1,43 +1,47 @@
+import asyncio
 from fastapi import APIRouter, Request, Depends, Form, UploadFile, File, Query
 from fastapi.responses import HTMLResponse, RedirectResponse
 import os
-import uuid
 from app.auth import get_current_user
-from app.repositories.model_repository import ModelRepository
-from app.repositories.file_repository import FileRepository
+from app.repositories.model_repository import AsyncModelRepository
+from app.repositories.file_repository import AsyncFileRepository
 from app.services.researcher_service import ResearcherService
 from app.config import Config
+from app.storage import save_upload, discard_upload, UploadTooLarge
 from app.templates_loader import templates
+from app.page_cache import render_cached
+from app.pagination import page_context
 
 router = APIRouter(prefix="/models", tags=["models"])
 
+# Таблицы, из которых собирается страница списка моделей
+LIST_TABLES = ("models",)
+
 
 @router.get("/", response_class=HTMLResponse)
 async def list_models(
         request: Request,
         user=Depends(get_current_user),
         page: int = Query(1, ge=1),
+        per_page: int = Query(20, ge=1, le=100),
         model_type: str = Query(None)
 ):
     if user["role"] not in ["researcher", "admin"]:
         return RedirectResponse(url="/dashboard")
 
-    if model_type:
-        models = ModelRepository.get_by_type(model_type)
-    else:
-        models = ModelRepository.get_all()
-
-    return templates.TemplateResponse(
-        "models/list.html",
-        {
-            "request": request,
-            "user": user,
+    async def load_context():
+        models, total = await asyncio.gather(
+            ResearcherService.get_models(limit=per_page, offset=(page - 1) * per_page, model_type=model_type),
+            AsyncModelRepository.count(model_type)
+        )
+        return {
             "models": models,
-            "page": page,
+            **page_context(page, per_page, total, len(models)),
             "model_type": model_type,
             "model_types": ["classification", "regression", "clustering", "neural_network", "other"]
         }
-    )
+
+    return await render_cached(request, user, "models/list.html", LIST_TABLES, load_context)
 
 
 @router.get("/create", response_class=HTMLResponse)
@@ -79,22 +83,29 @@ async def create_model(
             }
         )
 
-    filename = f"{uuid.uuid4()}{file_ext}"
-    filepath = os.path.join(Config.UPLOAD_FOLDER, filename)
-
-    with open(filepath, "wb") as f:
-        content = await model_file.read()
-        f.write(content)
+    try:
+        tmp_path, size, sha256 = await save_upload(model_file)
+    except UploadTooLarge as e:
+        return templates.TemplateResponse(
+            "models/create.html",
+            {
+                "request": request,
+                "user": user,
+                "model_types": ["classification", "regression", "clustering", "neural_network", "other"],
+                "error": str(e)
+            }
+        )
 
+    file_id = None
     try:
-        file_id = FileRepository.add(model_file.filename, filename)
+        file_id = await AsyncFileRepository.add(model_file.filename, tmp_path, sha256, size)
 
-        model_id = ResearcherService.create_model(name, description, model_type, file_id)
+        model_id = await ResearcherService.create_model(name, description, model_type, file_id)
 
         return RedirectResponse(url=f"/models/{model_id}", status_code=302)
     except Exception as e:
-        if os.path.exists(filepath):
-            os.remove(filepath)
+        if file_id:
+            await AsyncFileRepository.delete(file_id)
 
         return templates.TemplateResponse(
             "models/create.html",
@@ -105,11 +116,13 @@ async def create_model(
                 "error": str(e)
             }
         )
+    finally:
+        discard_upload(tmp_path)
 
 
 @router.get("/{model_id}", response_class=HTMLResponse)
 async def model_detail(request: Request, model_id: int, user=Depends(get_current_user)):
-    model = ResearcherService.get_model(model_id)
+    model = await ResearcherService.get_model(model_id)
     if not model:
         return RedirectResponse(url="/models")
 
@@ -119,7 +132,7 @@ async def model_detail(request: Request, model_id: int, user=Depends(get_current
             "request": request,
             "user": user,
             "model": model,
-            "file_url": f"/static/uploads/{model['file_path']}" if model.get('file_path') else None
+            "file_url": f"/files/{model['file_id']}/download" if model.get('file_path') else None
         }
     )
 
@@ -129,7 +142,7 @@ async def edit_model_page(request: Request, model_id: int, user=Depends(get_curr
     if user["role"] not in ["researcher", "admin"]:
         return RedirectResponse(url="/dashboard")
 
-    model = ModelRepository.get(model_id)
+    model = await AsyncModelRepository.get(model_id)
     if not model:
         return RedirectResponse(url="/models")
 
@@ -156,7 +169,7 @@ async def update_model(
     if user["role"] not in ["researcher", "admin"]:
         return RedirectResponse(url="/dashboard")
 
-    ModelRepository.update(model_id, name, description, model_type)
+    await AsyncModelRepository.update(model_id, name, description, model_type)
     return RedirectResponse(url=f"/models/{model_id}", status_code=302)
 
 
@@ -169,5 +182,5 @@ async def delete_model(
     if user["role"] not in ["researcher", "admin"]:
         return RedirectResponse(url="/dashboard")
 
-    ModelRepository.delete(model_id)
+    await AsyncModelRepository.delete(model_id)
     return RedirectResponse(url="/models", status_code=302)
\ No newline at end of file
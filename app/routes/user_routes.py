@@ -1,11 +1,12 @@
+import asyncio
 from fastapi import APIRouter, Request, Depends, Form, Query
 from fastapi.responses import HTMLResponse, RedirectResponse
 from app.auth import get_current_user
-from app.repositories.user_repository import UserRepository
-from app.repositories.credentials_repository import CredentialsRepository
+from app.repositories.user_repository import AsyncUserRepository
+from app.loaders import get_loaders
 from app.services.admin_service import AdminService
-#from app.templates import templates
 from app.templates_loader import templates
+from app.pagination import page_context
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -20,26 +21,19 @@ async def list_users(
     if user["role"] != "admin":
         return RedirectResponse(url="/dashboard")
 
-    all_users = UserRepository.get_all()
-    for user_data in all_users:
-        user_data['username'] = CredentialsRepository.get_by_user_id(user_data['id'])
-
-    # Пагинация
-    total = len(all_users)
-    start = (page - 1) * per_page
-    end = start + per_page
-    paginated_users = all_users[start:end]
+    # Пагинация на стороне БД
+    users, total = await asyncio.gather(
+        AdminService.get_all_users(limit=per_page, offset=(page - 1) * per_page),
+        AsyncUserRepository.count()
+    )
 
     return templates.TemplateResponse(
         "users/list.html",
         {
             "request": request,
             "user": user,
-            "users": paginated_users,
-            "page": page,
-            "per_page": per_page,
-            "total": total,
-            "total_pages": (total + per_page - 1) // per_page
+            "users": users,
+            **page_context(page, per_page, total, len(users))
         }
     )
 
@@ -69,7 +63,7 @@ async def create_user(
         return RedirectResponse(url="/dashboard")
 
     try:
-        user_id = AdminService.create_user(full_name, email, username, password, role)
+        user_id = await AdminService.create_user(full_name, email, username, password, role)
         return RedirectResponse(url=f"/users/{user_id}", status_code=302)
     except ValueError as e:
         return templates.TemplateResponse(
@@ -79,16 +73,19 @@ async def create_user(
 
 
 @router.get("/{user_id}", response_class=HTMLResponse)
-async def user_detail(request: Request, user_id: int, user=Depends(get_current_user)):
+async def user_detail(
+        request: Request,
+        user_id: int,
+        user=Depends(get_current_user),
+        loaders=Depends(get_loaders)
+):
     if user["role"] != "admin":
         return RedirectResponse(url="/dashboard")
 
-    user_data = UserRepository.get(user_id)
+    user_data = await loaders.users.load(user_id)
     if not user_data:
         return RedirectResponse(url="/users")
 
-    user_data['username'] = CredentialsRepository.get_by_user_id(user_id)
-
     return templates.TemplateResponse(
         "users/detail.html",
         {
@@ -107,17 +104,17 @@ async def update_user(
         email: str = Form(None),
         role: str = Form(None),
         password: str = Form(None),
-        user=Depends(get_current_user)
+        user=Depends(get_current_user),
+        loaders=Depends(get_loaders)
 ):
     if user["role"] != "admin":
         return RedirectResponse(url="/dashboard")
 
     try:
-        AdminService.update_user(user_id, full_name, email, role, password)
+        await AdminService.update_user(user_id, full_name, email, role, password)
         return RedirectResponse(url=f"/users/{user_id}", status_code=302)
     except Exception as e:
-        user_data = UserRepository.get(user_id)
-        user_data['username'] = CredentialsRepository.get_by_user_id(user_id)
+        user_data = await loaders.users.load(user_id)
 
         return templates.TemplateResponse(
             "users/detail.html",
@@ -139,5 +136,5 @@ async def delete_user(
     if user["role"] != "admin":
         return RedirectResponse(url="/dashboard")
 
-    AdminService.delete_user(user_id)
+    await AdminService.delete_user(user_id)
     return RedirectResponse(url="/users", status_code=302)
\ No newline at end of file
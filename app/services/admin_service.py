@@ -1,60 +1,53 @@
-from app.repositories.user_repository import UserRepository
-from app.repositories.credentials_repository import CredentialsRepository
+from app.auth import invalidate_user_tokens, refresh_user_role
+from app.config import Config
+from app.repositories.user_repository import AsyncUserRepository
+from app.repositories.credentials_repository import AsyncCredentialsRepository
+from app.repositories.stats_repository import AsyncStatsRepository
 
 
 class AdminService:
     @staticmethod
-    def get_all_users():
-        users = UserRepository.get_all()
-        for user in users:
-            user['username'] = CredentialsRepository.get_by_user_id(user['id'])
-        return users
+    async def get_all_users(limit=None, offset=0):
+        return await AsyncUserRepository.get_all_with_usernames(limit=limit, offset=offset)
 
     @staticmethod
-    def create_user(full_name, email, username, password, role):
-        if UserRepository.get_by_email(email):
+    async def create_user(full_name, email, username, password, role):
+        if await AsyncUserRepository.get_by_email(email):
             raise ValueError("User with this email already exists")
-        if CredentialsRepository.username_exists(username):
+        if await AsyncCredentialsRepository.username_exists(username):
             raise ValueError("Username already exists")
 
-        user_id = UserRepository.add(full_name, email, role)
-        CredentialsRepository.add(user_id, username, password)
+        user_id = await AsyncUserRepository.add(full_name, email, role)
+        await AsyncCredentialsRepository.add(user_id, username, password)
         return user_id
 
     @staticmethod
-    def update_user(user_id, full_name=None, email=None, role=None, password=None):
+    async def update_user(user_id, full_name=None, email=None, role=None, password=None):
         if full_name or email or role:
-            UserRepository.update(user_id, full_name, email, role)
+            await AsyncUserRepository.update(user_id, full_name, email, role)
         if password:
-            CredentialsRepository.update_password(user_id, password)
+            await AsyncCredentialsRepository.update_password(user_id, password)
+        if role:
+            await refresh_user_role(user_id, role)
+        if password:
+            await invalidate_user_tokens(user_id)
 
     @staticmethod
-    def delete_user(user_id):
-        UserRepository.delete(user_id)
+    async def delete_user(user_id):
+        await AsyncUserRepository.delete(user_id)
+        await invalidate_user_tokens(user_id)
 
     @staticmethod
-    def get_system_stats():
-        from app.repositories.model_repository import ModelRepository
-        from app.repositories.experiment_repository import ExperimentRepository
-
-        with ModelRepository.get_all() as models, \
-                ExperimentRepository.get_all() as experiments, \
-                UserRepository.get_all() as users:
-
-            stats = {
-                'total_users': len(users),
-                'total_models': len(models),
-                'total_experiments': len(experiments),
-                'users_by_role': {},
-                'models_by_type': {}
-            }
-
-            for user in users:
-                role = user['role']
-                stats['users_by_role'][role] = stats['users_by_role'].get(role, 0) + 1
-
-            for model in models:
-                model_type = model['model_type']
-                stats['models_by_type'][model_type] = stats['models_by_type'].get(model_type, 0) + 1
-
-            return stats
\ No newline at end of file
+    async def get_system_stats():
+        counts = await AsyncStatsRepository.get_counts(use_rollup=Config.STATS_ROLLUP)
+        users_by_role = counts.get('users_by_role', {})
+        models_by_type = counts.get('models_by_type', {})
+        return {
+            'total_users': sum(users_by_role.values()),
+            'total_models': sum(models_by_type.values()),
+            'total_experiments': counts.get('experiments', {}).get('', 0),
+            'total_labs': counts.get('labs', {}).get('', 0),
+            'total_files': counts.get('files', {}).get('', 0),
+            'users_by_role': users_by_role,
+            'models_by_type': models_by_type
+        }
@@ -1,34 +1,184 @@
-from app.repositories.experiment_repository import ExperimentRepository
-from app.repositories.model_repository import ModelRepository
-from app.repositories.parameter_repository import ParameterRepository
+import csv
+import io
+import orjson
+from pydantic import ValidationError
+from app.config import Config
+from app.models.experiment import ExperimentCreate
+from app.repositories.experiment_repository import AsyncExperimentRepository
+from app.repositories.model_repository import AsyncModelRepository
+from app.repositories.parameter_repository import AsyncParameterRepository
+
+EXPORT_CSV_HEADER = [
+    "experiment_id", "name", "description", "model_id", "model_name", "parameter_name", "parameter_value"
+]
+
+
+async def _ndjson_lines(rows):
+    # Строки идут по порядку экспериментов, поэтому в памяти держим только текущий
+    current = None
+    async for exp_id, name, description, model_id, model_name, param_name, param_value in rows:
+        if current is None or current["id"] != exp_id:
+            if current is not None:
+                yield orjson.dumps(current) + b"\n"
+            current = dict(
+                id=exp_id, name=name, description=description,
+                model_id=model_id, model_name=model_name, parameters={}
+            )
+        if param_name is not None:
+            current["parameters"][param_name] = param_value
+    if current is not None:
+        yield orjson.dumps(current) + b"\n"
+
+
+async def _csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_CSV_HEADER)
+    yield buffer.getvalue().encode()
+    async for row in rows:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+        yield buffer.getvalue().encode()
+
+
+class ImportAborted(ValueError):
+    def __init__(self, line, message):
+        super().__init__(message)
+        self.line = line
+
+
+def _parse_import_line(line):
+    try:
+        record = orjson.loads(line)
+        if not isinstance(record, dict):
+            raise ValueError("expected a JSON object")
+        return ExperimentCreate(**record), None
+    except ValidationError as e:
+        error = e.errors()[0]
+        return None, f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+    except ValueError as e:
+        return None, str(e)
+
+
+async def _as_rows(batches):
+    async for batch in batches:
+        yield [(e.name, e.description, e.model_id, e.parameters or {}) for _, e in batch]
+
 
 class ResearcherService:
     @staticmethod
-    def create_experiment(name, description, model_id, parameters=None):
-        exp_id = ExperimentRepository.add(name, description, model_id)
+    async def create_experiment(name, description, model_id, parameters=None):
+        exp_id = await AsyncExperimentRepository.add(name, description, model_id)
         if parameters:
-            ParameterRepository.add_batch(exp_id, parameters)
+            await AsyncParameterRepository.add_batch(exp_id, parameters)
         return exp_id
 
     @staticmethod
-    def get_experiments():
-        return ExperimentRepository.get_all()
+    async def get_experiments(limit=None, offset=0, model_id=None):
+        return await AsyncExperimentRepository.get_all(limit=limit, offset=offset, model_id=model_id)
 
     @staticmethod
-    def get_experiment(exp_id):
-        experiment = ExperimentRepository.get(exp_id)
+    async def import_parameters(exp_id, parameters):
+        # Повторный импорт набора: существующие параметры обновляются по имени, новые добавляются
+        await AsyncParameterRepository.add_batch(exp_id, parameters, upsert=True)
+        return await AsyncParameterRepository.get_by_experiment(exp_id)
+
+    @staticmethod
+    async def get_experiment(exp_id):
+        experiment = await AsyncExperimentRepository.get(exp_id)
         if experiment:
-            experiment['parameters'] = ParameterRepository.get_by_experiment(exp_id)
+            experiment['parameters'] = await AsyncParameterRepository.get_by_experiment(exp_id)
         return experiment
 
     @staticmethod
-    def create_model(name, description, model_type, file_id):
-        return ModelRepository.add(name, description, model_type, file_id)
+    async def create_model(name, description, model_type, file_id):
+        return await AsyncModelRepository.add(name, description, model_type, file_id)
+
+    @staticmethod
+    async def get_models(limit=None, offset=0, model_type=None):
+        return await AsyncModelRepository.get_all(limit=limit, offset=offset, model_type=model_type)
 
     @staticmethod
-    def get_models():
-        return ModelRepository.get_all()
+    async def get_model(model_id):
+        return await AsyncModelRepository.get(model_id)
 
     @staticmethod
-    def get_model(model_id):
-        return ModelRepository.get(model_id)
\ No newline at end of file
+    async def export_experiments(fmt="ndjson", model_id=None):
+        """Yield experiments with their parameters as NDJSON (one experiment per line)
+        or CSV (one parameter per line) in chunks of about Config.EXPORT_CHUNK_SIZE bytes."""
+        rows = AsyncExperimentRepository.iter_with_parameters(model_id, batch_size=Config.EXPORT_BATCH_SIZE)
+        lines = _csv_lines(rows) if fmt == "csv" else _ndjson_lines(rows)
+
+        chunk = []
+        size = 0
+        first = True
+        async for line in lines:
+            chunk.append(line)
+            size += len(line)
+            # Первую порцию отдаём сразу, дальше копим до EXPORT_CHUNK_SIZE
+            if first or size >= Config.EXPORT_CHUNK_SIZE:
+                yield b"".join(chunk)
+                chunk = []
+                size = 0
+                first = False
+        if chunk:
+            yield b"".join(chunk)
+
+    @staticmethod
+    async def import_experiments(lines, dry_run=False):
+        """Import experiments from an async iterator of NDJSON lines, yielding progress events.
+
+        Lines are parsed one at a time and loaded with COPY in batches of
+        Config.IMPORT_BATCH_SIZE inside a single transaction: the first invalid
+        line aborts the whole import. A dry run only validates (including that
+        the referenced models exist) and reports every error.
+        """
+        stats = dict(processed=0, imported=0, parameters=0)
+        errors = []
+
+        async def batches():
+            batch = []
+            number = 0
+            async for line in lines:
+                number += 1
+                if not line.strip():
+                    continue
+                experiment, error = _parse_import_line(line)
+                if error:
+                    if not dry_run:
+                        raise ImportAborted(number, error)
+                    errors.append(dict(line=number, error=error))
+                    continue
+                batch.append((number, experiment))
+                if len(batch) >= Config.IMPORT_BATCH_SIZE:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+        try:
+            if dry_run:
+                async for batch in batches():
+                    existing = await AsyncModelRepository.get_existing_ids({e.model_id for _, e in batch})
+                    for number, experiment in batch:
+                        if experiment.model_id not in existing:
+                            errors.append(dict(line=number, error=f"model {experiment.model_id} does not exist"))
+                    stats["processed"] += len(batch)
+                    yield dict(event="progress", **stats)
+            else:
+                async for imported, parameters in AsyncExperimentRepository.import_batches(_as_rows(batches())):
+                    stats["processed"] += imported
+                    stats["imported"] += imported
+                    stats["parameters"] += parameters
+                    yield dict(event="progress", **stats)
+        except ImportAborted as e:
+            # Транзакция откатилась целиком
+            yield dict(event="error", line=e.line, error=str(e), processed=stats["processed"], imported=0, parameters=0)
+            return
+        except Exception as e:
+            yield dict(event="error", line=None, error=str(e), processed=stats["processed"], imported=0, parameters=0)
+            return
+
+        yield dict(event="done", dry_run=dry_run, errors=errors[:Config.IMPORT_MAX_ERRORS],
+                   error_count=len(errors), **stats)
@@ -1,23 +1,19 @@
-from app.repositories.lab_repository import LabRepository
-from app.repositories.user_repository import UserRepository
+from app.repositories.lab_repository import AsyncLabRepository
+from app.repositories.user_repository import AsyncUserRepository
 
 class StudentService:
     @staticmethod
-    def submit_lab(lab_id, student_id, value):
-        LabRepository.submit_lab(lab_id, student_id, value)
+    async def submit_lab(lab_id, student_id, value):
+        await AsyncLabRepository.submit_lab(lab_id, student_id, value)
 
     @staticmethod
-    def get_my_labs(student_id):
-        return LabRepository.get_student_labs(student_id)
+    async def get_my_labs(student_id):
+        return await AsyncLabRepository.get_student_labs(student_id)
 
     @staticmethod
-    def get_lab_details(lab_id, student_id):
-        labs = LabRepository.get_student_labs(student_id)
-        for lab in labs:
-            if lab['id'] == lab_id:
-                return lab
-        return None
+    async def get_lab_details(lab_id, student_id):
+        return await AsyncLabRepository.get_student_lab(lab_id, student_id)
 
     @staticmethod
-    def get_profile(student_id):
-        return UserRepository.get(student_id)
\ No newline at end of file
+    async def get_profile(student_id):
+        return await AsyncUserRepository.get(student_id)
\ No newline at end of file
@@ -1,42 +1,86 @@
 from datetime import datetime
-from app.repositories.lab_repository import LabRepository
-from app.repositories.user_repository import UserRepository
+from pydantic import ValidationError
+from app.models.lab import LabAssignment
+from app.repositories.lab_repository import AsyncLabRepository
+from app.repositories.user_repository import AsyncUserRepository
 
 class TeacherService:
     @staticmethod
-    def create_lab(name, instruction, deadline, experiment_id):
+    async def create_lab(name, instruction, deadline, experiment_id):
         if isinstance(deadline, str):
             deadline = datetime.fromisoformat(deadline)
-        return LabRepository.add(name, instruction, deadline, experiment_id)
+        return await AsyncLabRepository.add(name, instruction, deadline, experiment_id)
 
     @staticmethod
-    def get_labs():
-        return LabRepository.get_all()
+    async def get_labs(limit=None, offset=0):
+        return await AsyncLabRepository.get_all(limit=limit, offset=offset)
 
     @staticmethod
-    def get_lab(lab_id):
-        lab = LabRepository.get(lab_id)
+    async def get_lab(lab_id):
+        lab = await AsyncLabRepository.get(lab_id)
         if lab:
-            lab['assignments'] = LabRepository.get_assignments(lab_id)
+            lab['assignments'] = await AsyncLabRepository.get_assignments(lab_id)
         return lab
 
     @staticmethod
-    def assign_lab(lab_id, student_id):
-        LabRepository.assign(lab_id, student_id)
+    async def assign_lab(lab_id, student_id):
+        await AsyncLabRepository.assign(lab_id, student_id)
 
     @staticmethod
-    def assign_lab_to_multiple(lab_id, student_ids):
-        for student_id in student_ids:
-            LabRepository.assign(lab_id, student_id)
+    async def assign_lab_to_multiple(lab_id, student_ids):
+        return await AsyncLabRepository.assign_many(lab_id, student_ids)
 
     @staticmethod
-    def grade_lab(lab_id, student_id, grade):
-        LabRepository.grade(lab_id, student_id, grade)
+    async def assign_lab_to_all_students(lab_id):
+        return await AsyncLabRepository.assign_all_students(lab_id)
 
     @staticmethod
-    def get_students():
-        return [user for user in UserRepository.get_all() if user['role'] == 'student']
+    async def grade_lab(lab_id, student_id, grade):
+        await AsyncLabRepository.grade(lab_id, student_id, grade)
 
     @staticmethod
-    def get_lab_submissions(lab_id):
-        return LabRepository.get_assignments(lab_id)
\ No newline at end of file
+    async def grade_lab_bulk(lab_id, rows):
+        results = []
+        valid = {}
+
+        for number, row in enumerate(rows, start=1):
+            result = dict(row=number, student_id=row.get('student_id'), grade=row.get('grade'),
+                          status='invalid', error=None)
+            results.append(result)
+            try:
+                assignment = LabAssignment(**row)
+            except ValidationError as e:
+                error = e.errors()[0]
+                result['error'] = f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}"
+                continue
+            if assignment.grade is None:
+                # Пустая оценка в файле - ошибка, а не команда стереть уже выставленную
+                result['error'] = "grade: Field required"
+                continue
+
+            if assignment.student_id in valid:
+                previous = valid[assignment.student_id]
+                previous['status'] = 'skipped'
+                previous['error'] = f"Overridden by row {number}"
+            result.update(student_id=assignment.student_id, grade=assignment.grade, status='pending')
+            valid[assignment.student_id] = result
+
+        updated = set(await AsyncLabRepository.grade_many(
+            lab_id, [(student_id, result['grade']) for student_id, result in valid.items()]
+        ))
+        for student_id, result in valid.items():
+            if student_id in updated:
+                result['status'] = 'updated'
+            else:
+                result['status'] = 'not_assigned'
+                result['error'] = "Student is not assigned to this lab"
+
+        return results
+
+    @staticmethod
+    async def get_students():
+        return await AsyncUserRepository.get_by_role('student')
+
+    @staticmethod
+    async def get_lab_submissions(lab_id):
+        return await AsyncLabRepository.get_assignments(lab_id)
\ No newline at end of file
@@ -0,0 +1,231 @@
+import hashlib
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from app.config import Config
+from app.database import get_db_cursor
+from app.notify import listener
+
+NOTIFY_CHANNEL = "sessions"
+SWEEP_EVERY = 1000  # чистим просроченные сессии раз в столько созданий
+
+
+def _digest(token):
+    # В кеше и в БД храним только хеш идентификатора сессии
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class MemorySessionStore:
+    """Server-side sessions kept in this process only.
+
+    Suitable for a single worker: sessions created by one uvicorn worker are
+    invisible to the others.
+    """
+
+    def __init__(self, ttl, max_sessions=None):
+        self.ttl = ttl
+        self.max_sessions = max_sessions or Config.SESSION_CACHE_SIZE
+        self._sessions = OrderedDict()  # digest -> dict(user_id, role, exp), от давно не читанных к свежим
+        self._by_user = {}  # user_id -> {digest}
+        self._lock = threading.Lock()
+        self._created = 0
+
+    def create(self, user_id, role):
+        token = secrets.token_urlsafe(32)
+        session = dict(user_id=int(user_id), role=role, exp=int(time.time() + self.ttl))
+        self._persist(_digest(token), session)
+        self._remember(_digest(token), session)
+
+        with self._lock:
+            self._created += 1
+            sweep = self._created % SWEEP_EVERY == 0
+        if sweep:
+            self.sweep()
+        return token
+
+    def get(self, token):
+        digest = _digest(token)
+        with self._lock:
+            session = self._sessions.get(digest)
+            if session is not None:
+                self._sessions.move_to_end(digest)
+        if session is None:
+            session = self._load(digest)
+        if session is None:
+            return None
+        if session["exp"] <= time.time():
+            # Просроченную сессию убираем сразу, не дожидаясь sweep
+            self._forget(digest)
+            return None
+        return dict(session)
+
+    def revoke(self, token):
+        self._forget(_digest(token))
+
+    def revoke_user(self, user_id, keep=None):
+        self._forget_user(int(user_id), _digest(keep) if keep else None)
+
+    def set_role(self, user_id, role):
+        self._apply_role(int(user_id), role)
+
+    def sweep(self):
+        now = time.time()
+        with self._lock:
+            expired = [digest for digest, session in self._sessions.items() if session["exp"] <= now]
+        for digest in expired:
+            self._forget(digest)
+
+    def stats(self):
+        with self._lock:
+            return {"backend": type(self).__name__, "cached_sessions": len(self._sessions)}
+
+    # Точки расширения для хранилищ с персистентностью
+    def _persist(self, digest, session):
+        pass
+
+    def _load(self, digest):
+        return None
+
+    def _remember(self, digest, session):
+        with self._lock:
+            self._sessions[digest] = session
+            self._by_user.setdefault(session["user_id"], set()).add(digest)
+            overflow = len(self._sessions) > self.max_sessions
+        if overflow:
+            self._shrink()
+
+    def _shrink(self):
+        # Сначала освобождаем место от просроченных, затем вытесняем давно не читанные.
+        # В памяти это разлогинивает пользователя, в PostgresSessionStore сессия
+        # просто будет заново прочитана из БД.
+        MemorySessionStore.sweep(self)
+        with self._lock:
+            while len(self._sessions) > self.max_sessions:
+                digest, session = self._sessions.popitem(last=False)
+                self._discard_digest(session["user_id"], digest)
+
+    def _forget(self, digest):
+        with self._lock:
+            session = self._sessions.pop(digest, None)
+            if session is not None:
+                self._discard_digest(session["user_id"], digest)
+
+    def _discard_digest(self, user_id, digest):
+        # Вызывается под self._lock
+        digests = self._by_user.get(user_id, set())
+        digests.discard(digest)
+        if not digests:
+            self._by_user.pop(user_id, None)
+
+    def _forget_user(self, user_id, keep_digest=None):
+        with self._lock:
+            digests = self._by_user.pop(user_id, set())
+            for digest in digests:
+                if digest != keep_digest:
+                    self._sessions.pop(digest, None)
+            if keep_digest in digests:
+                self._by_user[user_id] = {keep_digest}
+
+    def _apply_role(self, user_id, role):
+        with self._lock:
+            for digest in self._by_user.get(user_id, ()):
+                self._sessions[digest] = dict(self._sessions[digest], role=role)
+
+    def _clear(self):
+        with self._lock:
+            self._sessions.clear()
+            self._by_user.clear()
+
+
+class PostgresSessionStore(MemorySessionStore):
+    """Sessions persisted in the sessions table and cached in every worker.
+
+    Lookups are served from the local cache; only a session this worker has
+    not seen yet costs a query. Revocations and role changes are published
+    with NOTIFY and applied by the worker's notification listener, so they
+    take effect in every worker without polling.
+    """
+
+    def __init__(self, ttl):
+        super().__init__(ttl)
+        listener.subscribe(NOTIFY_CHANNEL, self._on_notify, on_reset=self._clear)
+
+    def revoke(self, token):
+        digest = _digest(token)
+        with get_db_cursor() as cur:
+            cur.execute("DELETE FROM sessions WHERE id=%s", (digest,))
+            self._notify(cur, op="revoke", digest=digest)
+        self._forget(digest)
+
+    def revoke_user(self, user_id, keep=None):
+        keep_digest = _digest(keep) if keep else None
+        with get_db_cursor() as cur:
+            cur.execute(
+                "DELETE FROM sessions WHERE user_id=%s AND id IS DISTINCT FROM %s",
+                (user_id, keep_digest)
+            )
+            self._notify(cur, op="revoke_user", user_id=int(user_id), keep=keep_digest)
+        self._forget_user(int(user_id), keep_digest)
+
+    def set_role(self, user_id, role):
+        with get_db_cursor() as cur:
+            cur.execute("UPDATE sessions SET user_role=%s WHERE user_id=%s", (role, user_id))
+            self._notify(cur, op="role", user_id=int(user_id), role=role)
+        self._apply_role(int(user_id), role)
+
+    def sweep(self):
+        super().sweep()
+        with get_db_cursor() as cur:
+            # expires_at - timestamp без зоны, в нем хранится время UTC
+            cur.execute("DELETE FROM sessions WHERE expires_at < now() AT TIME ZONE 'UTC'")
+
+    def _persist(self, digest, session):
+        with get_db_cursor() as cur:
+            cur.execute(
+                "INSERT INTO sessions(id, user_id, user_role, expires_at) "
+                "VALUES (%s, %s, %s, to_timestamp(%s) AT TIME ZONE 'UTC')",
+                (digest, session["user_id"], session["role"], session["exp"])
+            )
+
+    def _load(self, digest):
+        with get_db_cursor() as cur:
+            cur.execute(
+                "SELECT user_id, user_role, EXTRACT(EPOCH FROM expires_at) FROM sessions WHERE id=%s",
+                (digest,)
+            )
+            row = cur.fetchone()
+        if not row:
+            return None
+        session = dict(user_id=row[0], role=row[1], exp=int(row[2]))
+        self._remember(digest, session)
+        return session
+
+    @staticmethod
+    def _notify(cur, **message):
+        # pg_notify доставляется только после коммита транзакции
+        cur.execute("SELECT pg_notify(%s, %s)", (NOTIFY_CHANNEL, json.dumps(message)))
+
+    def _on_notify(self, payload):
+        message = json.loads(payload)
+        if message["op"] == "revoke":
+            self._forget(message["digest"])
+        elif message["op"] == "revoke_user":
+            self._forget_user(message["user_id"], message.get("keep"))
+        elif message["op"] == "role":
+            self._apply_role(message["user_id"], message["role"])
+
+
+def create_session_store(backend):
+    ttl = Config.SESSION_TTL_HOURS * 3600
+    if backend == "memory":
+        return MemorySessionStore(ttl)
+    if backend == "postgres":
+        return PostgresSessionStore(ttl)
+    return None
+
+
+# None - режим по умолчанию: stateless JWT
+session_store = create_session_store(Config.SESSION_STORE)
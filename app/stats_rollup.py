@@ -0,0 +1,120 @@
+"""Triggers that keep the stats_rollup counters in step with the tables.
+
+Every write statement on a counted table upserts one counter row, so all
+writers of that table serialize on it until they commit. The triggers are
+therefore installed only while STATS_ROLLUP=true: sync() installs them and
+recounts from scratch, or drops them and empties stats_rollup when the
+rollup is off. python -m app.migrate calls it after applying migrations,
+so changing STATS_ROLLUP takes effect on the next migrate run.
+
+    python -m app.stats_rollup       # match the triggers to STATS_ROLLUP
+"""
+import logging
+import sys
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Таблица, имя счетчика, колонка группировки, операции с триггерами.
+# Функция stats_rollup_trigger() создается миграцией 0005_stats_rollup.sql
+TRIGGERS = (
+    ("users", "users_by_role", "user_role", ("insert", "update", "delete")),
+    ("models", "models_by_type", "model_type", ("insert", "update", "delete")),
+    ("experiments", "experiments", None, ("insert", "delete")),
+    ("labs", "labs", None, ("insert", "delete")),
+    ("files", "files", None, ("insert", "delete")),
+)
+
+TRANSITION_TABLES = {
+    "insert": "referencing new table as new_rows",
+    "update": "referencing old table as old_rows new table as new_rows",
+    "delete": "referencing old table as old_rows",
+}
+
+TRIGGER_NAMES = [f"{table}_stats_{op}" for table, _, _, ops in TRIGGERS for op in ops]
+
+INSTALLED_SQL = "SELECT count(*) FROM pg_trigger WHERE tgname = ANY(%s) AND NOT tgisinternal"
+
+# Пересчет с нуля; запись в таблицы блокируется до конца транзакции
+RECOUNT_SQL = """
+    lock table users, models, experiments, labs, files in share row exclusive mode;
+    delete from stats_rollup;
+    insert into stats_rollup(metric, key, count)
+    select 'users_by_role', coalesce(user_role, ''), count(*) from users group by 2
+    union all
+    select 'models_by_type', coalesce(model_type, ''), count(*) from models group by 2
+    union all
+    select 'experiments', '', count(*) from experiments
+    union all
+    select 'labs', '', count(*) from labs
+    union all
+    select 'files', '', count(*) from files;
+"""
+
+
+def _create_trigger(table, metric, column, op):
+    args = f"'{metric}', '{column}'" if column else f"'{metric}'"
+    return (
+        f"create trigger {table}_stats_{op} after {op} on {table} {TRANSITION_TABLES[op]} "
+        f"for each statement execute function stats_rollup_trigger({args})"
+    )
+
+
+def _drop_triggers(cur):
+    for table, _, _, ops in TRIGGERS:
+        for op in ops:
+            cur.execute(f"drop trigger if exists {table}_stats_{op} on {table}")
+
+
+def installed_count(conn):
+    with conn.cursor() as cur:
+        cur.execute(INSTALLED_SQL, (TRIGGER_NAMES,))
+        count = cur.fetchone()[0]
+    conn.commit()
+    return count
+
+
+def enable(conn):
+    """Install the triggers and recount stats_rollup in one transaction."""
+    with conn.cursor() as cur:
+        _drop_triggers(cur)
+        for table, metric, column, ops in TRIGGERS:
+            for op in ops:
+                cur.execute(_create_trigger(table, metric, column, op))
+        cur.execute(RECOUNT_SQL)
+    conn.commit()
+
+
+def disable(conn):
+    """Drop the triggers; the stale counters go with them."""
+    with conn.cursor() as cur:
+        _drop_triggers(cur)
+        cur.execute("delete from stats_rollup")
+    conn.commit()
+
+
+def sync(conn):
+    count = installed_count(conn)
+    if Config.STATS_ROLLUP and count != len(TRIGGER_NAMES):
+        logger.info("Installing stats_rollup triggers")
+        enable(conn)
+    elif not Config.STATS_ROLLUP and count:
+        logger.info("Dropping stats_rollup triggers, STATS_ROLLUP is off")
+        disable(conn)
+
+
+def main():
+    from app.migrate import connect
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    conn = connect()
+    try:
+        sync(conn)
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import hashlib
+import os
+import uuid
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import PlainTextResponse
+from app.config import Config
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+def _copy_stream(src, dest_path, max_size, chunk_size):
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(dest_path, "wb") as dst:
+            while True:
+                chunk = src.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLarge(
+                        f"File is too large. Maximum size is {max_size // (1024 * 1024)} MB"
+                    )
+                digest.update(chunk)
+                dst.write(chunk)
+    except BaseException:
+        discard_upload(dest_path)
+        raise
+    return size, digest.hexdigest()
+
+
+async def save_upload(upload):
+    """Stream an UploadFile to a temporary file in UPLOAD_FOLDER in fixed-size chunks.
+
+    The copy, the size check and the SHA-256 run in one pass on a worker
+    thread. Returns (tmp_path, size, sha256_hex); raises UploadTooLarge past
+    Config.MAX_CONTENT_LENGTH, leaving nothing behind on disk. Oversized
+    request bodies never get this far: BodySizeLimitMiddleware rejects them
+    while Starlette is still parsing the form.
+    """
+    await upload.seek(0)
+    tmp_path = os.path.join(Config.UPLOAD_FOLDER, f"{uuid.uuid4()}.upload")
+    size, sha256 = await run_in_threadpool(
+        _copy_stream, upload.file, tmp_path, Config.MAX_CONTENT_LENGTH, Config.UPLOAD_CHUNK_SIZE
+    )
+    return tmp_path, size, sha256
+
+
+def stage_file(path):
+    """Copy a file already on disk to a temporary upload, hashing it on the way.
+
+    Returns (tmp_path, size, sha256_hex) like save_upload, for store_blob.
+    """
+    tmp_path = os.path.join(Config.UPLOAD_FOLDER, f"{uuid.uuid4()}.upload")
+    with open(path, "rb") as src:
+        size, sha256 = _copy_stream(src, tmp_path, float("inf"), Config.UPLOAD_CHUNK_SIZE)
+    return tmp_path, size, sha256
+
+
+def blob_path(sha256):
+    # Путь относительно UPLOAD_FOLDER; наружу файл отдает только /files/{id}/download
+    return os.path.join("blobs", sha256[:2], sha256)
+
+
+def store_blob(tmp_path, sha256):
+    """Move an uploaded temp file into the content-addressed store.
+
+    If a blob with the same hash is already on disk the temp file is simply
+    dropped. Returns the blob path relative to UPLOAD_FOLDER.
+    """
+    path = blob_path(sha256)
+    full_path = os.path.join(Config.UPLOAD_FOLDER, path)
+    if os.path.exists(full_path):
+        discard_upload(tmp_path)
+    else:
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        os.replace(tmp_path, full_path)
+    return path
+
+
+def remove_stored(path):
+    full_path = os.path.join(Config.UPLOAD_FOLDER, path)
+    if os.path.exists(full_path):
+        os.remove(full_path)
+
+
+def discard_upload(tmp_path):
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+
+class BodySizeLimitMiddleware:
+    """Reject request bodies larger than max_size before the app reads them.
+
+    A declared Content-Length over the limit is answered with 413 right away.
+    Bodies without one (chunked) are counted as they arrive; once over the
+    limit the app sees a disconnect and the client gets 413 instead of
+    whatever the app would have answered. Paths in exempt stream their body
+    themselves and are not limited here.
+    """
+
+    def __init__(self, app, max_size, exempt=()):
+        self.app = app
+        self.max_size = max_size
+        self.exempt = tuple(exempt)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt):
+            await self.app(scope, receive, send)
+            return
+
+        too_large = PlainTextResponse("Request body is too large", status_code=413)
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_size:
+            await too_large(scope, receive, send)
+            return
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            if exceeded:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_size:
+                    exceeded = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def limited_send(message):
+            nonlocal response_started
+            if exceeded:
+                # Ответ приложения на оборванное тело заменяем на 413
+                if not response_started:
+                    response_started = True
+                    await too_large(scope, receive, send)
+                return
+            response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, limited_send)
+        except Exception:
+            # Приложение не обработало разрыв само (ClientDisconnect)
+            if not exceeded:
+                raise
+            if not response_started:
+                await too_large(scope, receive, send)
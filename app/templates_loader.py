@@ -1,8 +1,10 @@
-from fastapi.templating import Jinja2Templates
 import os
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from app.config import Config
+
+templates_dir = os.path.join(os.path.dirname(__file__), "templates")
 
-# Create templates object
-templates = Jinja2Templates(directory="app/templates")
 
 # Добавляем фильтры для Jinja2
 def nl2br(value):
@@ -17,5 +19,38 @@ def truncate(value, length=50, suffix='...'):
         return value
     return value[:length] + suffix
 
-templates.env.filters['nl2br'] = nl2br
-templates.env.filters['truncate'] = truncate
\ No newline at end of file
+
+def _create_environment():
+    # Скомпилированные шаблоны сохраняются на диск и переиспользуются всеми воркерами
+    if Config.TEMPLATE_CACHE_DIR:
+        os.makedirs(Config.TEMPLATE_CACHE_DIR, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(Config.TEMPLATE_CACHE_DIR)
+    else:
+        bytecode_cache = FileSystemBytecodeCache()
+
+    env = Environment(
+        loader=FileSystemLoader(templates_dir),
+        autoescape=True,
+        bytecode_cache=bytecode_cache,
+        auto_reload=Config.TEMPLATES_AUTO_RELOAD,
+        cache_size=-1
+    )
+    env.filters['nl2br'] = nl2br
+    env.filters['truncate'] = truncate
+    return env
+
+
+# Единственный объект templates для всего приложения
+templates = Jinja2Templates(env=_create_environment())
+
+
+def precompile_templates():
+    """Compile every template under app/templates, filling the bytecode cache."""
+    names = templates.env.list_templates(extensions=["html"])
+    for name in names:
+        templates.env.get_template(name)
+    return len(names)
+
+
+if __name__ == "__main__":
+    print(f"Precompiled {precompile_templates()} templates")
@@ -0,0 +1,109 @@
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+
+import pytest
+
+
+class FakeDatabase:
+    """Stands in for get_db_cursor / get_async_db_cursor in unit tests.
+
+    ``rows`` maps a SQL fragment to the rows returned by a statement that
+    contains it, or to a function of the statement's parameters returning
+    them; ``errors`` maps a fragment to the exception that statement
+    raises. Every statement and every commit is recorded in ``events``.
+    """
+
+    def __init__(self, rows=None, errors=None, connect_error=None):
+        self.rows = rows or {}
+        self.errors = errors or {}
+        self.connect_error = connect_error
+        self.events = []
+        self.params = []
+
+    @property
+    def statements(self):
+        return [event[1] for event in self.events if event[0] == "execute"]
+
+    def execute(self, query, params=None):
+        self.events.append(("execute", query))
+        self.params.append(params)
+        for fragment, error in self.errors.items():
+            if fragment in query:
+                raise error
+
+    def fetch(self):
+        query = self.statements[-1]
+        for fragment, rows in self.rows.items():
+            if fragment in query:
+                return list(rows(self.params[-1]) if callable(rows) else rows)
+        return []
+
+    @contextmanager
+    def cursor(self):
+        if self.connect_error:
+            raise self.connect_error
+        yield FakeCursor(self)
+        self.events.append(("commit",))
+
+    def connection(self):
+        return FakeConnection(self)
+
+    @asynccontextmanager
+    async def async_cursor(self):
+        if self.connect_error:
+            raise self.connect_error
+        yield AsyncFakeCursor(self)
+        self.events.append(("commit",))
+
+
+class FakeConnection:
+    """A psycopg2-style connection: cursors do not commit, commit() does."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self):
+        return nullcontext(FakeCursor(self.db))
+
+    def commit(self):
+        self.db.events.append(("commit",))
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+
+    def execute(self, query, params=None):
+        self.db.execute(query, params)
+
+    def fetchone(self):
+        rows = self.db.fetch()
+        return rows[0] if rows else None
+
+    def fetchall(self):
+        return self.db.fetch()
+
+
+class AsyncFakeCursor(FakeCursor):
+    async def execute(self, query, params=None):
+        self.db.execute(query, params)
+
+    async def fetchone(self):
+        return FakeCursor.fetchone(self)
+
+    async def fetchall(self):
+        return FakeCursor.fetchall(self)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """Install a FakeDatabase as the cursor source of a module."""
+
+    def install(module, **kwargs):
+        db = FakeDatabase(**kwargs)
+        if hasattr(module, "get_db_cursor"):
+            monkeypatch.setattr(module, "get_db_cursor", db.cursor)
+        if hasattr(module, "get_async_db_cursor"):
+            monkeypatch.setattr(module, "get_async_db_cursor", db.async_cursor)
+        return db
+
+    return install
@@ -0,0 +1,110 @@
+import base64
+import json
+from datetime import date
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.auth import get_current_user
+from app.cache import catalogue_cache
+from app.repositories import file_repository, model_repository, parameter_repository
+from app.repositories.experiment_repository import AsyncExperimentRepository
+from app.routes import api_routes
+from app.routes.api_routes import _decode_cursor, _decode_lab_cursor, _encode_cursor, _select
+
+
+def _raw(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+def test_id_cursor_round_trip():
+    assert _decode_cursor(_encode_cursor(42)) == 42
+    assert _decode_cursor(None) is None
+    assert _decode_cursor("") is None
+
+
+def test_lab_cursor_round_trip():
+    assert _decode_lab_cursor(_encode_cursor(["2026-05-01", 7])) == (date(2026, 5, 1), 7)
+    assert _decode_lab_cursor(_encode_cursor([None, 7])) == (None, 7)
+
+
+@pytest.mark.parametrize("cursor", ["%%%", _raw("12"), _raw(1.5), _raw(True), _raw([1, 2]), _raw(None)])
+def test_invalid_id_cursor(cursor):
+    with pytest.raises(HTTPException) as error:
+        _decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("value", [5, ["2026-05-01"], ["2026-05-01", "7"], [20260501, 7], ["soon", 7], ["2026-05-01", 7, 1]])
+def test_invalid_lab_cursor(value):
+    with pytest.raises(HTTPException) as error:
+        _decode_lab_cursor(_raw(value))
+    assert error.value.status_code == 400
+
+
+def test_select_keeps_requested_fields_only():
+    assert _select({"id": 1, "name": "a", "path": "p"}, ["id", "name"]) == {"id": 1, "name": "a"}
+    assert _select({"id": 1}, None) == {"id": 1}
+
+
+def test_select_never_returns_disk_paths():
+    assert _select({"id": 1, "path": "p", "file_path": "p"}, None) == {"id": 1}
+
+
+@pytest.fixture
+def api_client():
+    app = FastAPI()
+    app.include_router(api_routes.router)
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "1", "role": "researcher"}
+    return TestClient(app)
+
+
+def test_put_parameters_upserts_the_whole_set(api_client, fake_db, monkeypatch):
+    async def get_experiment(exp_id):
+        return {"id": exp_id}
+
+    monkeypatch.setattr(AsyncExperimentRepository, "get", get_experiment)
+    db = fake_db(parameter_repository, rows={"SELECT id, name, value": [(1, "lr", "0.01"), (2, "epochs", "10")]})
+    monkeypatch.setattr(parameter_repository, "table_changed", _noop)
+
+    response = api_client.put("/api/v1/experiments/5/parameters", json={"lr": 0.01, "epochs": 10})
+    assert response.status_code == 200
+    assert response.json()["items"][0] == {"id": 1, "name": "lr", "value": "0.01", "experiment_id": 5}
+    upsert = db.statements[0]
+    assert "UPDATE experiment_parameters" in upsert
+    assert db.params[0] == (["lr", "epochs"], ["0.01", "10"], 5, 5)
+
+
+def test_put_parameters_rejects_nested_values(api_client):
+    response = api_client.put("/api/v1/experiments/5/parameters", json={"layers": [64, 32]})
+    assert response.status_code == 422
+
+
+def test_files_api_does_not_expose_paths(api_client, fake_db):
+    fake_db(file_repository, rows={
+        "FROM files f": [(3, "weights.bin", "blobs/ab/abcd", "abcd", 10)],
+        "FROM files": [(3, "weights.bin", "blobs/ab/abcd")],
+    })
+
+    listed = api_client.get("/api/v1/files").json()
+    assert listed["items"] == [{"id": 3, "name": "weights.bin"}]
+    single = api_client.get("/api/v1/files/3").json()
+    assert "path" not in single
+    assert api_client.get("/api/v1/files?fields=path").status_code == 400
+    assert api_client.get("/api/v1/files/3?fields=name,path").status_code == 400
+
+
+def test_cursor_pages_bypass_the_catalogue_cache(api_client, fake_db):
+    catalogue_cache.clear()
+    db = fake_db(model_repository, rows={"FROM models m": [(9, "net", None, "cnn", None, None)]})
+
+    for cursor in (_encode_cursor(10), _encode_cursor(20)):
+        response = api_client.get(f"/api/v1/models?limit=1&cursor={cursor}")
+        assert response.json()["items"][0]["id"] == 9
+    assert len(db.statements) == 2
+    assert catalogue_cache.stats()["size"] == 0
+
+
+async def _noop(*tables):
+    pass
@@ -0,0 +1,48 @@
+from app import auth
+from app.auth import TokenCache
+
+
+def _payload(sub, exp):
+    return {"sub": sub, "role": "student", "exp": exp}
+
+
+def test_hit_until_expiry(monkeypatch):
+    monkeypatch.setattr(auth.time, "time", lambda: 1000)
+    cache = TokenCache()
+    cache.put("token", _payload("1", 1060))
+    assert cache.get("token")["sub"] == "1"
+
+    monkeypatch.setattr(auth.time, "time", lambda: 1060)
+    assert cache.get("token") is None
+    assert cache.stats()["size"] == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_returned_payload_is_a_copy(monkeypatch):
+    monkeypatch.setattr(auth.time, "time", lambda: 1000)
+    cache = TokenCache()
+    cache.put("token", _payload("1", 2000))
+    cache.get("token")["role"] = "admin"
+    assert cache.get("token")["role"] == "student"
+
+
+def test_least_recently_used_entry_is_evicted(monkeypatch):
+    monkeypatch.setattr(auth.time, "time", lambda: 1000)
+    cache = TokenCache(maxsize=2)
+    cache.put("a", _payload("1", 2000))
+    cache.put("b", _payload("2", 2000))
+    cache.get("a")
+    cache.put("c", _payload("3", 2000))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_invalidate_user_drops_all_their_tokens(monkeypatch):
+    monkeypatch.setattr(auth.time, "time", lambda: 1000)
+    cache = TokenCache()
+    cache.put("a", _payload("1", 2000))
+    cache.put("b", _payload("1", 2000))
+    cache.put("c", _payload("2", 2000))
+    cache.invalidate_user(1)
+    assert cache.get("a") is None and cache.get("b") is None
+    assert cache.get("c") is not None
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from app import cache
+from app.cache import DataVersions, QueryCache
+
+
+@pytest.fixture
+def caches(monkeypatch):
+    versions = DataVersions()
+    versions._loaded = True
+    catalogue = QueryCache(ttl=60, maxsize=10)
+    monkeypatch.setattr(cache, "data_versions", versions)
+    monkeypatch.setattr(cache, "catalogue_cache", catalogue)
+    return versions, catalogue
+
+
+def test_table_changed_applies_committed_versions(fake_db, caches):
+    db = fake_db(cache, rows={"table_versions": [("models", 7, None), ("experiments", 8, None)]})
+    versions, _ = caches
+    asyncio.run(cache.table_changed("models", "experiments"))
+    assert db.params[-1] == (["experiments", "models"],)
+    assert versions.versions(["models", "experiments"]) == (8, 7)
+
+
+def test_older_version_does_not_move_counter_back(fake_db, caches):
+    fake_db(cache, rows={"table_versions": [("models", 3, None)]})
+    versions, _ = caches
+    versions.set("models", 5)
+    asyncio.run(cache.table_changed("models"))
+    assert versions.versions(["models"]) == (5,)
+
+
+def test_failed_bump_still_drops_local_entries(fake_db, caches):
+    fake_db(cache, connect_error=RuntimeError("connection lost"))
+    _, catalogue = caches
+
+    async def load():
+        return [{"id": 1}]
+
+    async def scenario():
+        await catalogue.get_or_load("models", frozenset({"models"}), load)
+        await cache.table_changed("models")
+
+    asyncio.run(scenario())
+    assert catalogue.stats()["size"] == 0
+
+
+def test_versions_unknown_until_loaded(fake_db):
+    versions = DataVersions()
+    assert versions.versions(["models"]) is None
+
+    fake_db(cache, rows={"table_versions": [("models", 4)]})
+    versions.load()
+    assert versions.versions(["models", "labs"]) == (0, 4)
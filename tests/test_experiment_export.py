@@ -0,0 +1,54 @@
+import asyncio
+
+import orjson
+
+from app.config import Config
+from app.repositories import experiment_repository
+from app.services.researcher_service import ResearcherService
+
+# Строки запроса выгрузки: эксперимент 2 без параметров, у 1 и 3 их по два
+ROWS = [
+    (1, "a", None, 7, "net", "lr", "0.1"),
+    (1, "a", None, 7, "net", "epochs", "5"),
+    (2, "b", None, 7, "net", None, None),
+    (3, "c", "x", 8, "tree", "depth", "4"),
+    (3, "c", "x", 8, "tree", "seed", "1"),
+]
+
+
+def _page(params):
+    # Эмулирует keyset-подзапрос: batch_size экспериментов после last_id
+    last_id, batch_size = params[0], params[-1]
+    ids = sorted({row[0] for row in ROWS if row[0] > last_id})[:batch_size]
+    return [row for row in ROWS if row[0] in ids]
+
+
+def _export(fmt="ndjson", model_id=None):
+    async def collect():
+        return b"".join([chunk async for chunk in ResearcherService.export_experiments(fmt, model_id)])
+
+    return asyncio.run(collect())
+
+
+def test_export_reads_batches_in_separate_transactions(fake_db, monkeypatch):
+    monkeypatch.setattr(Config, "EXPORT_BATCH_SIZE", 2)
+    db = fake_db(experiment_repository, rows={"FROM experiments": _page})
+
+    lines = [orjson.loads(line) for line in _export().splitlines()]
+    assert [line["id"] for line in lines] == [1, 2, 3]
+    assert lines[0]["parameters"] == {"lr": "0.1", "epochs": "5"}
+    assert lines[1]["parameters"] == {}
+
+    # Две пачки и пустой запрос в конце, каждый в своей транзакции
+    assert [event[0] for event in db.events] == ["execute", "commit"] * 3
+    assert [params[0] for params in db.params] == [0, 2, 3]
+
+
+def test_export_filters_by_model(fake_db, monkeypatch):
+    monkeypatch.setattr(Config, "EXPORT_BATCH_SIZE", 10)
+    db = fake_db(experiment_repository, rows={"FROM experiments": _page})
+
+    csv = _export("csv", model_id=7).decode().splitlines()
+    assert len(csv) == 1 + len(ROWS)
+    assert "model_id = %s" in db.statements[0]
+    assert db.params[0] == (0, 7, 10)
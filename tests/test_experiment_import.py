@@ -0,0 +1,94 @@
+import asyncio
+
+import orjson
+import pytest
+
+from app.config import Config
+from app.repositories.experiment_repository import AsyncExperimentRepository
+from app.repositories.model_repository import AsyncModelRepository
+from app.routes.experiment_routes import _iter_lines
+from app.services.researcher_service import ResearcherService
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+def _run(lines, dry_run=False):
+    async def collect():
+        return [event async for event in ResearcherService.import_experiments(_aiter(lines), dry_run)]
+
+    return asyncio.run(collect())
+
+
+def _line(**record):
+    return orjson.dumps(record)
+
+
+@pytest.fixture
+def copied(monkeypatch):
+    """Replace the COPY step with one that records the batches it receives."""
+    batches = []
+
+    async def import_batches(rows):
+        async for batch in rows:
+            batches.append(batch)
+            yield len(batch), sum(len(parameters) for _, _, _, parameters in batch)
+
+    monkeypatch.setattr(AsyncExperimentRepository, "import_batches", import_batches)
+    monkeypatch.setattr(Config, "IMPORT_BATCH_SIZE", 2)
+    return batches
+
+
+def test_import_loads_valid_lines_in_batches(copied):
+    events = _run([
+        _line(name="a", description="", model_id=1, parameters={"lr": 0.1}),
+        b"",
+        _line(name="b", description="", model_id=1),
+        _line(name="c", description="", model_id=2, parameters={"k": 3, "seed": 1}),
+    ])
+
+    assert [len(batch) for batch in copied] == [2, 1]
+    assert copied[1] == [("c", "", 2, {"k": 3, "seed": 1})]
+    assert [event["event"] for event in events] == ["progress", "progress", "done"]
+    assert events[-1]["imported"] == 3 and events[-1]["parameters"] == 3
+
+
+def test_first_invalid_line_aborts_the_import(copied):
+    events = _run([
+        _line(name="a", description="", model_id=1),
+        b"not json",
+        _line(name="c", description="", model_id=1),
+    ])
+
+    assert events[-1]["event"] == "error"
+    assert events[-1]["line"] == 2
+    assert events[-1]["imported"] == 0
+
+
+def test_dry_run_reports_every_error_without_writing(copied, monkeypatch):
+    async def get_existing_ids(ids):
+        return {1} & set(ids)
+
+    monkeypatch.setattr(AsyncModelRepository, "get_existing_ids", get_existing_ids)
+    events = _run([
+        _line(name="a", description="", model_id=1),
+        _line(name="b", description=""),
+        _line(name="c", description="", model_id=9),
+        b"[1, 2]",
+    ], dry_run=True)
+
+    assert copied == []
+    done = events[-1]
+    assert done["event"] == "done" and done["dry_run"] is True
+    assert done["processed"] == 2
+    assert [error["line"] for error in done["errors"]] == [2, 3, 4]
+    assert done["errors"][1]["error"] == "model 9 does not exist"
+
+
+def test_lines_are_split_across_chunk_boundaries():
+    async def collect():
+        return [line async for line in _iter_lines(_aiter([b'{"a":', b' 1}\n{"b"', b": 2}\n", b'{"c": 3}']))]
+
+    assert asyncio.run(collect()) == [b'{"a": 1}', b'{"b": 2}', b'{"c": 3}']
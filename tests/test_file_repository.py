@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from app.repositories import file_repository
+from app.repositories.file_repository import AsyncFileRepository
+
+
+@pytest.fixture
+def run_delete(fake_db, monkeypatch):
+    def run(rows):
+        db = fake_db(file_repository, rows=rows)
+
+        async def remove(func, path):
+            db.events.append(("remove", path))
+
+        monkeypatch.setattr(file_repository, "run_in_threadpool", remove)
+        asyncio.run(AsyncFileRepository.delete(1))
+        return db
+
+    return run
+
+
+def _removed(db):
+    return [event for event in db.events if event[0] == "remove"]
+
+
+def test_delete_keeps_blob_while_referenced(run_delete):
+    db = run_delete({
+        "DELETE FROM files": [("blobs/ab/abc", "abc")],
+        "UPDATE blobs": [(1,)],
+    })
+    assert not _removed(db)
+    assert not any("DELETE FROM blobs" in statement for statement in db.statements)
+
+
+def test_delete_removes_last_reference_after_commit(run_delete):
+    db = run_delete({
+        "DELETE FROM files": [("blobs/ab/abc", "abc")],
+        "UPDATE blobs": [(0,)],
+    })
+    assert db.events.index(("remove", "blobs/ab/abc")) > db.events.index(("commit",))
+    assert any("DELETE FROM blobs" in statement for statement in db.statements)
+
+
+def test_delete_skips_blob_uploaded_again(run_delete):
+    db = run_delete({
+        "DELETE FROM files": [("blobs/ab/abc", "abc")],
+        "UPDATE blobs": [(0,)],
+        "SELECT 1 FROM blobs": [(1,)],
+    })
+    assert not _removed(db)
+
+
+def test_delete_legacy_file_without_hash(run_delete):
+    db = run_delete({"DELETE FROM files": [("model.pkl", None)]})
+    assert db.events[-1] == ("remove", "model.pkl")
+    assert not any("blobs" in statement for statement in db.statements)
+
+
+def test_delete_missing_file_touches_nothing(run_delete):
+    db = run_delete({})
+    assert len(db.statements) == 1
+    assert not _removed(db)
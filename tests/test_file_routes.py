@@ -0,0 +1,23 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.auth import get_current_user
+from app.routes import file_routes
+
+
+def _client(role):
+    app = FastAPI()
+    app.include_router(file_routes.router)
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "1", "role": role}
+    return TestClient(app, follow_redirects=False)
+
+
+def test_download_requires_file_role():
+    response = _client("student").get("/files/1/download")
+    assert response.status_code in (302, 307)
+    assert response.headers["location"] == "/dashboard"
+
+
+def test_detail_requires_file_role():
+    response = _client("teacher").get("/files/1")
+    assert response.headers["location"] == "/dashboard"
@@ -0,0 +1,73 @@
+import asyncio
+import json
+
+import pytest
+
+from app.repositories.lab_repository import AsyncLabRepository
+from app.routes.lab_routes import _parse_grades
+from app.services.teacher_service import TeacherService
+
+
+def test_csv_with_header_and_blank_lines():
+    content = b"\xef\xbb\xbfstudent_id,grade\n1, 4.5\n\n2,5\n"
+    assert _parse_grades(content, "grades.csv") == [
+        {"student_id": "1", "grade": "4.5"},
+        {"student_id": "2", "grade": "5"},
+    ]
+
+
+def test_csv_without_header():
+    assert _parse_grades(b"7,5\n", "grades.txt") == [{"student_id": "7", "grade": "5"}]
+
+
+def test_json_list():
+    content = json.dumps([{"student_id": 3, "grade": 4}]).encode()
+    assert _parse_grades(content, "grades.json") == [{"student_id": 3, "grade": 4}]
+
+
+def test_json_mapping_is_detected_without_extension():
+    assert _parse_grades(b'{"3": 4, "5": null}', "upload") == [
+        {"student_id": "3", "grade": 4},
+        {"student_id": "5", "grade": None},
+    ]
+
+
+def test_json_of_wrong_shape_is_rejected():
+    with pytest.raises(ValueError):
+        _parse_grades(b"[1, 2]", "grades.json")
+
+
+@pytest.fixture
+def graded(monkeypatch):
+    written = []
+
+    async def grade_many(lab_id, grades):
+        written.extend(grades)
+        return [student_id for student_id, _ in grades if student_id != 9]
+
+    monkeypatch.setattr(AsyncLabRepository, "grade_many", grade_many)
+    return written
+
+
+def test_bulk_grading_never_writes_a_blank_grade(graded):
+    rows = _parse_grades(b"student_id,grade\n1,4.5\n2,\n3\n", "grades.csv")
+    rows.append({"student_id": 4})
+    results = asyncio.run(TeacherService.grade_lab_bulk(7, rows))
+
+    assert graded == [(1, 4.5)]
+    assert [result["status"] for result in results] == ["updated", "invalid", "invalid", "invalid"]
+    assert results[1]["error"] == "grade: Field required"
+
+
+def test_bulk_grading_statuses(graded):
+    rows = [
+        {"student_id": 1, "grade": 50},
+        {"student_id": "x", "grade": 10},
+        {"student_id": 9, "grade": 70},
+        {"student_id": 1, "grade": 60},
+        {"student_id": 2, "grade": 101},
+    ]
+    results = asyncio.run(TeacherService.grade_lab_bulk(7, rows))
+
+    assert graded == [(1, 60.0), (9, 70.0)]
+    assert [result["status"] for result in results] == ["skipped", "invalid", "not_assigned", "updated", "invalid"]
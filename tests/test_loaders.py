@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from app.loaders import DataLoader
+
+
+def _loader(calls, fail=False):
+    async def batch(keys):
+        calls.append(list(keys))
+        if fail:
+            raise RuntimeError("database is down")
+        return {key: f"user {key}" for key in keys if key != 404}
+
+    return DataLoader(batch)
+
+
+def test_concurrent_loads_are_batched_into_one_call():
+    calls = []
+
+    async def scenario():
+        loader = _loader(calls)
+        return await asyncio.gather(loader.load(1), loader.load(2), loader.load(1))
+
+    assert asyncio.run(scenario()) == ["user 1", "user 2", "user 1"]
+    assert calls == [[1, 2]]
+
+
+def test_loaded_keys_are_memoized_until_cleared():
+    calls = []
+
+    async def scenario():
+        loader = _loader(calls)
+        await loader.load(1)
+        await loader.load(1)
+        loader.clear(1)
+        return await loader.load_many([1, 404])
+
+    assert asyncio.run(scenario()) == ["user 1", None]
+    assert calls == [[1], [1, 404]]
+
+
+def test_batch_error_reaches_every_waiter():
+    calls = []
+
+    async def scenario():
+        loader = _loader(calls, fail=True)
+        return await asyncio.gather(loader.load(1), loader.load(2), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert [type(result) for result in results] == [RuntimeError, RuntimeError]
+    assert calls == [[1, 2]]
+
+
+def test_loads_after_dispatch_start_a_new_batch():
+    calls = []
+
+    async def scenario():
+        loader = _loader(calls)
+        first = await loader.load(1)
+        second = await loader.load(2)
+        return first, second
+
+    assert asyncio.run(scenario()) == ("user 1", "user 2")
+    assert calls == [[1], [2]]
+
+
+def test_load_outside_event_loop_fails():
+    with pytest.raises(RuntimeError):
+        _loader([]).load(1)
@@ -0,0 +1,49 @@
+import pytest
+
+from app import migrate
+from app.migrate import split_statements
+
+
+def test_splits_on_top_level_semicolons():
+    assert split_statements("create table a (id int);\ncreate table b (id int);\n") == [
+        "create table a (id int)",
+        "create table b (id int)",
+    ]
+
+
+def test_keeps_semicolons_in_strings_and_comments():
+    sql = "insert into t values ('a;b'); -- trailing; comment\nselect 1;"
+    assert split_statements(sql) == ["insert into t values ('a;b')", "-- trailing; comment\nselect 1"]
+
+
+def test_keeps_dollar_quoted_bodies():
+    sql = (
+        "create function f() returns int as $$ begin return 1; end; $$ language plpgsql;\n"
+        "create function g() returns int as $body$ select 2; $body$ language sql;"
+    )
+    statements = split_statements(sql)
+    assert len(statements) == 2
+    assert statements[0].endswith("$$ language plpgsql")
+    assert "$body$ select 2; $body$" in statements[1]
+
+
+def test_positional_parameter_is_not_a_quote():
+    assert split_statements("select $1; select 2") == ["select $1", "select 2"]
+
+
+def test_comment_only_chunks_are_dropped():
+    assert split_statements("-- migrate: no-transaction\n-- only a note\n;\nanalyze users;") == ["analyze users"]
+
+
+def test_discover_rejects_duplicate_versions(tmp_path, monkeypatch):
+    (tmp_path / "0001_a.sql").write_text("select 1;")
+    (tmp_path / "0001_b.sql").write_text("select 2;")
+    monkeypatch.setattr(migrate, "MIGRATIONS_DIR", str(tmp_path))
+    with pytest.raises(RuntimeError):
+        migrate.discover()
+
+
+def test_discover_orders_shipped_migrations():
+    versions = [m["version"] for m in migrate.discover()]
+    assert versions == sorted(versions)
+    assert versions[0] == 0
@@ -0,0 +1,24 @@
+from app.pagination import page_context
+
+
+def test_exact_count_bounds_pages():
+    context = page_context(2, 20, {"total": 45, "approximate": False}, 20)
+    assert context["total_pages"] == 3
+    assert context["has_next"] is True
+
+
+def test_exact_count_last_page_has_no_next():
+    context = page_context(3, 20, {"total": 45, "approximate": False}, 5)
+    assert context["has_next"] is False
+
+
+def test_estimate_is_not_used_for_page_bounds():
+    context = page_context(7, 20, {"total": 50000, "approximate": True}, 20)
+    assert context["total_pages"] is None
+    assert context["total_approximate"] is True
+    assert context["has_next"] is True
+
+
+def test_estimate_short_page_ends_the_list():
+    context = page_context(7, 20, {"total": 50000, "approximate": True}, 3)
+    assert context["has_next"] is False
@@ -0,0 +1,24 @@
+import pytest
+
+from app import plan_check
+from app.migrate import split_statements
+
+
+def test_seed_refuses_database_with_data(fake_db):
+    db = fake_db(plan_check, rows={"EXISTS": [(True,)]})
+    with pytest.raises(SystemExit):
+        plan_check.seed(1000)
+    assert db.statements == [plan_check.HAS_DATA_SQL]
+
+
+def test_seed_with_allow_flag(fake_db):
+    db = fake_db(plan_check, rows={"EXISTS": [(True,)]})
+    plan_check.seed(1000, allow_nonempty=True)
+    assert db.statements[1:] == split_statements(plan_check.SEED_SQL)
+
+
+def test_seed_into_empty_database(fake_db):
+    db = fake_db(plan_check, rows={"EXISTS": [(False,)]})
+    plan_check.seed(1000)
+    assert db.statements[1:] == split_statements(plan_check.SEED_SQL)
+    assert db.params[-1] == {"users": 100, "models": 10, "experiments": 1000}
@@ -0,0 +1,59 @@
+import logging
+
+from app.query_stats import QueryStats, params_shape
+
+
+def test_record_aggregates_per_caller():
+    stats = QueryStats(slow_ms=0)
+    stats.record("AsyncUserRepository.get", "SELECT 1", (1,), 0.002, 1, False)
+    stats.record("AsyncUserRepository.get", "SELECT 1", (2,), 0.030, 1, True)
+    stats.record("AsyncLabRepository.get", "SELECT 2", None, 0.001, -1, False)
+
+    queries = {q["caller"]: q for q in stats.stats()["queries"]}
+    user = queries["AsyncUserRepository.get"]
+    assert (user["calls"], user["errors"], user["rows"]) == (2, 1, 2)
+    assert user["max_ms"] == 30.0
+    assert user["histogram"]["<=5ms"] == 1 and user["histogram"]["<=50ms"] == 1
+    # rowcount -1 (нет данных о строках) не уменьшает сумму
+    assert queries["AsyncLabRepository.get"]["rows"] == 0
+
+
+def test_queries_are_sorted_by_total_time_and_percentiles_use_bucket_bounds():
+    stats = QueryStats(slow_ms=0)
+    for _ in range(19):
+        stats.record("fast", "SELECT 1", None, 0.0005, 1, False)
+    stats.record("fast", "SELECT 1", None, 0.2, 1, False)
+    stats.record("slow", "SELECT 2", None, 0.6, 1, False)
+
+    queries = stats.stats()["queries"]
+    assert [q["caller"] for q in queries] == ["slow", "fast"]
+    assert queries[1]["p50_ms"] == 1
+    assert queries[1]["p95_ms"] == 1
+    assert queries[0]["p95_ms"] == 1000
+
+
+def test_slow_query_is_logged_without_parameter_values(caplog):
+    stats = QueryStats(slow_ms=100)
+    with caplog.at_level(logging.WARNING, logger="app.query_stats"):
+        stats.record("AsyncUserRepository.get_by_email", "SELECT *\n  FROM users WHERE email = %s",
+                     ("secret@example.com",), 0.15, 1, False)
+        stats.record("AsyncUserRepository.get", "SELECT 1", (1,), 0.01, 1, False)
+
+    assert len(caplog.records) == 1
+    message = caplog.records[0].getMessage()
+    assert "SELECT * FROM users WHERE email = %s" in message
+    assert "secret@example.com" not in message
+    assert "['str[18]']" in message
+
+
+def test_reset_clears_entries():
+    stats = QueryStats(slow_ms=0)
+    stats.record("caller", "SELECT 1", None, 0.001, 1, False)
+    stats.reset()
+    assert stats.stats()["queries"] == []
+
+
+def test_params_shape():
+    assert params_shape(None) is None
+    assert params_shape({"name": "abc", "ids": [1, 2]}) == {"name": "str[3]", "ids": "list[2]"}
+    assert params_shape((1, None, b"xy")) == ["int", "NoneType", "bytes[2]"]
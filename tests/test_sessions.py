@@ -0,0 +1,84 @@
+from app import sessions
+from app.sessions import MemorySessionStore
+
+
+def test_session_expires_after_ttl(monkeypatch):
+    monkeypatch.setattr(sessions.time, "time", lambda: 1000)
+    store = MemorySessionStore(ttl=60)
+    token = store.create(5, "student")
+    assert store.get(token) == {"user_id": 5, "role": "student", "exp": 1060}
+
+    monkeypatch.setattr(sessions.time, "time", lambda: 1060)
+    assert store.get(token) is None
+
+
+def test_sweep_drops_only_expired_sessions(monkeypatch):
+    monkeypatch.setattr(sessions.time, "time", lambda: 1000)
+    store = MemorySessionStore(ttl=60)
+    old = store.create(1, "student")
+    monkeypatch.setattr(sessions.time, "time", lambda: 1030)
+    fresh = store.create(1, "student")
+
+    monkeypatch.setattr(sessions.time, "time", lambda: 1070)
+    store.sweep()
+    assert store.stats()["cached_sessions"] == 1
+    assert store.get(old) is None
+    assert store.get(fresh) is not None
+
+
+def test_revoke_user_keeps_current_session(monkeypatch):
+    monkeypatch.setattr(sessions.time, "time", lambda: 1000)
+    store = MemorySessionStore(ttl=60)
+    current = store.create(1, "teacher")
+    other = store.create(1, "teacher")
+    store.revoke_user(1, keep=current)
+    assert store.get(other) is None
+    assert store.get(current) is not None
+
+
+def test_role_change_applies_to_live_sessions(monkeypatch):
+    monkeypatch.setattr(sessions.time, "time", lambda: 1000)
+    store = MemorySessionStore(ttl=60)
+    token = store.create(1, "student")
+    store.set_role(1, "teacher")
+    assert store.get(token)["role"] == "teacher"
+
+
+def test_expired_session_is_evicted_on_read(monkeypatch):
+    monkeypatch.setattr(sessions.time, "time", lambda: 1000)
+    store = MemorySessionStore(ttl=60)
+    token = store.create(1, "student")
+
+    monkeypatch.setattr(sessions.time, "time", lambda: 1060)
+    assert store.get(token) is None
+    assert store.stats()["cached_sessions"] == 0
+    assert store._by_user == {}
+
+
+def test_cache_is_bounded_and_drops_least_recently_read(monkeypatch):
+    monkeypatch.setattr(sessions.time, "time", lambda: 1000)
+    store = MemorySessionStore(ttl=60, max_sessions=2)
+    first = store.create(1, "student")
+    second = store.create(2, "student")
+    store.get(first)
+    third = store.create(3, "student")
+
+    assert store.stats()["cached_sessions"] == 2
+    assert store.get(second) is None
+    assert store.get(first) is not None
+    assert store.get(third) is not None
+    assert set(store._by_user) == {1, 3}
+
+
+def test_overflow_drops_expired_sessions_first(monkeypatch):
+    monkeypatch.setattr(sessions.time, "time", lambda: 1000)
+    store = MemorySessionStore(ttl=60, max_sessions=2)
+    stale = store.create(1, "student")
+    monkeypatch.setattr(sessions.time, "time", lambda: 1050)
+    kept = store.create(2, "student")
+    store.get(stale)
+
+    monkeypatch.setattr(sessions.time, "time", lambda: 1070)
+    fresh = store.create(3, "student")
+    assert store.get(kept) is not None
+    assert store.get(fresh) is not None
@@ -0,0 +1,30 @@
+import asyncio
+
+from psycopg.errors import UndefinedTable
+
+from app.repositories import stats_repository
+from app.repositories.stats_repository import AsyncStatsRepository, LIVE_STATS_SQL
+
+
+def test_rollup_falls_back_to_live_counts_when_table_is_missing(fake_db):
+    db = fake_db(
+        stats_repository,
+        rows={"UNION ALL": [("users_by_role", "student", 3), ("experiments", "", 10)]},
+        errors={"stats_rollup": UndefinedTable('relation "stats_rollup" does not exist')},
+    )
+    counts = asyncio.run(AsyncStatsRepository.get_counts(use_rollup=True))
+    assert counts == {"users_by_role": {"student": 3}, "experiments": {"": 10}}
+    assert db.statements[-1] == LIVE_STATS_SQL
+
+
+def test_rollup_skips_zero_counters(fake_db):
+    fake_db(stats_repository, rows={"FROM stats_rollup": [("labs", "", 0), ("files", "", 4)]})
+    counts = asyncio.run(AsyncStatsRepository.get_counts(use_rollup=True))
+    assert counts == {"files": {"": 4}}
+
+
+def test_empty_rollup_means_triggers_are_missing(fake_db):
+    db = fake_db(stats_repository, rows={"UNION ALL": [("files", "", 4)]})
+    counts = asyncio.run(AsyncStatsRepository.get_counts(use_rollup=True))
+    assert counts == {"files": {"": 4}}
+    assert db.statements == [stats_repository.ROLLUP_STATS_SQL, LIVE_STATS_SQL]
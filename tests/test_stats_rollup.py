@@ -0,0 +1,51 @@
+import pytest
+
+from app import stats_rollup
+from app.config import Config
+from app.stats_rollup import TRIGGER_NAMES, sync
+
+
+@pytest.fixture
+def connect(fake_db):
+    def make(installed):
+        db = fake_db(stats_rollup, rows={"pg_trigger": [(installed,)]})
+        return db, db.connection()
+
+    return make
+
+
+def test_enabled_rollup_installs_triggers_and_recounts(connect, monkeypatch):
+    monkeypatch.setattr(Config, "STATS_ROLLUP", True)
+    db, conn = connect(installed=0)
+    sync(conn)
+
+    created = [s for s in db.statements if s.startswith("create trigger")]
+    assert len(created) == len(TRIGGER_NAMES)
+    assert "stats_rollup_trigger('users_by_role', 'user_role')" in created[0]
+    assert "referencing old table as old_rows new table as new_rows" in created[1]
+    assert db.statements[-1] == stats_rollup.RECOUNT_SQL
+
+
+def test_enabled_rollup_with_triggers_in_place_is_left_alone(connect, monkeypatch):
+    monkeypatch.setattr(Config, "STATS_ROLLUP", True)
+    db, conn = connect(installed=len(TRIGGER_NAMES))
+    sync(conn)
+    assert len(db.statements) == 1
+
+
+def test_disabled_rollup_drops_triggers_and_counters(connect, monkeypatch):
+    monkeypatch.setattr(Config, "STATS_ROLLUP", False)
+    db, conn = connect(installed=len(TRIGGER_NAMES))
+    sync(conn)
+
+    dropped = [s for s in db.statements if s.startswith("drop trigger")]
+    assert len(dropped) == len(TRIGGER_NAMES)
+    assert db.statements[-1] == "delete from stats_rollup"
+    assert not any(s.startswith("create trigger") for s in db.statements)
+
+
+def test_disabled_rollup_without_triggers_does_nothing(connect, monkeypatch):
+    monkeypatch.setattr(Config, "STATS_ROLLUP", False)
+    db, conn = connect(installed=0)
+    sync(conn)
+    assert len(db.statements) == 1
@@ -0,0 +1,66 @@
+import hashlib
+import os
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.config import Config
+from app.storage import BodySizeLimitMiddleware, stage_file, store_blob, remove_stored
+
+
+def _client(max_size):
+    app = FastAPI()
+    app.add_middleware(BodySizeLimitMiddleware, max_size=max_size, exempt=("/stream",))
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        return {"size": len(await request.body())}
+
+    @app.post("/stream")
+    async def stream(request: Request):
+        return {"size": len(await request.body())}
+
+    return TestClient(app)
+
+
+def test_body_within_limit_passes():
+    response = _client(10).post("/upload", content=b"x" * 10)
+    assert response.json() == {"size": 10}
+
+
+def test_declared_length_over_limit_is_rejected():
+    response = _client(10).post("/upload", content=b"x" * 11)
+    assert response.status_code == 413
+
+
+def test_chunked_body_over_limit_is_rejected():
+    def chunks():
+        for _ in range(4):
+            yield b"x" * 5
+
+    response = _client(10).post("/upload", content=chunks())
+    assert response.status_code == 413
+
+
+def test_exempt_path_is_not_limited():
+    response = _client(10).post("/stream", content=b"x" * 100)
+    assert response.json() == {"size": 100}
+
+
+def test_store_blob_keeps_one_copy_per_hash(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "UPLOAD_FOLDER", str(tmp_path))
+    source = tmp_path / "model.pkl"
+    source.write_bytes(b"weights")
+
+    first, size, sha256 = stage_file(source)
+    assert size == 7
+    assert sha256 == hashlib.sha256(b"weights").hexdigest()
+    path = store_blob(first, sha256)
+
+    second, _, _ = stage_file(source)
+    assert store_blob(second, sha256) == path
+    assert not os.path.exists(second)
+    assert (tmp_path / path).read_bytes() == b"weights"
+
+    remove_stored(path)
+    assert not (tmp_path / path).exists()